@@ -1,12 +1,13 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import List, Dict, Any, Optional
+import asyncio
 import os
 import tempfile
 from pydantic import BaseModel
 
 from app.services.data_processor import data_processor
-from app.services.ai_service import ai_service
+from app.services.ai_service import ai_service, count_rollup_sql
 from app.core.database_manager import db_manager
 from app.repositories.neo4j_repository import neo4j_repo
 from app.services.vector_service import vector_service
@@ -14,7 +15,7 @@ from app.services.ufdr_report_generator import ufdr_report_generator
 from app.services.pdf_generator import pdf_generator
 from app.services.case_manager import case_manager
 from app.services.schema_service import schema_service
-from app.models.database import get_db
+from app.models.database import get_db_context
 from sqlalchemy import text
 
 router = APIRouter()
@@ -23,6 +24,8 @@ class QueryRequest(BaseModel):
     query: str
     case_number: Optional[str] = None
     filters: Optional[Dict[str, Any]] = None
+    page: int = 0
+    page_size: int = 50
 
 class InvestigationRequest(BaseModel):
     case_number: str
@@ -110,13 +113,17 @@ async def execute_query(request: QueryRequest):
                 print(f"🎯 Using most recent case: {case_number}")
         
         # Execute hybrid search with case context - now returns processed response
-        results = await ai_service.execute_hybrid_search(request.query, case_number)
+        results = await ai_service.execute_hybrid_search(
+            request.query, case_number, page=max(request.page, 0), page_size=min(max(request.page_size, 1), 200)
+        )
         
         return JSONResponse(content={
             "query": request.query,
             "case_number": case_number,
             "answer": results.get("answer", "No response generated"),
             "success": results.get("success", False),
+            "page": results.get("page", request.page),
+            "page_size": results.get("page_size", request.page_size),
             "data_sources": results.get("data_sources", {})
         })
         
@@ -187,8 +194,9 @@ async def semantic_search(
         if not query_embeddings:
             raise HTTPException(status_code=500, detail="Failed to generate query embedding")
         
-        # Search in Qdrant
-        results = db_manager.search_vectors(
+        # Search in Qdrant without blocking the event loop
+        results = await asyncio.to_thread(
+            db_manager.search_vectors,
             collection_name=collection,
             query_vector=query_embeddings[0],
             limit=limit,
@@ -219,22 +227,21 @@ async def get_analytics_summary():
             "total_media_files": 0,
             "recent_activity": []
         }
-        db = next(get_db())
         active_cases = case_manager.list_active_cases()
         summary["total_cases"] = len(active_cases)
-        for case in active_cases:
-            info = case_manager.get_case_info(case)
-            if not info:
-                continue
-            schema = f"case_{info['safe_case_name']}"
-            try:
-                summary["total_chat_records"] += db.execute(text(f"SELECT COUNT(*) FROM {schema}.chat_records")).scalar() or 0
-                summary["total_call_records"] += db.execute(text(f"SELECT COUNT(*) FROM {schema}.call_records")).scalar() or 0
-                summary["total_contacts"] += db.execute(text(f"SELECT COUNT(*) FROM {schema}.contacts")).scalar() or 0
-                summary["total_media_files"] += db.execute(text(f"SELECT COUNT(*) FROM {schema}.media_files")).scalar() or 0
-            except Exception:
-                continue
-        db.close()
+        with get_db_context() as db:
+            for case in active_cases:
+                info = case_manager.get_case_info(case)
+                if not info:
+                    continue
+                schema = f"case_{info['safe_case_name']}"
+                try:
+                    for data_type, count in db.execute(text(count_rollup_sql(schema))):
+                        summary[f"total_{data_type}"] += count or 0
+                except Exception:
+                    # A failed statement aborts the transaction; reset it for the next case
+                    db.rollback()
+                    continue
         return JSONResponse(content=summary)
         
     except Exception as e:
@@ -542,6 +549,16 @@ async def generate_comprehensive_report(case_number: str = Form(...)):
         print(f"❌ Error generating comprehensive report: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error generating report: {str(e)}")
 
+@router.post("/generate-comprehensive-report/stream")
+async def stream_comprehensive_report(case_number: str = Form(...)):
+    """Stream the comprehensive report text as it is generated"""
+    
+    print(f"📊 Streaming comprehensive report for case: {case_number}")
+    return StreamingResponse(
+        ufdr_report_generator.stream_comprehensive_report(case_number),
+        media_type="text/plain; charset=utf-8"
+    )
+
 @router.post("/generate-pdf-report")
 async def generate_pdf_report(case_number: str = Form(...)):
     """Generate PDF report for download"""
@@ -703,20 +720,15 @@ async def get_case_counts(case_number: str):
         if not info:
             raise HTTPException(status_code=404, detail=f"Case {case_number} not found")
         schema = f"case_{info['safe_case_name']}"
-        db = next(get_db())
         counts = {
             "chat_records": 0,
             "call_records": 0,
             "contacts": 0,
             "media_files": 0
         }
-        try:
-            counts["chat_records"] = db.execute(text(f"SELECT COUNT(*) FROM {schema}.chat_records")).scalar() or 0
-            counts["call_records"] = db.execute(text(f"SELECT COUNT(*) FROM {schema}.call_records")).scalar() or 0
-            counts["contacts"] = db.execute(text(f"SELECT COUNT(*) FROM {schema}.contacts")).scalar() or 0
-            counts["media_files"] = db.execute(text(f"SELECT COUNT(*) FROM {schema}.media_files")).scalar() or 0
-        finally:
-            db.close()
+        with get_db_context() as db:
+            for data_type, count in db.execute(text(count_rollup_sql(schema))):
+                counts[data_type] = count or 0
         return JSONResponse(content={"success": True, "case_number": case_number, "counts": counts})
     except HTTPException:
         raise
@@ -743,14 +755,14 @@ async def health_check():
         try:
             vector_stats = await vector_service.get_collection_stats()
             status["databases"]["qdrant"] = "connected"
-        except:
+        except Exception:
             status["databases"]["qdrant"] = "disconnected"
         
         # Test Neo4j
         try:
             await neo4j_repo.execute_cypher("RETURN 1")
             status["databases"]["neo4j"] = "connected"
-        except:
+        except Exception:
             status["databases"]["neo4j"] = "disconnected"
         
         return JSONResponse(content=status)
@@ -787,6 +799,12 @@ async def admin_cache_status():
         "redis_alive": db_manager.ping_redis()
     })
 
+@router.get("/admin/pool-status")
+async def admin_pool_status():
+    """Report PostgreSQL connection pool usage (checked out, idle and overflow connections)."""
+    from app.models.database import pool_stats
+    return JSONResponse(content=pool_stats())
+
 @router.post("/schema/extract/{case_number}")
 async def extract_case_schema(case_number: str):
     """Manually extract schema for a specific case to improve AI accuracy."""
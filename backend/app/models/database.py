@@ -1,3 +1,4 @@
+from contextlib import contextmanager
 from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, JSON, Boolean, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
@@ -98,14 +99,59 @@ class Investigation(Base):
     status = Column(String, default="active")  # active, closed, pending
 
 # Database setup
-engine = create_engine(settings.postgres_url)
+# Concurrent searches and report fan-out each check out a connection; pre-ping drops stale ones and
+# a bounded wait turns pool exhaustion into a fast error instead of an indefinitely stalled request
+POOL_OPTIONS = {
+    "pool_pre_ping": True,
+    "pool_size": settings.postgres_pool_size,
+    "max_overflow": settings.postgres_max_overflow,
+    "pool_timeout": settings.postgres_pool_timeout
+}
+engine = create_engine(settings.postgres_url, **POOL_OPTIONS)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Generated SQL runs on a separate engine bound to the read-only role when one is configured
+read_engine = create_engine(settings.postgres_readonly_url, **POOL_OPTIONS) if settings.postgres_readonly_user else engine
+ReadOnlySessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+def pool_stats() -> dict:
+    """Connection usage of the read/write and read-only pools"""
+    engines = {"primary": engine}
+    if read_engine is not engine:
+        engines["read_only"] = read_engine
+    return {
+        name: {
+            "size": pooled.pool.size(),
+            "checked_in": pooled.pool.checkedin(),
+            "checked_out": pooled.pool.checkedout(),
+            "overflow": pooled.pool.overflow(),
+            "max_overflow": settings.postgres_max_overflow,
+            "timeout": settings.postgres_pool_timeout
+        }
+        for name, pooled in engines.items()
+    }
+
 def create_tables():
     Base.metadata.create_all(bind=engine)
 
 def get_db():
     db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@contextmanager
+def get_db_context():
+    """Session for service code: always returned to the pool, including on exceptions and early returns"""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_read_db():
+    db = ReadOnlySessionLocal()
     try:
         yield db
     finally:
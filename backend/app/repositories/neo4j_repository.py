@@ -2,13 +2,17 @@
 Neo4j repository implementation for graph database operations.
 """
 
+import asyncio
 import logging
 from typing import Dict, List, Any, Optional
-from neo4j import GraphDatabase, Driver
+from neo4j import GraphDatabase, Driver, READ_ACCESS
 from config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Rows sent per transaction by execute_cypher_unwind
+NEO4J_UNWIND_BATCH_SIZE = 5000
+
 
 class Neo4jRepository:
     """Repository for Neo4j graph database operations."""
@@ -107,14 +111,76 @@ class Neo4jRepository:
         if not self.driver:
             raise Exception("Neo4j connection not available")
         
-        try:
+        def run_query():
             with self.driver.session() as session:
                 result = session.run(query, parameters or {})
                 return [dict(record) for record in result]
+        
+        try:
+            # The driver is blocking; run the session work off the event loop
+            return await asyncio.to_thread(run_query)
         except Exception as e:
             logger.error(f"Failed to execute Cypher query: {str(e)}")
             raise
     
+    async def execute_cypher_read(self, query: str, parameters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """Execute a Cypher query in a read transaction; the server rejects any write it attempts."""
+        if not self.driver:
+            raise Exception("Neo4j connection not available")
+        
+        def read_all(tx):
+            return [dict(record) for record in tx.run(query, parameters or {})]
+        
+        def run_read():
+            with self.driver.session(default_access_mode=READ_ACCESS) as session:
+                return session.execute_read(read_all)
+        
+        try:
+            return await asyncio.to_thread(run_read)
+        except Exception as e:
+            logger.error(f"Failed to execute read Cypher query: {str(e)}")
+            raise
+    
+    async def execute_cypher_batch(self, queries: List[str]) -> None:
+        """Execute several Cypher statements in a single write transaction (one round trip to commit)."""
+        if not self.driver:
+            raise Exception("Neo4j connection not available")
+        
+        def run_all(tx):
+            for query in queries:
+                tx.run(query).consume()
+        
+        def write_all():
+            with self.driver.session() as session:
+                session.execute_write(run_all)
+        
+        try:
+            await asyncio.to_thread(write_all)
+        except Exception as e:
+            logger.error(f"Failed to execute Cypher batch: {str(e)}")
+            raise
+    
+    async def execute_cypher_unwind(self, query: str, rows: List[Dict[str, Any]],
+                                    parameters: Dict[str, Any] = None,
+                                    batch_size: int = NEO4J_UNWIND_BATCH_SIZE) -> None:
+        """Execute an UNWIND $rows query over rows, one write transaction per batch instead of one per row."""
+        if not self.driver:
+            raise Exception("Neo4j connection not available")
+        
+        def run_batch(tx, batch):
+            tx.run(query, {**(parameters or {}), "rows": batch}).consume()
+        
+        def write_batches():
+            with self.driver.session() as session:
+                for start in range(0, len(rows), batch_size):
+                    session.execute_write(run_batch, rows[start:start + batch_size])
+        
+        try:
+            await asyncio.to_thread(write_batches)
+        except Exception as e:
+            logger.error(f"Failed to execute Cypher UNWIND batch: {str(e)}")
+            raise
+    
     async def create_person_node(self, person_data: Dict[str, Any]) -> str:
         """Create a Person node."""
         return await self.create_node("Person", person_data)
@@ -3,18 +3,794 @@ AI Service for UFDR AI Analyzer - LLM-Driven Approach
 Handles natural language query processing and SQL generation using LLM with full context
 """
 
+import asyncio
 import logging
 import json
 import hashlib
-from typing import Dict, List, Any, Optional
+import re
+import threading
+import uuid
+from functools import lru_cache
+from collections import defaultdict
+from itertools import islice
+from string import Template
+from typing import Dict, List, Any, Optional, Tuple
+import numpy as np
 import google.generativeai as genai
-from app.services.schema_service import schema_service
+from cachetools import TTLCache
+from sqlalchemy import text
+from sqlalchemy.sql.elements import TextClause
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+try:
+    import sqlglot
+    from sqlglot import exp
+    SQLGLOT_AVAILABLE = True
+except ImportError:
+    SQLGLOT_AVAILABLE = False
+from app.services.schema_service import schema_service, estimated_count_sql
 from app.core.database_manager import db_manager
+from config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Rule-based analyses at or above this confidence skip the Gemini planning call
+RULE_GATE_CONFIDENCE = 0.9
+
+# Keyword groups for the rule-based intent analyzer, compiled into one alternation so a single
+# pass over the query labels every match with its group name
+_INTENT_KEYWORDS = {
+    "explicit_count": ("how many", "count", "number of"),
+    "implicit_count": ("total", "evidence", "evidences"),
+    "list": ("show all", "list all", "display all", "all chats", "all messages", "all contacts",
+             "all calls", "all media", "all files"),
+    "analyze": ("suspicious", "criminal", "illegal", "relationships", "patterns", "analyze", "related with"),
+}
+_INTENT_SCANNER = re.compile(r"\b(?:" + "|".join(
+    f"(?P<{tag}>" + "|".join(sorted(map(re.escape, words), key=len, reverse=True)) + ")"
+    for tag, words in _INTENT_KEYWORDS.items()
+) + r")\b")
+_WORD_PATTERN = re.compile(r"\w+")
+
+# Contact identifiers that can be answered by JSONB containment on the contacts table
+_EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_PHONE_PATTERN = re.compile(r"(?<![\w+])\+?\d{7,15}(?!\w)")
+
+# Evidence tables present in every case schema
+EVIDENCE_TABLES = ("chat_records", "call_records", "contacts", "media_files")
+
+# Canned SQL templates: the words users use for each table, the words that shape
+# a count/list request without filtering it, and each table's natural ordering
+_TEMPLATE_TABLE_WORDS = {
+    "chat_records": frozenset({"chat", "chats", "message", "messages", "sms", "conversation", "conversations"}),
+    "call_records": frozenset({"call", "calls"}),
+    "contacts": frozenset({"contact", "contacts", "people", "person", "persons"}),
+    "media_files": frozenset({"media", "file", "files", "photo", "photos", "image", "images", "video", "videos"}),
+}
+_TEMPLATE_FILLER_WORDS = frozenset({
+    "how", "many", "count", "number", "of", "total", "show", "list", "display", "all", "me", "the",
+    "are", "there", "is", "in", "this", "case", "do", "we", "have", "what", "give", "get", "records",
+    "record", "evidence", "evidences", "latest", "recent", "last", "top", "a", "any", "please",
+    "exact", "exactly", "precise", "precisely", "accurate"
+})
+_TEMPLATE_ORDER_BY = {
+    "chat_records": "timestamp DESC",
+    "call_records": "timestamp DESC",
+    "contacts": "name",
+    "media_files": "created_date DESC NULLS LAST",
+}
+# Keyword searches: the words introducing the search terms, the verbs that may precede them,
+# and each table's index-backed match predicate and ranking (:terms / :pattern are bound per query)
+_TEMPLATE_KEYWORD_MARKERS = frozenset({
+    "about", "mentioning", "mention", "mentions", "containing", "contain", "contains",
+    "regarding", "with", "named", "called"
+})
+_TEMPLATE_SEARCH_WORDS = frozenset({"find", "search", "look", "that", "which", "who", "where"})
+_TEMPLATE_SEARCH_PREDICATES = {
+    "chat_records": ("search @@ websearch_to_tsquery('simple', :terms)",
+                     "ts_rank(search, websearch_to_tsquery('simple', :terms)) DESC"),
+    "call_records": ("caller_number ILIKE :pattern OR receiver_number ILIKE :pattern", "timestamp DESC"),
+    "contacts": ("name ILIKE :pattern", "name"),
+    "media_files": ("filename ILIKE :pattern", "created_date DESC NULLS LAST"),
+}
+_TEMPLATE_SEARCH_DEFAULT_TABLES = ("chat_records", "contacts")
+TEMPLATE_DEFAULT_LIMIT = 50
+
+# Query shapes answered by a fixed statement with no Gemini call at all: (full-query pattern,
+# query type, table, SQL). Named groups become bind parameters next to :limit / :offset
+_PATTERN_LIST_PREFIX = r"(?:(?:show|list|display|get|give|find)\s+(?:me\s+)?)?(?:all\s+)?(?:the\s+)?"
+_PATTERN_NUMBER = r"\+?\d{3,15}"
+_PATTERN_TEMPLATES = tuple((re.compile(_PATTERN_LIST_PREFIX + pattern), query_type, table, sql) for pattern, query_type, table, sql in (
+    (r"(?P<app>whatsapp|telegram|signal|sms|imessage|messenger|instagram|facebook)\s+(?:messages|chats|conversations)",
+     "list", "chat_records",
+     "SELECT * FROM chat_records WHERE app_name ILIKE :app ORDER BY timestamp DESC LIMIT :limit OFFSET :offset"),
+    (rf"(?:messages|chats)\s+from\s+(?P<sender>{_PATTERN_NUMBER})\s+to\s+(?P<receiver>{_PATTERN_NUMBER})",
+     "search", "chat_records",
+     "SELECT * FROM chat_records WHERE sender_number = :sender AND receiver_number = :receiver "
+     "ORDER BY timestamp DESC LIMIT :limit OFFSET :offset"),
+    (rf"calls?\s+from\s+(?P<caller>{_PATTERN_NUMBER})\s+to\s+(?P<receiver>{_PATTERN_NUMBER})",
+     "search", "call_records",
+     "SELECT * FROM call_records WHERE caller_number = :caller AND receiver_number = :receiver "
+     "ORDER BY timestamp DESC LIMIT :limit OFFSET :offset"),
+    (rf"calls?\s+from\s+(?P<caller>{_PATTERN_NUMBER})",
+     "search", "call_records",
+     "SELECT * FROM call_records WHERE caller_number = :caller ORDER BY timestamp DESC LIMIT :limit OFFSET :offset"),
+    (rf"calls?\s+to\s+(?P<receiver>{_PATTERN_NUMBER})",
+     "search", "call_records",
+     "SELECT * FROM call_records WHERE receiver_number = :receiver ORDER BY timestamp DESC LIMIT :limit OFFSET :offset"),
+    (r"contacts?\s+(?:named|called)\s+(?P<name>[\w .'-]+)",
+     "search", "contacts",
+     "SELECT * FROM contacts WHERE name ILIKE '%' || :name || '%' ORDER BY name LIMIT :limit OFFSET :offset"),
+))
+
+# Semantic search routing: words that switch to the suspicious-conversation probes, and the
+# words that narrow a standard semantic search to each vector data type
+_SUSPICIOUS_QUERY_WORDS = frozenset({
+    "suspicious", "suspiciously", "criminal", "criminals", "illegal", "threat", "threats",
+    "threatening", "dangerous", "fraud", "frauds", "fraudulent", "scam", "scams", "scammer", "scammers"
+})
+_SEMANTIC_TYPE_WORDS = {
+    # Prefer chat messages when user asks about messages/chats/apps
+    "chat_record": frozenset({
+        "message", "messages", "chat", "chats", "whatsapp", "telegram", "signal", "imessage", "sms"
+    }),
+    # Prefer calls when user asks about calls/phone calls
+    "call_record": frozenset({"call", "calls", "called", "calling"}),
+    # Prefer contacts when user mentions contacts/people
+    "contact": frozenset({"contact", "contacts", "people", "person"}),
+    # Prefer files/media when user explicitly mentions files/media types
+    "media_file": frozenset({
+        "file", "files", "media", "image", "images", "photo", "photos", "video", "videos",
+        "audio", "document", "documents", "pdf", "doc", "docs", "xlsx"
+    }),
+}
+
+# Record fields surfaced in the short data summary and the label each one is shown under
+_SUMMARY_FIELD_LABELS = {
+    **dict.fromkeys(('message_content', 'content', 'text'), 'Message'),
+    **dict.fromkeys(('sender_number', 'caller_number', 'phone_number'), 'From'),
+    **dict.fromkeys(('receiver_number', 'receiver'), 'To'),
+    **dict.fromkeys(('timestamp', 'date', 'time'), 'Time'),
+    **dict.fromkeys(('app_name', 'application'), 'App'),
+    **dict.fromkeys(('name', 'contact_name'), 'Name'),
+    **dict.fromkeys(('file_name', 'filename'), 'File'),
+}
+
+# Result pagination for SQL searches and the number of rows streamed per fetch
+DEFAULT_PAGE_SIZE = 50
+SQL_STREAM_BATCH_SIZE = 50
+# Hard ceiling on rows pulled from any one generated statement
+SQL_MAX_ROWS = 10000
+
+# Semantic response cache: paraphrased queries reuse a cached answer above the similarity threshold,
+# and grey-zone matches only when they share the same content words and the rule-based analyzer agrees
+SEMANTIC_CACHE_COLLECTION = "query_cache"
+SEMANTIC_CACHE_THRESHOLD = 0.92
+SEMANTIC_CACHE_GREY_THRESHOLD = 0.85
+# Numbers, phone numbers and emails must match exactly - embeddings barely tell them apart
+_ENTITY_PATTERN = re.compile(r"[\w.+-]*[\d@][\w.+-]*")
+# Words ignored when comparing grey-zone queries
+_CACHE_STOPWORDS = frozenset({
+    "a", "an", "the", "all", "any", "me", "my", "i", "we", "you", "please", "show", "list", "give", "get",
+    "find", "display", "tell", "what", "which", "are", "is", "there", "of", "in", "on", "for", "to", "from",
+    "with", "and", "or", "this", "that", "these", "those", "case", "do", "does", "can", "could", "about"
+})
+
+# Gemini context caches for static prompt prefixes; local handles expire a little before the server copy
+PROMPT_CACHE_TTL_SECONDS = 3600
+PROMPT_CACHE_SIZE = 64
+
+# Count / list-all template results only change on ingestion, so repeats are served from memory
+TEMPLATE_CACHE_SIZE = 512
+TEMPLATE_CACHE_TTL = 30
+
+# LLM intent analyses / query plans are reused for repeats of the same normalized query
+ANALYSIS_CACHE_SIZE = 2048
+ANALYSIS_CACHE_TTL = 600
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# Index-only columns that are never returned to the caller (the generated tsvector)
+_HIDDEN_COLUMNS = frozenset({"search"})
+
+# JSONB column carrying the full row in multi-table UNION ALL listings
+_UNION_RECORD_COLUMN = "record"
+
+# Semantic-result risk bands: score < 0.4 LOW, < 0.7 MEDIUM, otherwise HIGH
+_RISK_THRESHOLDS = np.array([0.4, 0.7], dtype=np.float32)
+_RISK_LEVELS = np.array(["LOW", "MEDIUM", "HIGH"])
+
+# Prompt templates - only the variable slots are interpolated per call. Schema-heavy prompts are
+# split into a per-case prefix (cacheable on the Gemini side) and a short per-query suffix.
+_INTENT_PREFIX = """
+You are a forensic data analysis expert. Analyze the query given at the end and determine the best search approach.
+
+CLASSIFICATION RULES:
+
+**SQL-ONLY QUERIES** (Simple, direct data retrieval):
+- "How many [records] are there?" → Count queries
+- "Show me all [specific table] of [app]" → Direct table queries
+- "Show all [data_type]" → Simple listing queries
+- "List all [specific items]" → Direct enumeration
+- "Find [specific field] = [value]" → Exact match queries
+- "Show [data_type] from [app]" → App-specific queries
+- "Display all [foreign/international] contacts" → Filtered queries
+
+**SEMANTIC-ONLY QUERIES** (Complex, contextual analysis):
+- "Show suspicious conversations" → Contextual analysis needed
+- "Find criminal activities" → Pattern recognition required
+- "Find evidence of [complex behavior]" → Behavioral analysis
+- "Find conversations about [complex topic]" → Semantic understanding
+- "Show me suspicious communications" → Enhanced suspicious detection
+- "Find illegal activities" → Criminal pattern analysis
+- "Show dangerous conversations" → Threat assessment
+- "Find fraudulent messages" → Financial crime detection
+
+**GRAPH-ONLY QUERIES** (Network/relationship analysis):
+- "Show relationships between people" → Network analysis
+- "Find connections between contacts" → Graph traversal
+- "Analyze communication patterns" → Network analysis
+- "Show people he is related with" → Relationship mapping
+- "Who are the most connected people" → Centrality analysis
+- "Find shortest path between contacts" → Graph algorithms
+
+**HYBRID QUERIES** (Need both approaches):
+- "Find WhatsApp messages about meetings" → SQL for WhatsApp + semantic for meetings
+- "Show suspicious calls from yesterday" → SQL for calls + semantic for suspicious
+
+DECISION PROCESS:
+1. Can this be answered with a simple SQL query? → SQL_ONLY
+2. Does this require understanding context/meaning? → SEMANTIC_ONLY  
+3. Does this involve relationships/connections/network analysis? → GRAPH_ONLY
+4. Does this need both direct data + context? → HYBRID
+
+Return JSON format:
+{
+    "search_approach": "sql_only|semantic_only|graph_only|hybrid",
+    "reasoning": "Brief explanation of why this approach was chosen",
+    "target_data": ["chat_records", "call_records", "contacts", "media_files", "device_info"],
+    "query_type": "count|list|search|analyze|relationship|network",
+    "complexity": "simple|moderate|complex",
+    "confidence": 0.9
+}
+"""
+_INTENT_QUERY = Template("""
+QUERY: "$query"
+""")
+
+_PLAN_PREFIX = Template("""
+You are a forensic data analysis expert. Classify the user's query given at the end, pick the best search approach
+and draft the database queries needed to answer it, all in one response.
+
+DATABASE SCHEMA AND DATA CONTEXT:
+$schema_info
+
+SEARCH APPROACHES:
+- sql_only: simple, direct data retrieval (counts, listings, exact matches, app filters)
+- semantic_only: contextual analysis (suspicious, criminal, fraudulent, threatening content)
+- graph_only: relationships, connections, communication networks, centrality
+- hybrid: needs both direct data retrieval and contextual understanding
+
+SQL RULES (only when search_approach is sql_only or hybrid, otherwise null):
+- A single PostgreSQL SELECT statement using schema-qualified tables: $schema_name.table_name
+- Use actual column names from the schema above; add LIMIT only when the user asks for a specific number of results
+  (results are paged outside the query)
+- Keyword search on chat_records uses the indexed tsvector column: search @@ websearch_to_tsquery('simple', '...'),
+  selecting ts_rank(search, websearch_to_tsquery('simple', '...')) AS rank and ordering by rank DESC
+- Phone numbers and contact names use ILIKE '%...%' (trigram indexed)
+- Order time-based data by timestamp DESC
+
+CYPHER RULES (only when search_approach is graph_only, otherwise null):
+- A single read-only Cypher query (MATCH/RETURN only, no CREATE/MERGE/SET/DELETE)
+- Person nodes use the label $person_label with properties id, name, phone_number (never the bare Person label)
+- Filtering on case_id uses the $$case_id parameter: WHERE p.case_id = $$case_id
+- Relationships between persons use the type COMMUNICATES_WITH with properties frequency, message_count, call_count
+- LIMIT 25
+
+Return ONLY JSON in this format:
+{
+    "intent": "Brief description of what the user wants",
+    "search_approach": "sql_only|semantic_only|graph_only|hybrid",
+    "reasoning": "Brief explanation of why this approach was chosen",
+    "target_data": ["chat_records", "call_records", "contacts", "media_files", "device_info"],
+    "query_type": "count|list|search|analyze|relationship|network",
+    "complexity": "simple|moderate|complex",
+    "confidence": 0.9,
+    "sql": "SELECT ... or null",
+    "cypher": "MATCH ... or null"
+}
+""")
+_PLAN_QUERY = Template("""
+QUERY: "$query"
+""")
+
+_SQL_PREFIX = Template("""
+You are an expert forensic data analyst. Generate a PostgreSQL query based on the user's natural language request given at the end.
+
+DATABASE SCHEMA AND DATA CONTEXT:
+$schema_info
+
+INSTRUCTIONS:
+1. Analyze the user's query to understand what they want to find
+2. Use the actual table names, column names, and data types from the schema above
+3. Generate a PostgreSQL SELECT query that will return the requested data
+4. Use schema-qualified table names: $schema_name.table_name
+5. Use appropriate WHERE clauses based on the user's intent
+6. Use full-text search on chat_records.search for message keywords, ILIKE for names and phone numbers
+7. Add LIMIT only when the user asks for a specific number of results; results are paged outside the query
+8. Order results by relevance (timestamp DESC for time-based data)
+
+EXAMPLES OF QUERY PATTERNS:
+- "show all messages" → SELECT * FROM $schema_name.chat_records ORDER BY timestamp DESC
+- "show all whatsapp messages" → SELECT * FROM $schema_name.chat_records WHERE app_name ILIKE 'whatsapp' ORDER BY timestamp DESC
+- "find messages about money" → SELECT *, ts_rank(search, websearch_to_tsquery('simple', 'money')) AS rank FROM $schema_name.chat_records WHERE search @@ websearch_to_tsquery('simple', 'money') ORDER BY rank DESC
+- "show all contacts" → SELECT * FROM $schema_name.contacts ORDER BY name
+- "find calls to +1234567890" → SELECT * FROM $schema_name.call_records WHERE caller_number ILIKE '%1234567890%' OR receiver_number ILIKE '%1234567890%' ORDER BY timestamp DESC
+- "10 longest calls" → SELECT * FROM $schema_name.call_records ORDER BY duration DESC NULLS LAST LIMIT 10
+
+CRITICAL RULES:
+- Return ONLY a SELECT statement
+- Use actual column names from the schema
+- Use schema-qualified table names
+- Handle app-specific queries by filtering on app_name column with ILIKE
+- Never wrap columns in LOWER()/UPPER() - ILIKE on the bare column keeps the trigram indexes usable
+- Handle content searches with search @@ websearch_to_tsquery('simple', ...) and order by ts_rank, never LOWER(message_content) LIKE
+- Handle phone number searches on caller_number/receiver_number columns
+- contacts.phone_numbers and contacts.email_addresses are JSONB arrays: match a full number or email with
+  phone_numbers @> to_jsonb('+1234567890'::text), never phone_numbers::text LIKE
+- For "show all" queries, don't use WHERE clauses unless filtering by app or specific criteria
+""")
+_SQL_QUERY = Template("""
+USER QUERY: "$query"
+
+Generate the most appropriate SQL query for this request.
+""")
+
+_RESPONSE_PROMPT = Template("""
+You are an expert forensic data analyst. Analyze the user's query and the provided data to generate a comprehensive, accurate, and human-readable response.
+
+USER QUERY: "$query"
+SEARCH APPROACH USED: $search_approach
+QUERY TYPE: $query_type
+
+AVAILABLE DATA:
+$data_summary
+
+CRITICAL FORMATTING REQUIREMENTS - MUST BE FOLLOWED EXACTLY:
+
+FORMATTING RULE: ALL responses MUST use the structured data block format below. NO markdown, NO paragraphs, NO bullet points.
+
+REQUIRED FORMAT FOR ALL QUERY TYPES:
+1. Start with a brief answer to the user's question (1-2 sentences max)
+2. Then use ONLY the structured format below for ALL data
+
+STRUCTURED DATA FORMAT (MANDATORY):
+- Use section headers: "CHAT RECORDS:", "CALL RECORDS:", "FILES:", "CONTACTS:", "SEARCH RESULTS:", "ANALYSIS RESULTS:"
+- Use numbered lists: "1.", "2.", "3.", etc.
+- Use pipe separators: "Field: [value] | Field: [value] | Field: [value]"
+- Include ALL available fields for each record
+
+EXAMPLES OF REQUIRED FORMAT:
+
+For chat records:
+CHAT RECORDS:
+1. App: WhatsApp | From: +1234567890 | To: +0987654321 | Time: 2025-01-15 10:30:00 | Message: [full message content here]
+2. App: Telegram | From: +1111111111 | To: +2222222222 | Time: 2025-01-15 11:45:00 | Message: [full message content here]
+
+For call records:
+CALL RECORDS:
+1. From: +1234567890 | To: +0987654321 | Duration: 120 seconds | Type: outgoing | Time: 2025-01-15 14:20:00
+2. From: +1111111111 | To: +2222222222 | Duration: 45 seconds | Type: incoming | Time: 2025-01-15 15:30:00
+
+For files:
+FILES:
+1. File: document.pdf | Size: 2.5 MB | Type: PDF | Path: /storage/documents/ | Time: 2025-01-15 09:15:00
+2. File: spreadsheet.xlsx | Size: 1.2 MB | Type: Excel | Path: /storage/files/ | Time: 2025-01-15 10:45:00
+
+For contacts:
+CONTACTS:
+1. Name: John Doe | Phone: +1234567890 | Email: john@example.com | Time: 2025-01-15 08:00:00
+2. Name: Jane Smith | Phone: +0987654321 | Email: jane@example.com | Time: 2025-01-15 09:30:00
+
+For device information or other data:
+DEVICE INFORMATION:
+1. Phone Number: +1234567890 | Model: iPhone 15 Pro | Manufacturer: Apple | OS Version: iOS 17.1.1 | IMEI: 123456789012345
+2. Extraction Date: 2025-01-15 18:20:00 | Extraction Tool: Cellebrite UFED | Case Officer: Agent Smith
+
+FORBIDDEN FORMATS (DO NOT USE):
+- Markdown headers (###, ##, #)
+- Bullet points (-, *, •)
+- Plain paragraphs without structure
+- Tables or other formatting
+- Any format other than the structured format above
+
+MANDATORY RULES:
+- ALWAYS use the structured format for ALL data types
+- ALWAYS include section headers
+- ALWAYS use numbered lists (1., 2., 3.)
+- ALWAYS use pipe separators (|)
+- ALWAYS include ALL available fields
+- NEVER use markdown, paragraphs, or bullet points
+- If no data found, say "No [data type] found" in the appropriate section
+
+Generate a response that directly answers the user's question using the available data:
+""")
+
+# Reciprocal rank fusion constant for merging hybrid SQL and vector rankings
+RRF_K = 60
+
+# Embedding batches are packed by approximate token count (~4 chars per token)
+EMBED_MAX_TOKENS_PER_BATCH = 7500
+EMBED_MAX_BATCH_SIZE = 16
+
+# Persistent embedding workers and their bounded batch queue
+EMBED_WORKER_COUNT = 8
+EMBED_QUEUE_SIZE = 64
+# Concurrent batches when generate_embeddings runs without the worker pool
+EMBED_DIRECT_CONCURRENCY = 4
+
+# Ingest workloads at least this large are embedded with data-parallel workers
+EMBED_BULK_MIN_TEXTS = 1000
+EMBED_BULK_BATCH_SIZE = 256
+
+# Gemini structured-output schemas: the model emits bare JSON matching these, with no fences or prose
+def _enum_schema(*values: str) -> Dict[str, Any]:
+    """Structured-output schema for a string restricted to the given values"""
+    return {"type": "STRING", "enum": list(values)}
+
+
+_ANALYSIS_PROPERTIES = {
+    "search_approach": _enum_schema("sql_only", "semantic_only", "graph_only", "hybrid"),
+    "reasoning": {"type": "STRING"},
+    "target_data": {"type": "ARRAY", "items": {"type": "STRING"}},
+    "query_type": _enum_schema("count", "list", "search", "analyze", "relationship", "network"),
+    "complexity": _enum_schema("simple", "moderate", "complex"),
+    "confidence": {"type": "NUMBER"},
+}
+_INTENT_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": {
+        "type": "OBJECT",
+        "properties": _ANALYSIS_PROPERTIES,
+        "required": ["search_approach", "query_type", "confidence"],
+    },
+}
+_PLAN_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": {
+        "type": "OBJECT",
+        "properties": {
+            "intent": {"type": "STRING"},
+            **_ANALYSIS_PROPERTIES,
+            "sql": {"type": "STRING", "nullable": True},
+            "cypher": {"type": "STRING", "nullable": True},
+        },
+        "required": ["search_approach", "query_type", "confidence", "sql", "cypher"],
+    },
+}
+
+# Markdown fences Gemini wraps around free-form output
+_JSON_FENCE = re.compile(r"```(?:json)?\s*(\{.*\})\s*```", re.S)
+_SQL_FENCE = re.compile(r"```(?:sql)?\s*(.*?)\s*```", re.S)
+
+
+def _parse_llm_json(response_text: str) -> Any:
+    """Extract and parse the JSON payload of an LLM response (raises ValueError on bad JSON)"""
+    match = _JSON_FENCE.search(response_text)
+    payload = match.group(1) if match else response_text.strip()
+    if ORJSON_AVAILABLE:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+def _extract_sql(response_text: str) -> str:
+    """Extract the SQL statement from an LLM response, dropping any code fence"""
+    match = _SQL_FENCE.search(response_text)
+    return (match.group(1) if match else response_text).strip()
+
+
+@lru_cache(maxsize=64)
+def count_rollup_sql(schema_name: str, tables: Tuple[str, ...] = EVIDENCE_TABLES) -> str:
+    """Build one UNION ALL query returning (data_type, count) rows for the given case tables"""
+    return " UNION ALL ".join(
+        f"SELECT '{table}' AS data_type, COUNT(*) AS count FROM {schema_name}.{table}" for table in tables
+    )
+
+
+@lru_cache(maxsize=64)
+def list_union_sql(tables: Tuple[str, ...]) -> str:
+    """Build one UNION ALL query returning (data_type, record) rows, one page per table.
+
+    Tables are unqualified (resolved through search_path) and each row is folded into a
+    JSONB record so tables with different columns can share a result set.
+    """
+    return " UNION ALL ".join(
+        f"(SELECT '{table}' AS data_type, to_jsonb(t) - 'search' AS {_UNION_RECORD_COLUMN} "
+        f"FROM (SELECT * FROM {table} ORDER BY {_TEMPLATE_ORDER_BY[table]} LIMIT :limit OFFSET :offset) t)"
+        for table in tables
+    )
+
+
+@lru_cache(maxsize=64)
+def search_union_sql(tables: Tuple[str, ...]) -> str:
+    """Build one UNION ALL keyword search returning (data_type, record) rows, one ranked page per table.
+
+    Chat content goes through the tsvector GIN index, names and numbers through the trigram
+    indexes, so every branch is an index scan instead of a LOWER(...) LIKE sequential scan.
+    """
+    return " UNION ALL ".join(
+        f"(SELECT '{table}' AS data_type, to_jsonb(t) - 'search' AS {_UNION_RECORD_COLUMN} "
+        f"FROM (SELECT * FROM {table} WHERE {_TEMPLATE_SEARCH_PREDICATES[table][0]} "
+        f"ORDER BY {_TEMPLATE_SEARCH_PREDICATES[table][1]} LIMIT :limit OFFSET :offset) t)"
+        for table in tables
+    )
+
+
+_SET_TRANSACTION_READ_ONLY = text("SET TRANSACTION READ ONLY")
+
+# SET LOCAL cannot take bind parameters; set_config(..., true) is its transaction-scoped equivalent
+_SET_SEARCH_PATH = text("SELECT set_config('search_path', :schema_name || ', public', true)")
+
+
+@lru_cache(maxsize=256)
+def _sql_text(sql: str) -> TextClause:
+    """Reuse one TextClause per distinct statement so SQLAlchemy's compiled cache keeps hitting"""
+    return text(sql)
+
+
+@lru_cache(maxsize=256)
+def _is_read_only_sql(sql_query: str) -> Optional[bool]:
+    """Check that the SQL is a single query with no write/DDL nodes in its AST; None when it cannot be parsed here"""
+    if not SQLGLOT_AVAILABLE:
+        return None
+    write_nodes = tuple(
+        getattr(exp, name) for name in
+        ("Insert", "Update", "Delete", "Drop", "Create", "Alter", "AlterTable", "TruncateTable", "Merge", "Into")
+        if hasattr(exp, name)
+    )
+    query_nodes = (exp.Query,) if hasattr(exp, "Query") else (exp.Select, exp.Union)
+    try:
+        statements = [tree for tree in sqlglot.parse(sql_query, read="postgres") if tree is not None]
+    except Exception:
+        return None
+    if not statements:
+        return None
+    # A second statement could end the read-only transaction (e.g. "SELECT 1; COMMIT; DROP ..."), and
+    # anything other than a query (COMMIT, SET, or a bare Command for TRUNCATE, GRANT, ...) is refused
+    if len(statements) > 1:
+        return False
+    tree = statements[0]
+    return isinstance(tree, query_nodes) and not tree.find(*write_nodes)
+
+
+# Fallback when the SQL cannot be parsed: single SELECT/WITH statement with none of these keywords
+_SQL_QUERY_START = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+_SQL_FORBIDDEN_KEYWORDS = re.compile(
+    r"\b(INSERT|UPDATE|DELETE|MERGE|DROP|CREATE|ALTER|TRUNCATE|GRANT|REVOKE|COPY|CALL|DO|EXECUTE|"
+    r"COMMIT|ROLLBACK|BEGIN|START|SAVEPOINT|RELEASE|SET|RESET|LOCK|VACUUM|ANALYZE|REINDEX|CLUSTER|"
+    r"REFRESH|LISTEN|NOTIFY|PREPARE|DEALLOCATE|DISCARD|INTO)\b",
+    re.IGNORECASE
+)
+
+
+def _passes_keyword_scan(sql_query: str) -> bool:
+    """Conservative textual read-only check used when the AST check is unavailable; may refuse valid queries"""
+    statement = sql_query.strip().rstrip(";").strip()
+    if ";" in statement or not _SQL_QUERY_START.match(statement):
+        return False
+    return not _SQL_FORBIDDEN_KEYWORDS.search(statement)
+
+
+@lru_cache(maxsize=256)
+def _with_row_limit(sql_query: str, max_rows: int = SQL_MAX_ROWS) -> str:
+    """Append a LIMIT to an unbounded top-level query so Postgres stops producing rows early"""
+    if not SQLGLOT_AVAILABLE:
+        return sql_query
+    try:
+        tree = sqlglot.parse_one(sql_query, read="postgres")
+        if not isinstance(tree, (exp.Select, exp.Union)) or tree.args.get("limit"):
+            return sql_query
+    except Exception:
+        return sql_query
+    # The AST only decides; re-rendering it would turn :name binds into %(name)s, which text() escapes.
+    # The newline keeps a trailing line comment from swallowing the LIMIT
+    return f"{sql_query.strip().rstrip(';')}\nLIMIT {int(max_rows)}"
+
+
+# Shared labels carried by every case's nodes; planned Cypher must use the per-case label instead
+_SHARED_GRAPH_LABEL = re.compile(r":\s*`?(?:Person|Communication)\b")
+_CASE_ID_FILTER = re.compile(r"case_id\s*[:=]\s*\$case_id\b")
+
+
+def _is_case_scoped_cypher(cypher: str, person_label: str) -> bool:
+    """Planned Cypher must name the case's Person label (or filter on $case_id) and never the shared labels"""
+    if _SHARED_GRAPH_LABEL.search(cypher):
+        return False
+    return bool(re.search(rf"\b{re.escape(person_label)}\b", cypher) or _CASE_ID_FILTER.search(cypher))
+
+
+def _page_params(limit: int, page: int) -> Dict[str, int]:
+    """LIMIT/OFFSET bind parameters for a template page; the offset steps by the rows each page returns"""
+    return {"limit": limit, "offset": page * limit}
+
+
+@lru_cache(maxsize=256)
+def _paged_sql(sql_query: str) -> str:
+    """Wrap a generated query so the requested page is cut in Postgres, inside any LIMIT the query has itself"""
+    # The newline keeps a trailing line comment from swallowing the closing parenthesis
+    return f"SELECT * FROM ({sql_query.strip().rstrip(';')}\n) AS page_rows LIMIT :page_limit OFFSET :page_offset"
+
+
+def _generated_page_params(page: int, page_size: int) -> Dict[str, int]:
+    """Page bind parameters for _paged_sql, kept within the SQL_MAX_ROWS ceiling"""
+    offset = min(page * page_size, SQL_MAX_ROWS)
+    return {"page_limit": max(0, min(page_size, SQL_MAX_ROWS - offset)), "page_offset": offset}
+
+
+# Postgres type OIDs for date, time, timestamp, timestamptz and timetz
+_ISO_TYPE_CODES = frozenset({1082, 1083, 1114, 1184, 1266})
+
+
+def _to_str(value: Any) -> Optional[str]:
+    return str(value) if value is not None else None
+
+
+def _to_iso(value: Any) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def _to_serializable(value: Any) -> Optional[str]:
+    """Per-value fallback used when the driver gives no column type information"""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return _to_str(value)
+
+
+def _column_converters(description: Optional[Any], column_count: int) -> List[Any]:
+    """Map each result column to a converter from the DB-API cursor description type codes"""
+    if not description or len(description) != column_count:
+        return [_to_serializable] * column_count
+    return [_to_iso if column[1] in _ISO_TYPE_CODES else _to_str for column in description]
+
+
+def _count_results(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Shape (data_type, count) rollup rows into count_result records"""
+    return [
+        {"type": "count_result", "data_type": row["data_type"], "count": int(row["count"] or 0),
+         "description": f"Total {row['data_type']}: {int(row['count'] or 0)}"}
+        for row in rows
+    ]
+
+
+# (divisor, unit) indexed by bit_length // 10, i.e. by the power of 1024 a size falls under
+_SIZE_UNITS = ((1, 'B'), (1024, 'KB'), (1024 ** 2, 'MB'), (1024 ** 3, 'GB'), (1024 ** 4, 'TB'))
+
+
+def _format_size(size: Any) -> str:
+    """Human-readable byte size without a per-unit branch cascade"""
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        return 'Unknown'
+    index = min(max(size.bit_length() - 1, 0) // 10, len(_SIZE_UNITS) - 1)
+    divisor, unit = _SIZE_UNITS[index]
+    return f"{size / divisor:.1f}{unit}" if index else f"{size}B"
+
+
+@lru_cache(maxsize=4096)
+def _query_cache_key(query: str, case_number: str, page: int, page_size: int) -> str:
+    """Result-cache key for a query page; BLAKE2b is faster than MD5 on 64-bit CPUs and memoised for repeats"""
+    key_string = f"{query.lower().strip()}_{case_number}_{page}_{page_size}"
+    return hashlib.blake2b(key_string.encode(), digest_size=16).hexdigest()
+
+
+def _normalize_query(query: str) -> str:
+    """Cache key form of a query: trimmed, lowercased, whitespace runs collapsed"""
+    return _WHITESPACE_PATTERN.sub(" ", query.strip().lower())
+
+
+def _content_words(query: str) -> frozenset:
+    """Words of a query that carry meaning for cache matching (stopwords dropped, simple plurals folded)"""
+    return frozenset(
+        word[:-1] if len(word) > 3 and word.endswith("s") else word
+        for word in _WORD_PATTERN.findall(query.lower()) if word not in _CACHE_STOPWORDS
+    )
+
+
+def _match_query_pattern(query: str) -> Optional[Tuple[str, str, str, Dict[str, str]]]:
+    """First canned query shape covering the whole query: (query type, table, SQL, bind parameters)"""
+    normalized = _normalize_query(query).rstrip("?.! ")
+    for pattern, query_type, table, sql in _PATTERN_TEMPLATES:
+        match = pattern.fullmatch(normalized)
+        if match:
+            return query_type, table, sql, match.groupdict()
+    return None
+
+
+@lru_cache(maxsize=1024)
+def _intent_tags(query_lower: str) -> frozenset:
+    """Keyword groups present in a lowercased query, from one scan (queries recur, so memoised)"""
+    return frozenset(match.lastgroup for match in _INTENT_SCANNER.finditer(query_lower))
+
+
+def _record_key(record: Dict[str, Any]) -> Optional[Tuple[Any, ...]]:
+    """Identity of a chat/call record shared by SQL rows and Qdrant payloads"""
+    sender = record.get('sender_number') or record.get('caller_number')
+    receiver = record.get('receiver_number')
+    if not sender and not receiver:
+        return None
+    timestamp = str(record.get('timestamp') or '').replace('T', ' ')[:19]
+    return sender, receiver, record.get('message_content'), timestamp
+
+
+def _fuse_hybrid_results(sql_results: List[Dict[str, Any]],
+                         vector_results: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Merge both hybrid channels with reciprocal rank fusion and drop vector hits already returned by SQL"""
+    fused_scores: Dict[Tuple[Any, ...], float] = {}
+    for rank, row in enumerate(sql_results, 1):
+        key = _record_key(row) if isinstance(row, dict) else None
+        if key is not None:
+            fused_scores[key] = fused_scores.get(key, 0.0) + 1.0 / (RRF_K + rank)
+    
+    unique_vector_results = []
+    for rank, result in enumerate(vector_results, 1):
+        key = _record_key(result.get('payload') or {}) if isinstance(result, dict) else None
+        if key is not None and key in fused_scores:
+            fused_scores[key] += 1.0 / (RRF_K + rank)
+        else:
+            unique_vector_results.append(result)
+    
+    # Rows confirmed by both channels rank first; sort is stable for everything else
+    fused_sql_results = sorted(
+        sql_results,
+        key=lambda row: -fused_scores.get(_record_key(row) if isinstance(row, dict) else None, 0.0)
+    )
+    return fused_sql_results, unique_vector_results
+
+
+def _dedupe_texts(texts: List[str]) -> Tuple[List[str], np.ndarray]:
+    """Return the distinct texts in first-seen order and each input's index into them"""
+    first_index: Dict[str, int] = {}
+    inverse = np.fromiter((first_index.setdefault(text, len(first_index)) for text in texts),
+                          dtype=np.intp, count=len(texts))
+    return list(first_index), inverse
+
+
+def _plan_embedding_batches(texts: List[str]) -> List[List[int]]:
+    """Group indexes of non-empty texts into length-sorted, token-bounded batches"""
+    pending = sorted((index for index, text in enumerate(texts) if text and text.strip()),
+                     key=lambda index: len(texts[index]))
+    batches = []
+    current_batch = []
+    current_tokens = 0
+    for index in pending:
+        approx_tokens = len(texts[index]) // 4 + 1
+        if current_batch and (current_tokens + approx_tokens > EMBED_MAX_TOKENS_PER_BATCH
+                              or len(current_batch) >= EMBED_MAX_BATCH_SIZE):
+            batches.append(current_batch)
+            current_batch = []
+            current_tokens = 0
+        current_batch.append(index)
+        current_tokens += approx_tokens
+    if current_batch:
+        batches.append(current_batch)
+    return batches
+
 class AIService:
     def __init__(self):
+        self._embedding_queue: Optional[asyncio.Queue] = None
+        self._embedding_workers: List[asyncio.Task] = []
+        self._template_cache = TTLCache(maxsize=TEMPLATE_CACHE_SIZE, ttl=TEMPLATE_CACHE_TTL)
+        # (schema name or None, normalized query) -> Gemini intent analysis / query plan
+        self._analysis_cache = TTLCache(maxsize=ANALYSIS_CACHE_SIZE, ttl=ANALYSIS_CACHE_TTL)
+        # None until the query cache collection has been looked up once
+        self._semantic_cache_ready: Optional[bool] = None
+        # prefix hash -> model bound to a Gemini cached content, or None when caching is unavailable
+        self._prefix_models = TTLCache(maxsize=PROMPT_CACHE_SIZE, ttl=PROMPT_CACHE_TTL_SECONDS - 60)
+        # Generation runs in worker threads; serialize prefix cache lookups and creation
+        self._prefix_lock = threading.Lock()
         self._setup_clients()
     
     def _setup_clients(self):
@@ -34,74 +810,71 @@ class AIService:
             print(f"⚠️ Failed to initialize Gemini: {e}")
             self.gemini_model = None
     
+    def _prefix_model(self, prefix: str) -> Tuple[str, Optional[Any]]:
+        """Model bound to a Gemini context cache holding the prompt prefix, created on first use"""
+        prefix_key = hashlib.blake2b(prefix.encode(), digest_size=16).hexdigest()
+        with self._prefix_lock:
+            if prefix_key in self._prefix_models:
+                return prefix_key, self._prefix_models[prefix_key]
+            
+            model = None
+            try:
+                from datetime import timedelta
+                cached_content = genai.caching.CachedContent.create(
+                    model=self.gemini_model.model_name,
+                    system_instruction=prefix,
+                    ttl=timedelta(seconds=PROMPT_CACHE_TTL_SECONDS)
+                )
+                model = genai.GenerativeModel.from_cached_content(cached_content=cached_content)
+                print(f"✅ Cached prompt prefix in Gemini ({prefix_key[:8]})")
+            except Exception as e:
+                # Prefixes below the model's minimum cacheable size land here; remember that until the TTL expires
+                print(f"⚠️ Prompt prefix caching unavailable, sending inline prompts: {e}")
+            self._prefix_models[prefix_key] = model
+            return prefix_key, model
+    
+    def _generate_with_prefix(self, prefix: str, suffix: str, generation_config: Optional[Dict[str, Any]] = None,
+                              stream: bool = False):
+        """Generate content for prefix + suffix, sending only the suffix when the prefix is cached"""
+        prefix_key, model = self._prefix_model(prefix)
+        if model is not None:
+            try:
+                return model.generate_content(suffix, generation_config=generation_config, stream=stream)
+            except Exception as e:
+                print(f"⚠️ Cached prompt prefix failed, falling back to inline prompt: {e}")
+                with self._prefix_lock:
+                    self._prefix_models[prefix_key] = None
+        return self.gemini_model.generate_content(prefix + suffix, generation_config=generation_config, stream=stream)
+    
+    async def _agenerate_with_prefix(self, prefix: str, suffix: str,
+                                     generation_config: Optional[Dict[str, Any]] = None):
+        """Run _generate_with_prefix in a worker thread so the blocking Gemini call does not stall the event loop"""
+        return await asyncio.to_thread(self._generate_with_prefix, prefix, suffix, generation_config)
+    
     async def analyze_query_intent(self, query: str) -> Dict[str, Any]:
         """Analyze user query to determine search strategy using AI"""
         try:
-            if not self.gemini_model:
-                return await self._enhanced_fallback_analysis(query)
-            
-            prompt = f"""
-            You are a forensic data analysis expert. Analyze this query and determine the best search approach.
-
-            QUERY: "{query}"
-
-            CLASSIFICATION RULES:
-            
-            **SQL-ONLY QUERIES** (Simple, direct data retrieval):
-            - "How many [records] are there?" → Count queries
-            - "Show me all [specific table] of [app]" → Direct table queries
-            - "Show all [data_type]" → Simple listing queries
-            - "List all [specific items]" → Direct enumeration
-            - "Find [specific field] = [value]" → Exact match queries
-            - "Show [data_type] from [app]" → App-specific queries
-            - "Display all [foreign/international] contacts" → Filtered queries
-            
-            **SEMANTIC-ONLY QUERIES** (Complex, contextual analysis):
-            - "Show suspicious conversations" → Contextual analysis needed
-            - "Find criminal activities" → Pattern recognition required
-            - "Find evidence of [complex behavior]" → Behavioral analysis
-            - "Find conversations about [complex topic]" → Semantic understanding
-            - "Show me suspicious communications" → Enhanced suspicious detection
-            - "Find illegal activities" → Criminal pattern analysis
-            - "Show dangerous conversations" → Threat assessment
-            - "Find fraudulent messages" → Financial crime detection
-            
-            **GRAPH-ONLY QUERIES** (Network/relationship analysis):
-            - "Show relationships between people" → Network analysis
-            - "Find connections between contacts" → Graph traversal
-            - "Analyze communication patterns" → Network analysis
-            - "Show people he is related with" → Relationship mapping
-            - "Who are the most connected people" → Centrality analysis
-            - "Find shortest path between contacts" → Graph algorithms
-            
-            **HYBRID QUERIES** (Need both approaches):
-            - "Find WhatsApp messages about meetings" → SQL for WhatsApp + semantic for meetings
-            - "Show suspicious calls from yesterday" → SQL for calls + semantic for suspicious
-            
-            DECISION PROCESS:
-            1. Can this be answered with a simple SQL query? → SQL_ONLY
-            2. Does this require understanding context/meaning? → SEMANTIC_ONLY  
-            3. Does this involve relationships/connections/network analysis? → GRAPH_ONLY
-            4. Does this need both direct data + context? → HYBRID
-            
-            Return JSON format:
-            {{
-                "search_approach": "sql_only|semantic_only|graph_only|hybrid",
-                "reasoning": "Brief explanation of why this approach was chosen",
-                "target_data": ["chat_records", "call_records", "contacts", "media_files", "device_info"],
-                "query_type": "count|list|search|analyze|relationship|network",
-                "complexity": "simple|moderate|complex",
-                "confidence": 0.9
-            }}
-            """
-            
-            response = self.gemini_model.generate_content(prompt)
+            # Trivial queries are fully answered by the rule-based analyzer
+            rule_analysis = await self._enhanced_fallback_analysis(query)
+            if not self.gemini_model or rule_analysis.get("confidence", 0) >= RULE_GATE_CONFIDENCE:
+                return rule_analysis
+            
+            cache_key = (None, _normalize_query(query))
+            cached_analysis = self._analysis_cache.get(cache_key)
+            if cached_analysis is not None:
+                print(f"⚡ Query analysis cache hit: {cached_analysis.get('search_approach')}")
+                return dict(cached_analysis)
+            
+            response = await self._agenerate_with_prefix(
+                _INTENT_PREFIX, _INTENT_QUERY.substitute(query=query), _INTENT_GENERATION_CONFIG
+            )
             if response and response.text:
                 try:
-                    analysis = json.loads(response.text.strip())
+                    analysis = _parse_llm_json(response.text)
                     print(f"🧠 AI Query Analysis: {analysis}")
+                    self._analysis_cache[cache_key] = dict(analysis)
                     return analysis
-                except json.JSONDecodeError:
+                except ValueError:
                     print("⚠️ Failed to parse AI response, using fallback")
                     return await self._enhanced_fallback_analysis(query)
             else:
@@ -115,30 +888,99 @@ class AIService:
                 print(f"❌ Error in AI query analysis: {e}")
             return await self._enhanced_fallback_analysis(query)
     
+    async def analyze_and_plan(self, query: str, case_number: Optional[str] = None) -> Dict[str, Any]:
+        """Classify the query and draft its SQL/Cypher in a single Gemini round-trip"""
+        try:
+            rule_analysis = await self._enhanced_fallback_analysis(query)
+            if rule_analysis.get("confidence", 0) >= RULE_GATE_CONFIDENCE:
+                print(f"⚡ Rule-based analysis is confident, skipping LLM planning: {rule_analysis['query_type']}")
+                return rule_analysis
+            
+            if not self.gemini_model or not case_number:
+                return await self.analyze_query_intent(query)
+            
+            from app.services.case_manager import case_manager
+            names = case_manager.get_case_names(case_number)
+            if not names:
+                return await self.analyze_query_intent(query)
+            
+            schema_name = names.schema
+            person_label = names.person_label
+            
+            cache_key = (schema_name, _normalize_query(query))
+            cached_plan = self._analysis_cache.get(cache_key)
+            if cached_plan is not None:
+                print(f"⚡ Query plan cache hit: {cached_plan.get('search_approach')}")
+                return dict(cached_plan)
+            
+            schema_info = await self._get_dynamic_schema_info(case_number)
+            prefix = _PLAN_PREFIX.substitute(schema_info=schema_info, schema_name=schema_name, person_label=person_label)
+            response = await self._agenerate_with_prefix(prefix, _PLAN_QUERY.substitute(query=query), _PLAN_GENERATION_CONFIG)
+            if not response or not response.text:
+                return await self.analyze_query_intent(query)
+            
+            try:
+                plan = _parse_llm_json(response.text)
+            except ValueError:
+                print("⚠️ Failed to parse AI query plan, using per-call analysis")
+                return await self.analyze_query_intent(query)
+            
+            sql_query = (plan.get("sql") or "").strip()
+            plan["sql"] = sql_query if sql_query.upper().startswith("SELECT") else None
+            cypher_query = (plan.get("cypher") or "").strip()
+            plan["cypher"] = cypher_query if cypher_query.upper().startswith("MATCH") else None
+            
+            print(f"🧠 AI Query Plan: {plan.get('search_approach')} (sql: {bool(plan['sql'])}, cypher: {bool(plan['cypher'])})")
+            self._analysis_cache[cache_key] = dict(plan)
+            return plan
+            
+        except Exception as e:
+            error_str = str(e)
+            if "quota" in error_str.lower() or "429" in error_str:
+                print("⚠️ Gemini API quota exceeded for query planning, using fallback analysis")
+                return await self._enhanced_fallback_analysis(query)
+            print(f"❌ Error in AI query planning: {e}")
+            return await self.analyze_query_intent(query)
+    
     async def _enhanced_fallback_analysis(self, query: str) -> Dict[str, Any]:
         """Enhanced fallback analysis with better intent detection"""
-        query_lower = query.lower()
+        # Known query shapes map straight onto a canned statement, so neither analysis nor SQL needs Gemini
+        pattern_match = _match_query_pattern(query)
+        if pattern_match:
+            query_type, table, _, _ = pattern_match
+            return {
+                "search_approach": "sql_only",
+                "reasoning": "Known query pattern - answered by a canned SQL template",
+                "target_data": [table],
+                "query_type": query_type,
+                "complexity": "simple",
+                "confidence": 1.0
+            }
+        
+        tags = _intent_tags(query.lower())
         
         # Simple pattern-based classification
-        if any(word in query_lower for word in ["how many", "count", "total", "number of", "evidence", "evidences"]):
+        if "explicit_count" in tags or "implicit_count" in tags:
+            # Explicit counting phrases are unambiguous; "total"/"evidence" alone are not
+            explicit_count = "explicit_count" in tags
             return {
                 "search_approach": "sql_only",
                 "reasoning": "Count query - can be answered with SQL",
                 "target_data": ["chat_records", "call_records", "contacts", "media_files"],
                 "query_type": "count",
                 "complexity": "simple",
-                "confidence": 0.8
+                "confidence": 0.9 if explicit_count else 0.8
             }
-        elif any(word in query_lower for word in ["show all", "list all", "display all", "all chats", "all messages", "all contacts", "all calls", "all media", "all files"]):
+        elif "list" in tags:
             return {
                 "search_approach": "sql_only",
                 "reasoning": "Simple listing query - can be answered with SQL",
                 "target_data": ["chat_records", "call_records", "contacts", "media_files"],
                 "query_type": "list",
                 "complexity": "simple",
-                "confidence": 0.8
+                "confidence": 0.9
             }
-        elif any(word in query_lower for word in ["suspicious", "criminal", "illegal", "related with", "relationships", "patterns", "analyze"]):
+        elif "analyze" in tags:
             return {
                 "search_approach": "semantic_only",
                 "reasoning": "Complex contextual query - requires semantic understanding",
@@ -195,64 +1037,20 @@ class AIService:
                 schema_name = f"case_{safe_case_name}"
         
         # Create comprehensive prompt with full context
-        contextual_prompt = f"""
-        You are an expert forensic data analyst. Generate a PostgreSQL query based on the user's natural language request.
-
-        DATABASE SCHEMA AND DATA CONTEXT:
-        {schema_info}
-
-        USER QUERY: "{query}"
-
-        INSTRUCTIONS:
-        1. Analyze the user's query to understand what they want to find
-        2. Use the actual table names, column names, and data types from the schema above
-        3. Generate a PostgreSQL SELECT query that will return the requested data
-        4. Use schema-qualified table names: {schema_name}.table_name
-        5. Use appropriate WHERE clauses based on the user's intent
-        6. Use ILIKE for case-insensitive text search when needed
-        7. Use LIMIT 50 for performance
-        8. Order results by relevance (timestamp DESC for time-based data)
-
-        EXAMPLES OF QUERY PATTERNS:
-        - "show all messages" → SELECT * FROM {schema_name}.chat_records ORDER BY timestamp DESC LIMIT 50
-        - "show all whatsapp messages" → SELECT * FROM {schema_name}.chat_records WHERE LOWER(app_name) = 'whatsapp' ORDER BY timestamp DESC LIMIT 50
-        - "find messages about money" → SELECT * FROM {schema_name}.chat_records WHERE LOWER(message_content) ILIKE '%money%' ORDER BY timestamp DESC LIMIT 50
-        - "show all contacts" → SELECT * FROM {schema_name}.contacts ORDER BY name LIMIT 50
-        - "find calls to +1234567890" → SELECT * FROM {schema_name}.call_records WHERE caller_number LIKE '%1234567890%' OR receiver_number LIKE '%1234567890%' ORDER BY timestamp DESC LIMIT 50
-
-        CRITICAL RULES:
-        - Return ONLY a SELECT statement
-        - Use actual column names from the schema
-        - Use schema-qualified table names
-        - Handle app-specific queries by filtering on app_name column
-        - Handle content searches using ILIKE on message_content
-        - Handle phone number searches on caller_number/receiver_number columns
-        - For "show all" queries, don't use WHERE clauses unless filtering by app or specific criteria
-
-        Generate the most appropriate SQL query for: "{query}"
-        """
+        prefix = _SQL_PREFIX.substitute(schema_info=schema_info, schema_name=schema_name)
         
         try:
             if not self.gemini_model:
                 print("⚠️ Gemini model not available for contextual SQL generation")
                 return ""
                 
-            response = self.gemini_model.generate_content(contextual_prompt)
+            response = await self._agenerate_with_prefix(prefix, _SQL_QUERY.substitute(query=query))
             if not response or not response.text:
                 print("⚠️ Empty response from Gemini for contextual SQL generation")
                 return ""
                 
-            sql_query = response.text.strip()
-            
             # Clean up the response to extract just the SQL
-            if sql_query.startswith('```sql'):
-                sql_query = sql_query[6:]
-            elif sql_query.startswith('```'):
-                sql_query = sql_query[3:]
-            if sql_query.endswith('```'):
-                sql_query = sql_query[:-3]
-            
-            sql_query = sql_query.strip()
+            sql_query = _extract_sql(response.text)
             
             # Basic validation
             if not sql_query or len(sql_query) < 10:
@@ -275,12 +1073,104 @@ class AIService:
                 print(f"❌ Error generating contextual SQL query: {e}")
             return ""
 
-    def _generate_cache_key(self, query: str, case_number: str) -> str:
-        """Generate consistent cache key for query and case"""
-        key_string = f"{query.lower().strip()}_{case_number}"
-        return hashlib.md5(key_string.encode()).hexdigest()
+    def _generate_cache_key(self, query: str, case_number: str, page: int = 0, page_size: int = DEFAULT_PAGE_SIZE) -> str:
+        """Generate consistent cache key for query, case and result page"""
+        return _query_cache_key(query, case_number, page, page_size)
 
-    async def execute_hybrid_search(self, query: str, case_number: Optional[str] = None) -> Dict[str, Any]:
+    async def _semantic_cache_lookup(self, query: str, query_vector: Optional[np.ndarray], case_number: str,
+                                     page: int, page_size: int) -> Optional[Dict[str, Any]]:
+        """Return the cached response of a previously answered paraphrase of this query, if any"""
+        from app.services.vector_service import vector_service
+        from qdrant_client.models import Filter, FieldCondition, MatchValue
+        
+        client = vector_service.qdrant_client
+        if query_vector is None or not client:
+            return None
+        
+        if self._semantic_cache_ready is None:
+            try:
+                await asyncio.to_thread(client.get_collection, SEMANTIC_CACHE_COLLECTION)
+                self._semantic_cache_ready = True
+            except Exception:
+                self._semantic_cache_ready = False
+        if not self._semantic_cache_ready:
+            return None
+        
+        try:
+            hits = await asyncio.to_thread(
+                client.search,
+                collection_name=SEMANTIC_CACHE_COLLECTION,
+                query_vector=query_vector.tolist(),
+                limit=1,
+                score_threshold=SEMANTIC_CACHE_GREY_THRESHOLD,
+                query_filter=Filter(must=[
+                    FieldCondition(key="case_number", match=MatchValue(value=case_number)),
+                    FieldCondition(key="page", match=MatchValue(value=page)),
+                    FieldCondition(key="page_size", match=MatchValue(value=page_size))
+                ])
+            )
+        except Exception as e:
+            print(f"⚠️ Semantic cache lookup failed: {e}")
+            return None
+        
+        if not hits:
+            return None
+        hit = hits[0]
+        cached_query = hit.payload.get("query", "")
+        if sorted(_ENTITY_PATTERN.findall(query.lower())) != sorted(_ENTITY_PATTERN.findall(cached_query.lower())):
+            return None
+        
+        if hit.score < SEMANTIC_CACHE_THRESHOLD:
+            # Grey zone: "WhatsApp chats" and "Telegram chats" embed close together, so the content words
+            # must match, and the cheap rule-based analyzer must classify both queries the same way
+            if _content_words(query) != _content_words(cached_query):
+                return None
+            ours = await self._enhanced_fallback_analysis(query)
+            theirs = await self._enhanced_fallback_analysis(cached_query)
+            if (ours["query_type"], ours["search_approach"]) != (theirs["query_type"], theirs["search_approach"]):
+                return None
+        
+        cached_result = db_manager.get_cached_result(hit.payload.get("cache_key", ""))
+        if cached_result:
+            print(f"✅ Semantic cache hit ({hit.score:.3f}) for query: {query} ~ {cached_query}")
+        return cached_result
+    
+    def _semantic_cache_store(self, query: str, query_vector: Optional[np.ndarray], case_number: str,
+                              page: int, page_size: int, cache_key: str):
+        """Index the query embedding so paraphrases can find the cached response"""
+        from app.services.vector_service import vector_service
+        from qdrant_client.models import Distance, VectorParams, PointStruct
+        
+        client = vector_service.qdrant_client
+        if query_vector is None or not client:
+            return
+        
+        try:
+            if not self._semantic_cache_ready:
+                try:
+                    client.get_collection(SEMANTIC_CACHE_COLLECTION)
+                except Exception:
+                    client.create_collection(
+                        collection_name=SEMANTIC_CACHE_COLLECTION,
+                        vectors_config=VectorParams(size=len(query_vector), distance=Distance.COSINE)
+                    )
+                self._semantic_cache_ready = True
+            
+            # One point per cache key, so re-caching the same query overwrites instead of piling up
+            client.upsert(
+                collection_name=SEMANTIC_CACHE_COLLECTION,
+                points=[PointStruct(
+                    id=str(uuid.uuid5(uuid.NAMESPACE_URL, cache_key)),
+                    vector=query_vector.tolist(),
+                    payload={"query": query, "cache_key": cache_key, "case_number": case_number,
+                             "page": page, "page_size": page_size}
+                )]
+            )
+        except Exception as e:
+            print(f"⚠️ Semantic cache store failed: {e}")
+    
+    async def execute_hybrid_search(self, query: str, case_number: Optional[str] = None,
+                                    page: int = 0, page_size: int = DEFAULT_PAGE_SIZE) -> Dict[str, Any]:
         """Execute intelligent search with dynamic routing based on query complexity"""
         
         print(f"🔍 Starting dynamic search for: {query} (Case: {case_number})")
@@ -289,17 +1179,28 @@ class AIService:
             # Store case number for use in response generation
             self._current_case_number = case_number
             
-            # Check cache first if case number is provided
+            # Check cache first if case number is provided; the key is computed once per request
+            cache_key = self._generate_cache_key(query, case_number, page, page_size) if case_number else None
             if case_number:
-                cache_key = self._generate_cache_key(query, case_number)
                 cached_result = db_manager.get_cached_result(cache_key)
                 if cached_result:
                     print(f"✅ Cache hit for query: {query}")
                     return cached_result
                 print(f"❌ Cache miss for query: {query}")
             
-            # Step 1: Analyze query to determine search approach
-            analysis = await self.analyze_query_intent(query)
+            # Then look for a cached answer to a paraphrase of this query; the embedding is reused by
+            # the vector search below
+            query_vector = None
+            use_semantic_cache = bool(case_number) and settings.semantic_cache_enabled
+            if use_semantic_cache:
+                query_vectors = await self.generate_embeddings_matrix([query])
+                query_vector = query_vectors[0] if len(query_vectors) else None
+                cached_result = await self._semantic_cache_lookup(query, query_vector, case_number, page, page_size)
+                if cached_result:
+                    return cached_result
+            
+            # Step 1: Analyze query and draft SQL/Cypher in a single LLM call
+            analysis = await self.analyze_and_plan(query, case_number)
             search_approach = analysis.get("search_approach", "hybrid")
             reasoning = analysis.get("reasoning", "No reasoning provided")
             
@@ -315,20 +1216,32 @@ class AIService:
             # Step 2: Execute search based on analysis
             if search_approach == "sql_only":
                 print(f"📊 Using SQL-only approach for simple query")
-                raw_data["sql_results"] = await self._execute_sql_only_search(query, case_number)
+                raw_data["sql_results"] = await self._execute_sql_only_search(query, case_number, analysis, page, page_size)
                 
             elif search_approach == "semantic_only":
                 print(f"🔍 Using semantic-only approach for complex query")
-                raw_data["vector_results"] = await self._execute_semantic_only_search(query, case_number)
+                raw_data["vector_results"] = await self._execute_semantic_only_search(query, case_number, query_vector)
                 
             elif search_approach == "graph_only":
                 print(f"🕸️ Using graph-only approach for relationship query")
-                raw_data["graph_results"] = await self._execute_graph_only_search(query, case_number)
+                raw_data["graph_results"] = await self._execute_graph_only_search(query, case_number, analysis.get("cypher"))
                 
             elif search_approach == "hybrid":
                 print(f"🔄 Using hybrid approach for mixed query")
-                raw_data["sql_results"] = await self._execute_sql_only_search(query, case_number)
-                raw_data["vector_results"] = await self._execute_semantic_only_search(query, case_number)
+                # Postgres and Qdrant are independent backends - query them concurrently
+                search_tasks = {
+                    "sql_results": self._execute_sql_only_search(query, case_number, analysis, page, page_size),
+                    "vector_results": self._execute_semantic_only_search(query, case_number, query_vector)
+                }
+                task_results = await asyncio.gather(*search_tasks.values(), return_exceptions=True)
+                for result_key, task_result in zip(search_tasks.keys(), task_results):
+                    if isinstance(task_result, Exception):
+                        print(f"⚠️ Hybrid {result_key} search failed: {task_result}")
+                        continue
+                    raw_data[result_key] = task_result
+                raw_data["sql_results"], raw_data["vector_results"] = _fuse_hybrid_results(
+                    raw_data["sql_results"], raw_data["vector_results"]
+                )
             
             # Step 3: Generate human-readable response using LLM with all fetched data
             if raw_data["sql_results"] or raw_data["vector_results"] or raw_data.get("graph_results"):
@@ -346,6 +1259,8 @@ class AIService:
                     "success": True,
                     "search_approach": search_approach,
                     "reasoning": reasoning,
+                    "page": page,
+                    "page_size": page_size,
                     "data_sources": {
                         "sql_results_count": len(raw_data["sql_results"]),
                         "vector_results_count": len(raw_data["vector_results"]),
@@ -355,8 +1270,9 @@ class AIService:
                 
                 # Cache successful results
                 if case_number:
-                    cache_key = self._generate_cache_key(query, case_number)
                     db_manager.cache_query_result(cache_key, response_data, ttl=3600)
+                    if use_semantic_cache:
+                        await asyncio.to_thread(self._semantic_cache_store, query, query_vector, case_number, page, page_size, cache_key)
                     print(f"💾 Cached result for query: {query}")
                 
                 return response_data
@@ -373,8 +1289,9 @@ class AIService:
                 
                 # Cache empty results to avoid repeated processing
                 if case_number:
-                    cache_key = self._generate_cache_key(query, case_number)
                     db_manager.cache_query_result(cache_key, response_data, ttl=300)  # Shorter TTL for empty results
+                    if use_semantic_cache:
+                        await asyncio.to_thread(self._semantic_cache_store, query, query_vector, case_number, page, page_size, cache_key)
                     print(f"💾 Cached empty result for query: {query}")
                 
                 return response_data
@@ -391,20 +1308,50 @@ class AIService:
                 "data_sources": {"sql_results_count": 0, "vector_results_count": 0, "graph_results_count": 0}
             }
 
-    async def _execute_sql_only_search(self, query: str, case_number: Optional[str] = None) -> List[Dict[str, Any]]:
+    async def _execute_sql_only_search(self, query: str, case_number: Optional[str] = None, analysis: Optional[Dict[str, Any]] = None,
+                                       page: int = 0, page_size: int = DEFAULT_PAGE_SIZE) -> List[Dict[str, Any]]:
         """Execute SQL-only search for simple queries"""
         if not case_number:
             print("❌ No case number provided for SQL search")
             return []
         
         try:
-            # Get schema info and generate SQL
-            schema_info = await self._get_dynamic_schema_info(case_number)
-            generated_sql = await self._generate_contextual_sql(query, schema_info, case_number)
+            from app.services.case_manager import case_manager
+            analysis = analysis or {}
+            
+            # Resolve the case schema once and hand it to every statement of this search
+            schema_name = case_manager.get_schema_name(case_number)
+            
+            # Canned count/list requests need no LLM at all
+            if schema_name and analysis.get("query_type") in ("count", "list", "search"):
+                template = self._template_sql(query, analysis, schema_name, page, page_size)
+                if template:
+                    template_sql, template_params = template
+                    cache_key = (schema_name, template_sql, tuple(sorted(template_params.items())))
+                    cached_results = self._template_cache.get(cache_key)
+                    if cached_results is not None:
+                        print(f"⚡ SQL template cache hit: {template_sql}")
+                        return list(cached_results)
+                    
+                    print(f"📐 SQL template search: {template_sql}")
+                    results = await self._execute_generated_sql(template_sql, case_number, template_params, schema_name=schema_name)
+                    if analysis.get("query_type") == "count":
+                        results = _count_results(results)
+                    print(f"📊 SQL template search found {len(results)} results")
+                    if results:
+                        self._template_cache[cache_key] = list(results)
+                    return results
+            
+            # Reuse SQL drafted by the query planner, otherwise generate it now
+            generated_sql = analysis.get("sql")
+            if not generated_sql:
+                schema_info = await self._get_dynamic_schema_info(case_number)
+                generated_sql = await self._generate_contextual_sql(query, schema_info, case_number)
             
             if generated_sql:
                 print(f"🤖 SQL-only search: {generated_sql}")
-                results = await self._execute_generated_sql(generated_sql, case_number)
+                results = await self._execute_generated_sql(generated_sql, case_number, page=page, page_size=page_size,
+                                                           schema_name=schema_name)
                 print(f"📊 SQL search found {len(results)} results")
                 return results
             else:
@@ -415,7 +1362,8 @@ class AIService:
             print(f"❌ Error in SQL-only search: {e}")
             return []
 
-    async def _execute_semantic_only_search(self, query: str, case_number: Optional[str] = None) -> List[Dict[str, Any]]:
+    async def _execute_semantic_only_search(self, query: str, case_number: Optional[str] = None,
+                                            query_vector: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
         """Execute semantic-only search for complex queries"""
         if not case_number:
             print("❌ No case number provided for semantic search")
@@ -430,19 +1378,17 @@ class AIService:
                 return []
             
             # Get case-specific collection
-            case_info = case_manager.get_case_info(case_number)
-            if not case_info:
+            names = case_manager.get_case_names(case_number)
+            if not names:
                 print(f"❌ Case {case_number} not found")
                 return []
             
-            safe_case_name = case_info["safe_case_name"]
-            collection_name = f"case_{safe_case_name}"
+            collection_name = names.collection
             
-            # Check if this is a suspicious conversation query
-            query_lower = query.lower()
-            suspicious_keywords = ["suspicious", "criminal", "illegal", "threat", "dangerous", "fraud", "scam"]
+            # Check if this is a suspicious conversation query (one tokenization, set intersections)
+            query_tokens = frozenset(_WORD_PATTERN.findall(query.lower()))
             
-            if any(keyword in query_lower for keyword in suspicious_keywords):
+            if query_tokens & _SUSPICIOUS_QUERY_WORDS:
                 print(f"🔍 Enhanced suspicious conversation search in collection: {collection_name}")
                 results = await vector_service.find_suspicious_conversations(
                     case_id=case_number,
@@ -452,35 +1398,10 @@ class AIService:
                 print(f"🔍 Standard semantic search in collection: {collection_name}")
                 # Dynamically narrow result types based on the user's intent
                 # Prefer chats for message-style queries, calls for call-style queries, etc.
-                query_lower = query.lower()
-
-                inferred_types = []
-
-                # Prefer chat messages when user asks about messages/chats/apps
-                chat_indicators = [
-                    "message", "messages", "chat", "chats", "whatsapp", "telegram",
-                    "signal", "imessage", "sms"
-                ]
-                if any(word in query_lower for word in chat_indicators):
-                    inferred_types.append("chat_record")
-
-                # Prefer calls when user asks about calls/phone calls
-                call_indicators = ["call", "calls", "phone call", "phone calls"]
-                if any(word in query_lower for word in call_indicators):
-                    inferred_types.append("call_record")
-
-                # Prefer contacts when user mentions contacts/people
-                contact_indicators = ["contact", "contacts", "people", "person"]
-                if any(word in query_lower for word in contact_indicators):
-                    inferred_types.append("contact")
-
-                # Prefer files/media when user explicitly mentions files/media types
-                media_indicators = [
-                    "file", "files", "media", "image", "images", "photo", "photos",
-                    "video", "videos", "audio", "document", "pdf", "doc", "xlsx"
+                inferred_types = [
+                    data_type for data_type, indicator_words in _SEMANTIC_TYPE_WORDS.items()
+                    if query_tokens & indicator_words
                 ]
-                if any(word in query_lower for word in media_indicators):
-                    inferred_types.append("media_file")
 
                 # If nothing inferred, default to non-media records to avoid noisy file hits
                 if not inferred_types:
@@ -491,7 +1412,8 @@ class AIService:
                     query=query,
                     collection_name=collection_name,
                     data_types=inferred_types,
-                    limit=20
+                    limit=20,
+                    query_vector=query_vector.tolist() if query_vector is not None else None
                 )
             
             print(f"📊 Semantic search found {len(results)} results")
@@ -501,7 +1423,7 @@ class AIService:
             print(f"❌ Error in semantic-only search: {e}")
             return []
     
-    async def _execute_graph_only_search(self, query: str, case_number: Optional[str] = None) -> List[Dict[str, Any]]:
+    async def _execute_graph_only_search(self, query: str, case_number: Optional[str] = None, planned_cypher: Optional[str] = None) -> List[Dict[str, Any]]:
         """Execute graph-based search using Neo4j for relationship queries"""
         try:
             from app.repositories.neo4j_repository import neo4j_repo
@@ -512,13 +1434,25 @@ class AIService:
                 return []
             
             # Get case info to determine the correct label pattern
-            case_info = case_manager.get_case_info(case_number)
-            if not case_info:
+            names = case_manager.get_case_names(case_number)
+            if not names:
                 print(f"❌ Case {case_number} not found for graph search")
                 return []
             
-            safe_case_name = case_info["safe_case_name"]
-            person_label = f'Person_{safe_case_name}'
+            person_label = names.person_label
+            
+            # Prefer the Cypher drafted by the query planner when it stays inside this case; it runs in a
+            # read transaction, so the server refuses any write instead of a keyword check guessing
+            if planned_cypher and _is_case_scoped_cypher(planned_cypher, person_label):
+                try:
+                    planned_results = await neo4j_repo.execute_cypher_read(planned_cypher, {"case_id": names.safe})
+                    if planned_results:
+                        print(f"🕸️ Planned Cypher returned {len(planned_results)} records")
+                        return [{"type": "cypher_result", "record": record, "score": 1.0} for record in planned_results]
+                except Exception as e:
+                    print(f"⚠️ Planned Cypher failed, using rule-based graph search: {e}")
+            elif planned_cypher:
+                print(f"🚫 Planned Cypher not scoped to case {case_number}, using rule-based graph search")
             
             # Analyze query to determine graph operation
             query_lower = query.lower()
@@ -606,69 +1540,196 @@ class AIService:
 
     async def _execute_sql_search(self, query: str, analysis: Dict[str, Any], case_number: Optional[str] = None) -> List[Dict[str, Any]]:
         """Execute SQL search using LLM-generated queries - DEPRECATED, use _execute_sql_only_search"""
-        return await self._execute_sql_only_search(query, case_number)
+        return await self._execute_sql_only_search(query, case_number, analysis)
+
+    def _template_sql(self, query: str, analysis: Dict[str, Any], schema_name: str,
+                      page: int = 0, page_size: int = DEFAULT_PAGE_SIZE) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Build parameterized SQL for count / list-all / top-N / contact lookups, or None if the query needs the LLM"""
+        pattern_match = _match_query_pattern(query)
+        if pattern_match:
+            _, _, pattern_sql, pattern_params = pattern_match
+            return pattern_sql, {**pattern_params, **_page_params(min(TEMPLATE_DEFAULT_LIMIT, page_size), page)}
+        
+        query_tokens = _WORD_PATTERN.findall(query.lower())
+        tables = [table for table, words in _TEMPLATE_TABLE_WORDS.items() if words.intersection(query_tokens)]
+        table_words = frozenset().union(*(_TEMPLATE_TABLE_WORDS[table] for table in tables))
+        query_type = analysis.get("query_type")
+        
+        # A contact lookup by phone number or email hits the jsonb_path_ops index via containment
+        if tables == ["contacts"] and query_type in ("list", "search"):
+            contact_sql = self._contact_lookup_sql(query)
+            if contact_sql:
+                lookup_sql, lookup_value = contact_sql
+                return lookup_sql, {"value": lookup_value, **_page_params(min(TEMPLATE_DEFAULT_LIMIT, page_size), page)}
+        
+        # "messages about X" / "contacts named Y" is a plain keyword search over the indexed columns
+        if query_type == "search":
+            keyword_sql = self._keyword_search_sql(query_tokens, tables, table_words)
+            if keyword_sql:
+                search_sql, search_terms = keyword_sql
+                return search_sql, {"terms": search_terms, "pattern": f"%{search_terms}%",
+                                    **_page_params(min(TEMPLATE_DEFAULT_LIMIT, page_size), page)}
+        
+        # Any word that is not a table name, a number or filler is a filter for the LLM to handle
+        limit = TEMPLATE_DEFAULT_LIMIT
+        for token in query_tokens:
+            if token.isdigit():
+                limit = min(int(token), TEMPLATE_DEFAULT_LIMIT)
+            elif token not in table_words and token not in _TEMPLATE_FILLER_WORDS:
+                return None
+        
+        if query_type == "count":
+            if not tables:
+                tables = [table for table in analysis.get("target_data", []) if table in _TEMPLATE_TABLE_WORDS]
+            if not tables:
+                return None
+            # Answers show counts as totals, so they are exact; planner estimates only feed the LLM context
+            return count_rollup_sql(schema_name, tuple(tables)), {}
+        
+        if query_type == "list" and tables:
+            list_params = _page_params(min(limit, page_size), page)
+            if len(tables) > 1:
+                # Several "show all" listings come back in one round trip
+                return list_union_sql(tuple(tables)), list_params
+            table = tables[0]
+            # Unqualified so every case shares one statement; the schema comes from search_path
+            list_sql = f"SELECT * FROM {table} ORDER BY {_TEMPLATE_ORDER_BY[table]} LIMIT :limit OFFSET :offset"
+            return list_sql, list_params
+        
+        return None
     
-    async def _execute_generated_sql(self, sql_query: str, case_number: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Execute LLM-generated SQL query safely"""
-        try:
-            from app.models.database import get_db
-            from sqlalchemy import text
-            
-            if not sql_query or not sql_query.strip():
-                print("⚠️ Empty SQL query provided")
-                return []
-            
-            # Strict SQL injection protection - check for dangerous keywords at statement level
-            dangerous_keywords = ['DROP', 'DELETE', 'UPDATE', 'INSERT', 'ALTER', 'TRUNCATE', 'CREATE']
-            sql_upper = sql_query.upper().strip()
-            
-            # Check if query starts with dangerous keywords (not just contains them)
-            for keyword in dangerous_keywords:
-                if sql_upper.startswith(keyword):
-                    print(f"🚫 Dangerous SQL keyword detected at start: {keyword}")
-                    return []
-            
-            # Additional check: look for dangerous keywords as complete statements
-            # Split by semicolons and check each statement
-            statements = [stmt.strip() for stmt in sql_query.split(';') if stmt.strip()]
-            for statement in statements:
-                statement_upper = statement.upper().strip()
-                for keyword in dangerous_keywords:
-                    if statement_upper.startswith(keyword):
-                        print(f"🚫 Dangerous SQL keyword detected in statement: {keyword}")
-                        print(f"🔍 Problematic statement: {statement}")
-                        return []
-            
-            print(f"🔍 SQL validation passed, executing query...")
-            
-            db = next(get_db())
-            results = []
-            
+    def _keyword_search_sql(self, query_tokens: List[str], tables: List[str],
+                            table_words: frozenset) -> Optional[Tuple[str, str]]:
+        """Single UNION ALL keyword search for the terms after an "about"/"named"-style marker, if any"""
+        marker_index = next((index for index, token in enumerate(query_tokens) if token in _TEMPLATE_KEYWORD_MARKERS), None)
+        if marker_index is None:
+            return None
+        
+        # Anything else before the marker (dates, senders, apps) is a filter for the LLM to handle
+        for token in query_tokens[:marker_index]:
+            if token not in table_words and token not in _TEMPLATE_FILLER_WORDS and token not in _TEMPLATE_SEARCH_WORDS:
+                return None
+        
+        search_terms = [
+            token for token in query_tokens[marker_index + 1:]
+            if token not in table_words and token not in _TEMPLATE_FILLER_WORDS
+        ]
+        if not search_terms:
+            return None
+        
+        search_tables = tuple(tables) if tables else _TEMPLATE_SEARCH_DEFAULT_TABLES
+        return search_union_sql(search_tables), " ".join(search_terms)
+    
+    def _contact_lookup_sql(self, query: str) -> Optional[Tuple[str, str]]:
+        """Containment query for a phone number or email mentioned in the query, if any"""
+        email_match = _EMAIL_PATTERN.search(query)
+        if email_match:
+            column, value = "email_addresses", email_match.group(0)
+        else:
+            phone_match = _PHONE_PATTERN.search(query)
+            if not phone_match:
+                return None
+            column, value = "phone_numbers", phone_match.group(0)
+        lookup_sql = f"SELECT * FROM contacts WHERE {column} @> to_jsonb(CAST(:value AS text)) ORDER BY name LIMIT :limit OFFSET :offset"
+        return lookup_sql, value
+    
+    def invalidate_query_cache(self, schema_name: str):
+        """Drop cached template results for a case schema after new data is ingested"""
+        stale_keys = [key for key in list(self._template_cache.keys()) if key[0] == schema_name]
+        for key in stale_keys:
+            self._template_cache.pop(key, None)
+        # Query plans embed the schema summary (row counts), so re-plan after ingestion too
+        for key in [key for key in list(self._analysis_cache.keys()) if key[0] == schema_name]:
+            self._analysis_cache.pop(key, None)
+        if stale_keys:
+            print(f"🧹 Cleared {len(stale_keys)} cached queries for {schema_name}")
+    
+    def _run_read_query(self, sql_query: str, params: Optional[Dict[str, Any]], schema_name: Optional[str],
+                        page: int, page_size: Optional[int]) -> List[Dict[str, Any]]:
+        """Run a validated read query on a pooled read-only session and convert the rows"""
+        from app.models.database import ReadOnlySessionLocal
+        
+        results = []
+        # The context manager always returns the connection to the pool (rolling the transaction back)
+        with ReadOnlySessionLocal() as db:
             try:
-                # Execute the query
-                query_result = db.execute(text(sql_query))
+                # Real write protection: a read-only transaction (on the read-only role when configured),
+                # which is never committed
+                db.execute(_SET_TRANSACTION_READ_ONLY)
+                
+                # Resolve unqualified table names against the case schema for this transaction only
+                if schema_name:
+                    db.execute(_SET_SEARCH_PATH, {"schema_name": schema_name})
+                
+                # Postgres skips to the requested page itself; rows stream from a server-side cursor
+                sql_query = _with_row_limit(sql_query)
+                if page_size is not None:
+                    sql_query = _paged_sql(sql_query)
+                    params = {**(params or {}), **_generated_page_params(page, page_size)}
+                query_result = db.execute(
+                    _sql_text(sql_query).execution_options(yield_per=SQL_STREAM_BATCH_SIZE),
+                    params or {}
+                )
+                rows = islice(query_result, SQL_MAX_ROWS)
+                
+                # Pick each column's converter once from the cursor metadata, not per cell
+                keys = list(query_result.keys())
+                description = getattr(getattr(query_result, "cursor", None), "description", None)
+                converters = _column_converters(description, len(keys))
+                columns = [
+                    (index, key, converters[index]) for index, key in enumerate(keys)
+                    if key not in _HIDDEN_COLUMNS and key != _UNION_RECORD_COLUMN
+                ]
+                record_index = keys.index(_UNION_RECORD_COLUMN) if _UNION_RECORD_COLUMN in keys else None
                 
                 # Convert results to list of dictionaries
-                for row in query_result:
-                    row_dict = {}
-                    for key, value in row._mapping.items():
-                        # Convert non-serializable types
-                        if hasattr(value, 'isoformat'):  # datetime objects
-                            row_dict[key] = value.isoformat()
+                for row in rows:
+                    row_dict = {key: convert(row[index]) for index, key, convert in columns}
+                    if record_index is not None:
+                        record = row[record_index]
+                        if isinstance(record, dict):
+                            # Unfold multi-table listing rows back into the table's own columns
+                            row_dict.update((record_key, _to_str(record_value)) for record_key, record_value in record.items())
                         else:
-                            row_dict[key] = str(value) if value is not None else None
+                            row_dict[_UNION_RECORD_COLUMN] = _to_str(record)
                     results.append(row_dict)
                 
+                query_result.close()
                 print(f"✅ SQL query executed successfully, returned {len(results)} rows")
                 
             except Exception as e:
                 print(f"❌ Error executing SQL query: {e}")
                 print(f"🔍 Problematic query: {sql_query}")
                 return []
-            finally:
-                db.close()
+        
+        return results
+    
+    async def _execute_generated_sql(self, sql_query: str, case_number: Optional[str] = None, params: Optional[Dict[str, Any]] = None,
+                                     page: int = 0, page_size: Optional[int] = None,
+                                     schema_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Execute LLM-generated SQL query safely"""
+        try:
+            if not sql_query or not sql_query.strip():
+                print("⚠️ Empty SQL query provided")
+                return []
             
-            return results
+            # Prefer an AST check; it also catches writes nested inside CTEs. Without sqlglot, or when it
+            # cannot parse the query, fall back to a keyword scan that fails closed
+            read_only = _is_read_only_sql(sql_query)
+            if read_only is None:
+                read_only = _passes_keyword_scan(sql_query)
+            if not read_only:
+                print(f"🚫 Non read-only SQL rejected: {sql_query}")
+                return []
+            
+            print(f"🔍 SQL validation passed, executing query...")
+            
+            if schema_name is None and case_number:
+                from app.services.case_manager import case_manager
+                schema_name = case_manager.get_schema_name(case_number)
+            
+            # The driver is blocking; run the query off the event loop
+            return await asyncio.to_thread(self._run_read_query, sql_query, params, schema_name, page, page_size)
             
         except Exception as e:
             print(f"❌ Error in SQL execution: {e}")
@@ -676,30 +1737,124 @@ class AIService:
 
     async def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
         """Generate embeddings for a list of texts using the vector service"""
+        matrix = await self.generate_embeddings_matrix(texts)
+        # Plain float lists, as annotated: callers serialize them and test them for truthiness
+        return matrix.tolist()
+
+    async def generate_embeddings_matrix(self, texts: List[str]) -> np.ndarray:
+        """Generate embeddings as a float32 matrix of shape (len(texts), dimension)"""
         try:
             from app.services.vector_service import vector_service
             
             if not vector_service.embedder:
                 print("⚠️ Vector service embedder not available")
-                return []
+                return np.empty((0, 0), dtype=np.float32)
+            
+            # Embed each distinct text once and broadcast it back to its duplicates
+            unique_texts, inverse = _dedupe_texts(texts)
+            
+            # Empty texts keep their zero row; the rest are embedded in batches
+            dimension = vector_service.get_embedding_dimension()
+            embeddings = np.zeros((len(unique_texts), dimension), dtype=np.float32)
+            batches = _plan_embedding_batches(unique_texts)
+            
+            if self._embedding_queue is not None:
+                # Hand batches to the persistent workers; the bounded queue applies backpressure
+                loop = asyncio.get_running_loop()
+                futures = []
+                for batch in batches:
+                    future = loop.create_future()
+                    await self._embedding_queue.put(([unique_texts[index] for index in batch], future))
+                    futures.append(future)
+                batch_results = await asyncio.gather(*futures)
+            else:
+                # No workers (e.g. outside the app lifespan): embed batches off the loop, a few at a time
+                semaphore = asyncio.Semaphore(EMBED_DIRECT_CONCURRENCY)
+                
+                async def embed_batch(batch: List[int]) -> List[Any]:
+                    batch_texts = [unique_texts[index] for index in batch]
+                    async with semaphore:
+                        return await asyncio.to_thread(lambda: list(vector_service.embedder.embed(batch_texts)))
+                
+                batch_results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
             
-            # Use the vector service's embedder
-            embeddings = []
-            for text in texts:
-                if text and text.strip():
-                    # Generate embedding for the text
-                    embedding = list(vector_service.embedder.embed([text]))[0]
-                    embeddings.append(embedding)
-                else:
-                    # Add zero vector for empty texts
-                    embeddings.append([0.0] * vector_service._embedding_dimension)
+            # Scatter each batch back to its unique-text rows
+            for batch, batch_vectors in zip(batches, batch_results):
+                for index, vector in zip(batch, batch_vectors):
+                    embeddings[index] = vector
             
-            print(f"✅ Generated {len(embeddings)} embeddings")
-            return embeddings
+            print(f"✅ Generated {len(texts)} embeddings ({len(unique_texts)} unique) in {len(batches)} batches")
+            return embeddings[inverse]
             
         except Exception as e:
             print(f"❌ Error generating embeddings: {e}")
-            return []
+            return np.empty((0, 0), dtype=np.float32)
+
+    async def generate_embeddings_bulk(self, texts: List[str]) -> np.ndarray:
+        """Generate embeddings for offline ingest as one float32 matrix, using data-parallel workers for large workloads"""
+        if len(texts) < EMBED_BULK_MIN_TEXTS:
+            return await self.generate_embeddings_matrix(texts)
+        
+        try:
+            from app.services.vector_service import vector_service
+            
+            if not vector_service.embedder:
+                print("⚠️ Vector service embedder not available")
+                return np.empty((0, 0), dtype=np.float32)
+            
+            unique_texts, inverse = _dedupe_texts(texts)
+            dimension = vector_service.get_embedding_dimension()
+            embeddings = np.zeros((len(unique_texts), dimension), dtype=np.float32)
+            pending = [index for index, text in enumerate(unique_texts) if text and text.strip()]
+            
+            # parallel=0 spreads the workload over one embedding process per CPU core
+            vectors = await asyncio.to_thread(lambda: list(vector_service.embedder.embed(
+                [unique_texts[index] for index in pending],
+                batch_size=EMBED_BULK_BATCH_SIZE,
+                parallel=0
+            )))
+            for index, vector in zip(pending, vectors):
+                embeddings[index] = vector
+            
+            print(f"✅ Generated {len(texts)} bulk embeddings ({len(unique_texts)} unique)")
+            return embeddings[inverse]
+            
+        except Exception as e:
+            print(f"❌ Error generating bulk embeddings: {e}")
+            return np.empty((0, 0), dtype=np.float32)
+
+    async def start_embedding_workers(self, worker_count: int = EMBED_WORKER_COUNT):
+        """Launch persistent workers that embed batches from a bounded queue"""
+        if self._embedding_workers:
+            return
+        self._embedding_queue = asyncio.Queue(maxsize=EMBED_QUEUE_SIZE)
+        self._embedding_workers = [asyncio.create_task(self._embedding_worker()) for _ in range(worker_count)]
+        print(f"✅ Started {worker_count} embedding workers")
+
+    async def stop_embedding_workers(self):
+        """Cancel the embedding workers and drop the batch queue"""
+        workers = self._embedding_workers
+        self._embedding_workers = []
+        self._embedding_queue = None
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _embedding_worker(self):
+        """Embed queued batches off the event loop and resolve their futures"""
+        from app.services.vector_service import vector_service
+        queue = self._embedding_queue
+        while True:
+            batch_texts, future = await queue.get()
+            try:
+                vectors = await asyncio.to_thread(lambda: list(vector_service.embedder.embed(batch_texts)))
+                if not future.done():
+                    future.set_result(vectors)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                queue.task_done()
 
     def _generate_basic_report(self, results: Dict[str, Any]) -> str:
         """Generate a basic report from search results"""
@@ -727,77 +1882,9 @@ class AIService:
             search_approach = analysis.get("search_approach", "unknown") if analysis else "unknown"
             query_type = analysis.get("query_type", "search") if analysis else "search"
             
-            prompt = f"""
-            You are an expert forensic data analyst. Analyze the user's query and the provided data to generate a comprehensive, accurate, and human-readable response.
-
-            USER QUERY: "{query}"
-            SEARCH APPROACH USED: {search_approach}
-            QUERY TYPE: {query_type}
-
-            AVAILABLE DATA:
-            {data_summary}
-
-            CRITICAL FORMATTING REQUIREMENTS - MUST BE FOLLOWED EXACTLY:
-            
-            FORMATTING RULE: ALL responses MUST use the structured data block format below. NO markdown, NO paragraphs, NO bullet points.
-            
-            REQUIRED FORMAT FOR ALL QUERY TYPES:
-            1. Start with a brief answer to the user's question (1-2 sentences max)
-            2. Then use ONLY the structured format below for ALL data
-            
-            STRUCTURED DATA FORMAT (MANDATORY):
-            - Use section headers: "CHAT RECORDS:", "CALL RECORDS:", "FILES:", "CONTACTS:", "SEARCH RESULTS:", "ANALYSIS RESULTS:"
-            - Use numbered lists: "1.", "2.", "3.", etc.
-            - Use pipe separators: "Field: [value] | Field: [value] | Field: [value]"
-            - Include ALL available fields for each record
-            
-            EXAMPLES OF REQUIRED FORMAT:
-            
-            For chat records:
-            CHAT RECORDS:
-            1. App: WhatsApp | From: +1234567890 | To: +0987654321 | Time: 2025-01-15 10:30:00 | Message: [full message content here]
-            2. App: Telegram | From: +1111111111 | To: +2222222222 | Time: 2025-01-15 11:45:00 | Message: [full message content here]
-            
-            For call records:
-            CALL RECORDS:
-            1. From: +1234567890 | To: +0987654321 | Duration: 120 seconds | Type: outgoing | Time: 2025-01-15 14:20:00
-            2. From: +1111111111 | To: +2222222222 | Duration: 45 seconds | Type: incoming | Time: 2025-01-15 15:30:00
-            
-            For files:
-            FILES:
-            1. File: document.pdf | Size: 2.5 MB | Type: PDF | Path: /storage/documents/ | Time: 2025-01-15 09:15:00
-            2. File: spreadsheet.xlsx | Size: 1.2 MB | Type: Excel | Path: /storage/files/ | Time: 2025-01-15 10:45:00
-            
-            For contacts:
-            CONTACTS:
-            1. Name: John Doe | Phone: +1234567890 | Email: john@example.com | Time: 2025-01-15 08:00:00
-            2. Name: Jane Smith | Phone: +0987654321 | Email: jane@example.com | Time: 2025-01-15 09:30:00
-            
-            For device information or other data:
-            DEVICE INFORMATION:
-            1. Phone Number: +1234567890 | Model: iPhone 15 Pro | Manufacturer: Apple | OS Version: iOS 17.1.1 | IMEI: 123456789012345
-            2. Extraction Date: 2025-01-15 18:20:00 | Extraction Tool: Cellebrite UFED | Case Officer: Agent Smith
-            
-            FORBIDDEN FORMATS (DO NOT USE):
-            - Markdown headers (###, ##, #)
-            - Bullet points (-, *, •)
-            - Plain paragraphs without structure
-            - Tables or other formatting
-            - Any format other than the structured format above
-            
-            MANDATORY RULES:
-            - ALWAYS use the structured format for ALL data types
-            - ALWAYS include section headers
-            - ALWAYS use numbered lists (1., 2., 3.)
-            - ALWAYS use pipe separators (|)
-            - ALWAYS include ALL available fields
-            - NEVER use markdown, paragraphs, or bullet points
-            - If no data found, say "No [data type] found" in the appropriate section
-
-            Generate a response that directly answers the user's question using the available data:
-            """
-            
-            response = self.gemini_model.generate_content(prompt)
+            prompt = _RESPONSE_PROMPT.substitute(query=query, search_approach=search_approach, query_type=query_type, data_summary=data_summary)
+            
+            response = await asyncio.to_thread(self.gemini_model.generate_content, prompt)
             if response and response.text:
                 return response.text.strip()
             else:
@@ -816,8 +1903,6 @@ class AIService:
         """Get dynamic evidence counts from database"""
         try:
             from app.services.case_manager import case_manager
-            from app.models.database import get_db
-            from sqlalchemy import text
             
             if not case_number:
                 # Try to get the most recent active case
@@ -833,31 +1918,33 @@ class AIService:
             safe_case_name = case_info["safe_case_name"]
             schema_name = f"case_{safe_case_name}"
             
-            db = next(get_db())
-            counts = {
-                "chat_records": 0,
-                "call_records": 0,
-                "contacts": 0,
-                "media_files": 0
-            }
-            
-            try:
-                # Get counts from each table
-                counts["chat_records"] = db.execute(text(f"SELECT COUNT(*) FROM {schema_name}.chat_records")).scalar() or 0
-                counts["call_records"] = db.execute(text(f"SELECT COUNT(*) FROM {schema_name}.call_records")).scalar() or 0
-                counts["contacts"] = db.execute(text(f"SELECT COUNT(*) FROM {schema_name}.contacts")).scalar() or 0
-                counts["media_files"] = db.execute(text(f"SELECT COUNT(*) FROM {schema_name}.media_files")).scalar() or 0
-            except Exception as e:
-                print(f"⚠️ Error getting counts from database: {e}")
-            finally:
-                db.close()
-            
-            return counts
+            # The count query blocks on psycopg2, so keep it off the event loop
+            return await asyncio.to_thread(self._read_evidence_counts, schema_name)
             
         except Exception as e:
             print(f"❌ Error getting evidence counts: {e}")
             return {"chat_records": 0, "call_records": 0, "contacts": 0, "media_files": 0}
 
+    def _read_evidence_counts(self, schema_name: str) -> Dict[str, int]:
+        """Estimated row counts of the evidence tables of a case schema, in a single round-trip"""
+        from app.models.database import get_db_context
+        
+        counts = {
+            "chat_records": 0,
+            "call_records": 0,
+            "contacts": 0,
+            "media_files": 0
+        }
+        
+        with get_db_context() as db:
+            try:
+                for data_type, count in db.execute(_sql_text(estimated_count_sql(schema_name, EVIDENCE_TABLES))):
+                    counts[data_type] = count or 0
+            except Exception as e:
+                print(f"⚠️ Error getting counts from database: {e}")
+        
+        return counts
+
     async def _prepare_comprehensive_data_summary(self, raw_data: Dict[str, Any]) -> str:
         """Prepare comprehensive data summary including counts and detailed information for LLM processing"""
         try:
@@ -884,7 +1971,7 @@ class AIService:
                 summary_parts.append(f"SQL SEARCH RESULTS ({len(sql_results)} records):")
                 
                 # Group results by table type for better organization
-                results_by_type = {}
+                results_by_type = defaultdict(list)
                 for result in sql_results:
                     if isinstance(result, dict):
                         # Determine result type based on available fields
@@ -899,8 +1986,6 @@ class AIService:
                         else:
                             result_type = 'other'
                         
-                        if result_type not in results_by_type:
-                            results_by_type[result_type] = []
                         results_by_type[result_type].append(result)
                 
                 # Add detailed information for each type with proper formatting
@@ -928,7 +2013,7 @@ class AIService:
                             
                         elif result_type == 'media_files':
                             file_name = result.get('file_name', result.get('filename', 'Unknown'))
-                            file_size = result.get('file_size', 'Unknown')
+                            file_size = _format_size(result.get('file_size'))
                             file_type = result.get('file_type', result.get('mime_type', 'Unknown'))
                             file_path = result.get('file_path', 'Unknown')
                             timestamp = result.get('timestamp', result.get('date', ''))
@@ -959,21 +2044,19 @@ class AIService:
             # Process vector results
             vector_results = raw_data.get('vector_results', [])
             if vector_results:
-                summary_parts.append(f"\nSEMANTIC SEARCH RESULTS ({len(vector_results)} items):")
-                for i, result in enumerate(vector_results[:10], 1):  # Increased limit to 10
+                # Score all results in one pass: mean relevance plus a risk band per result
+                vector_results = [result for result in vector_results if isinstance(result, dict)]
+                scores = np.fromiter((result.get('score', 0.0) for result in vector_results),
+                                     dtype=np.float32, count=len(vector_results))
+                mean_relevance = float(scores.mean()) if scores.size else 0.0
+                risk_levels = _RISK_LEVELS[np.digitize(scores[:10], _RISK_THRESHOLDS)]
+                
+                summary_parts.append(f"\nSEMANTIC SEARCH RESULTS ({len(vector_results)} items, mean relevance {mean_relevance:.3f}):")
+                for i, (result, score, risk_level) in enumerate(zip(vector_results[:10], scores, risk_levels), 1):  # Increased limit to 10
                     if isinstance(result, dict):
                         payload = result.get('payload', {})
-                        score = result.get('score', 0.0)
                         suspicious_indicators = result.get('suspicious_indicators', [])
                         
-                        # Determine risk level based on score
-                        if score >= 0.7:
-                            risk_level = "HIGH"
-                        elif score >= 0.4:
-                            risk_level = "MEDIUM"
-                        else:
-                            risk_level = "LOW"
-                        
                         # Extract message content and metadata
                         message_content = payload.get('message_content', '')
                         app_name = payload.get('app_name', 'Unknown')
@@ -1032,27 +2115,21 @@ class AIService:
                 summary_parts.append(f"Database Records Found: {len(sql_results)}")
                 for i, result in enumerate(sql_results[:5], 1):  # Limit to 5 for summary
                     if isinstance(result, dict):
-                        # Extract key information based on common fields
+                        # Extract key information based on common fields; only the first three are shown
                         record_info = []
                         for key, value in result.items():
-                            if value is not None and str(value).strip():
-                                if key in ['message_content', 'content', 'text']:
-                                    record_info.append(f"Message: {str(value)[:100]}")
-                                elif key in ['sender_number', 'caller_number', 'phone_number']:
-                                    record_info.append(f"From: {value}")
-                                elif key in ['receiver_number', 'receiver']:
-                                    record_info.append(f"To: {value}")
-                                elif key in ['timestamp', 'date', 'time']:
-                                    record_info.append(f"Time: {value}")
-                                elif key in ['app_name', 'application']:
-                                    record_info.append(f"App: {value}")
-                                elif key in ['name', 'contact_name']:
-                                    record_info.append(f"Name: {value}")
-                                elif key in ['file_name', 'filename']:
-                                    record_info.append(f"File: {value}")
+                            label = _SUMMARY_FIELD_LABELS.get(key)
+                            if label is None or value is None:
+                                continue
+                            value_text = str(value)
+                            if not value_text.strip():
+                                continue
+                            record_info.append(f"{label}: {value_text[:100] if label == 'Message' else value_text}")
+                            if len(record_info) == 3:
+                                break
                         
                         if record_info:
-                            summary_parts.append(f"{i}. {' | '.join(record_info[:3])}")
+                            summary_parts.append(f"{i}. {' | '.join(record_info)}")
                 
                 if len(sql_results) > 5:
                     summary_parts.append(f"... and {len(sql_results) - 5} more records")
@@ -1063,7 +2140,9 @@ class AIService:
                 summary_parts.append(f"\nSemantic Search Results: {len(vector_results)}")
                 for i, result in enumerate(vector_results[:3], 1):  # Limit to 3 for summary
                     if isinstance(result, dict):
-                        content = result.get('payload', {}).get('content', result.get('content', str(result)))
+                        # The whole record is only stringified when it has no content field
+                        payload = result.get('payload', {})
+                        content = payload['content'] if 'content' in payload else result.get('content', result)
                         if content:
                             summary_parts.append(f"{i}. {str(content)[:150]}")
             
@@ -2,12 +2,26 @@
 Case-based data management service for isolating forensic data by case.
 """
 
+import asyncio
+import json
 import logging
-from typing import Dict, List, Any, Optional
+import re
+import sys
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from string import Template
+from typing import Awaitable, Dict, List, Any, Optional, Tuple
 from datetime import datetime
+from cachetools import TTLCache
 from sqlalchemy import text
-from qdrant_client.models import Distance, VectorParams, CollectionInfo
-from app.models.database import get_db
+from sqlalchemy.exc import DBAPIError
+from neo4j.exceptions import ClientError, Neo4jError
+from qdrant_client.models import (
+    Distance, VectorParams, CollectionInfo, OptimizersConfigDiff,
+    ScalarQuantization, ScalarQuantizationConfig, ScalarType
+)
+from app.models.database import get_db_context
 from config.settings import settings
 from app.core.database_manager import db_manager
 from app.repositories.neo4j_repository import neo4j_repo
@@ -15,12 +29,216 @@ from app.services.vector_service import vector_service
 
 logger = logging.getLogger(__name__)
 
+# Characters not allowed in schema, collection and label names (matched after lowercasing)
+_UNSAFE_NAME_PATTERN = re.compile(r'[^a-z0-9_]')
+
+# Qdrant collections deleted at once when cleaning all case data
+QDRANT_DELETE_CONCURRENCY = 8
+# Segments above this size (KB) are memory-mapped instead of held in RAM during large ingests
+QDRANT_MEMMAP_THRESHOLD_KB = 20000
+# Vector components outside this quantile are clipped when scaling to int8
+QDRANT_QUANTIZATION_QUANTILE = 0.99
+# Redis key prefix of the shared active-case registry
+CASE_KEY_PREFIX = "case:"
+# Registry entries are read several times per request; each worker keeps them this many seconds
+CASE_INFO_CACHE_SIZE = 1024
+CASE_INFO_CACHE_TTL = 5
+
+# Neo4j schema shared by all cases: case nodes also carry the Person / Communication label and a
+# case_id property, so one set of composite constraints and indexes replaces per-case definitions
+_NEO4J_SHARED_SCHEMA = (
+    "CREATE CONSTRAINT person_case_id IF NOT EXISTS FOR (p:Person) REQUIRE (p.case_id, p.id) IS UNIQUE",
+    "CREATE CONSTRAINT communication_case_id IF NOT EXISTS FOR (c:Communication) REQUIRE (c.case_id, c.id) IS UNIQUE",
+    "CREATE INDEX person_case_phone IF NOT EXISTS FOR (p:Person) ON (p.case_id, p.phone_number)",
+    "CREATE INDEX person_case_name IF NOT EXISTS FOR (p:Person) ON (p.case_id, p.name)",
+    "CREATE INDEX communication_case_timestamp IF NOT EXISTS FOR (c:Communication) ON (c.case_id, c.timestamp)",
+)
+_NEO4J_CLEAR_CASE_CYPHER = "MATCH (n:Person {case_id: $case_id}) DETACH DELETE n"
+_NEO4J_DROP_SCHEMA_APOC = "CALL apoc.schema.assert({}, {}, true) YIELD label RETURN count(*) AS dropped"
+
+# Tables created in every case schema
+CASE_TABLES = ("ufdr_reports", "chat_records", "call_records", "contacts", "media_files")
+_CASE_TABLES_SQL = text("""
+    SELECT table_name
+    FROM information_schema.tables
+    WHERE table_schema = :schema_name
+""")
+
+# Per-case DDL, parsed once; only the (sanitized) schema and index names vary between cases
+_CASE_TABLES_DDL = Template("""
+-- UFDR Reports table
+CREATE TABLE $schema_name.ufdr_reports (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    filename VARCHAR(255) NOT NULL,
+    device_info JSONB,
+    extraction_date TIMESTAMP,
+    case_number VARCHAR(100) NOT NULL,
+    investigator VARCHAR(255) NOT NULL,
+    processed BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Chat Records table
+CREATE TABLE $schema_name.chat_records (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    ufdr_report_id UUID REFERENCES $schema_name.ufdr_reports(id) ON DELETE CASCADE,
+    app_name VARCHAR(100),
+    sender_number VARCHAR(50),
+    receiver_number VARCHAR(50),
+    message_content TEXT,
+    timestamp TIMESTAMP,
+    message_type VARCHAR(50) DEFAULT 'text',
+    is_deleted BOOLEAN DEFAULT FALSE,
+    metadata JSONB,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Call Records table
+CREATE TABLE $schema_name.call_records (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    ufdr_report_id UUID REFERENCES $schema_name.ufdr_reports(id) ON DELETE CASCADE,
+    caller_number VARCHAR(50),
+    receiver_number VARCHAR(50),
+    call_type VARCHAR(50),
+    duration INTEGER,
+    timestamp TIMESTAMP,
+    metadata JSONB,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Contacts table
+CREATE TABLE $schema_name.contacts (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    ufdr_report_id UUID REFERENCES $schema_name.ufdr_reports(id) ON DELETE CASCADE,
+    name VARCHAR(255),
+    phone_numbers JSONB,
+    email_addresses JSONB,
+    metadata JSONB,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Media Files table
+CREATE TABLE $schema_name.media_files (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    ufdr_report_id UUID REFERENCES $schema_name.ufdr_reports(id) ON DELETE CASCADE,
+    filename VARCHAR(255),
+    file_path TEXT,
+    file_type VARCHAR(100),
+    file_size BIGINT,
+    created_date TIMESTAMP,
+    modified_date TIMESTAMP,
+    hash_md5 VARCHAR(64),
+    hash_sha256 VARCHAR(128),
+    metadata JSONB,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create indexes for better performance
+CREATE INDEX idx_${safe_case_name}_chat_timestamp ON $schema_name.chat_records(timestamp);
+CREATE INDEX idx_${safe_case_name}_chat_app ON $schema_name.chat_records(app_name);
+CREATE INDEX idx_${safe_case_name}_call_timestamp ON $schema_name.call_records(timestamp);
+CREATE INDEX idx_${safe_case_name}_contacts_name ON $schema_name.contacts(name);
+
+-- Add unique constraints to prevent duplicates
+ALTER TABLE $schema_name.chat_records 
+ADD CONSTRAINT unique_chat_record 
+UNIQUE (sender_number, receiver_number, message_content, timestamp);
+
+ALTER TABLE $schema_name.call_records 
+ADD CONSTRAINT unique_call_record 
+UNIQUE (caller_number, receiver_number, timestamp);
+
+ALTER TABLE $schema_name.contacts 
+ADD CONSTRAINT unique_contact 
+UNIQUE (name, phone_numbers);
+
+ALTER TABLE $schema_name.media_files 
+ADD CONSTRAINT unique_media_file 
+UNIQUE (filename, file_path);
+""")
+
+# Full-text search column and JSONB containment indexes, safe to re-run on existing schemas
+_SEARCH_INDEXES_DDL = Template("""
+ALTER TABLE $schema_name.chat_records
+ADD COLUMN IF NOT EXISTS search tsvector GENERATED ALWAYS AS (
+    to_tsvector('simple', coalesce(message_content, '') || ' ' || coalesce(app_name, ''))
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_${safe_case_name}_chat_search ON $schema_name.chat_records USING gin(search);
+CREATE INDEX IF NOT EXISTS idx_${safe_case_name}_contacts_phones_path ON $schema_name.contacts USING gin(phone_numbers jsonb_path_ops);
+CREATE INDEX IF NOT EXISTS idx_${safe_case_name}_contacts_emails_path ON $schema_name.contacts USING gin(email_addresses jsonb_path_ops);
+""")
+
+# Trigram indexes for substring search, only created when pg_trgm is installed
+_TRIGRAM_INDEXES_DDL = Template("""
+CREATE INDEX IF NOT EXISTS idx_${safe_case_name}_chat_content_trgm ON $schema_name.chat_records USING gin(message_content gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_${safe_case_name}_chat_app_trgm ON $schema_name.chat_records USING gin(app_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_${safe_case_name}_chat_sender_trgm ON $schema_name.chat_records USING gin(sender_number gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_${safe_case_name}_chat_receiver_trgm ON $schema_name.chat_records USING gin(receiver_number gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_${safe_case_name}_call_caller_trgm ON $schema_name.call_records USING gin(caller_number gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_${safe_case_name}_call_receiver_trgm ON $schema_name.call_records USING gin(receiver_number gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_${safe_case_name}_contacts_name_trgm ON $schema_name.contacts USING gin(name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_${safe_case_name}_contacts_phones_trgm ON $schema_name.contacts USING gin((phone_numbers::text) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_${safe_case_name}_media_filename_trgm ON $schema_name.media_files USING gin(filename gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_${safe_case_name}_media_type_trgm ON $schema_name.media_files USING gin(file_type gin_trgm_ops);
+""")
+
+
+@dataclass(frozen=True)
+class CaseNames:
+    """Per-case identifiers in PostgreSQL, Qdrant and Neo4j, derived from the sanitized case name."""
+    safe: str
+    schema: str
+    collection: str
+    case_label: str
+    person_label: str
+    comm_label: str
+
+
+async def _timed(awaitable: Awaitable[Any]) -> Tuple[Any, float]:
+    """Await and return the result together with the elapsed time in milliseconds."""
+    started = time.perf_counter()
+    result = await awaitable
+    return result, (time.perf_counter() - started) * 1000
+
+
+@lru_cache(maxsize=4096)
+def sanitize_case_name(case_number: str) -> str:
+    """Sanitize a case number for use as a database identifier (cached and interned per case number)."""
+    # Remove special characters and replace with underscores
+    safe_name = _UNSAFE_NAME_PATTERN.sub('_', case_number.lower())
+    # Ensure it starts with a letter
+    if safe_name and safe_name[0].isdigit():
+        safe_name = f"case_{safe_name}"
+    return sys.intern(safe_name)
+
+
+@lru_cache(maxsize=1024)
+def case_names(safe_case_name: str) -> CaseNames:
+    """Build (once per case) the schema, collection and label names for a sanitized case name."""
+    return CaseNames(
+        safe=safe_case_name,
+        schema=f"case_{safe_case_name}",
+        collection=f"case_{safe_case_name}",
+        case_label=f"Case_{safe_case_name}",
+        person_label=f"Person_{safe_case_name}",
+        comm_label=f"Communication_{safe_case_name}"
+    )
+
 
 class CaseManager:
     """Manages case-specific data isolation across all databases."""
     
     def __init__(self):
-        self.active_cases = {}
+        # Cases are registered in Redis so all workers share them; this only holds cases while Redis is unreachable
+        self._local_cases: Dict[str, Dict[str, Any]] = {}
+        # case number -> registry JSON recently read from Redis, so lookups skip the round trip
+        self._case_info_cache = TTLCache(maxsize=CASE_INFO_CACHE_SIZE, ttl=CASE_INFO_CACHE_TTL)
+        # Set once the shared Neo4j constraints and indexes have been created
+        self._neo4j_schema_ready = False
+        # Names of the Qdrant collections, listed on first case creation and kept in sync afterwards
+        self._qdrant_collections: Optional[set] = None
         # Restore cases from database on startup
         self._restore_cases_from_database()
     
@@ -28,12 +246,11 @@ class CaseManager:
         """Create isolated environment for a new case across all databases."""
         
         try:
-            logger.info(f"🏗️ Creating case environment for: {case_number}")
-            
             # Check if case already exists
-            if case_number in self.active_cases:
-                logger.info(f"📋 Case {case_number} already exists, returning existing environment")
-                return self.active_cases[case_number]
+            existing_case = self.get_case_info(case_number)
+            if existing_case:
+                logger.info("case_env_exists case=%s", case_number)
+                return existing_case
             
             # Sanitize case number for database names
             safe_case_name = self._sanitize_case_name(case_number)
@@ -46,22 +263,32 @@ class CaseManager:
                 "databases": {}
             }
             
-            # Create PostgreSQL schema for case
-            postgres_result = await self._create_postgres_case_schema(safe_case_name)
+            # The PostgreSQL schema, Qdrant collection and Neo4j namespace are independent; the blocking
+            # PostgreSQL and Qdrant clients run in worker threads so all three are set up concurrently
+            started = time.perf_counter()
+            (postgres_result, pg_ms), (qdrant_result, qdrant_ms), (neo4j_result, neo4j_ms) = await asyncio.gather(
+                _timed(asyncio.to_thread(self._create_postgres_case_schema, safe_case_name)),
+                _timed(asyncio.to_thread(self._create_qdrant_case_collection, safe_case_name)),
+                _timed(self._create_neo4j_case_namespace(safe_case_name))
+            )
+            total_ms = (time.perf_counter() - started) * 1000
             result["databases"]["postgresql"] = postgres_result
-            
-            # Create Qdrant collection for case
-            qdrant_result = await self._create_qdrant_case_collection(safe_case_name)
             result["databases"]["qdrant"] = qdrant_result
-            
-            # Create Neo4j database/namespace for case
-            neo4j_result = await self._create_neo4j_case_namespace(safe_case_name)
             result["databases"]["neo4j"] = neo4j_result
             
-            # Store case info
-            self.active_cases[case_number] = result
-            
-            logger.info(f"✅ Case environment created successfully for: {case_number}")
+            # Store case info, unless another worker registered the case while this one was creating it
+            if not self._store_case_info(case_number, result, only_if_new=True):
+                logger.info("case_env_exists case=%s registered_by=other_worker", case_number)
+                return self.get_case_info(case_number) or result
+            
+            # One summary record per case with the status and duration of each database
+            logger.info(
+                "case_env_created case=%s total_ms=%.0f pg=%s pg_ms=%.0f qdrant=%s qdrant_ms=%.0f neo4j=%s neo4j_ms=%.0f",
+                case_number, total_ms,
+                postgres_result.get("status"), pg_ms,
+                qdrant_result.get("status"), qdrant_ms,
+                neo4j_result.get("status"), neo4j_ms
+            )
             return result
             
         except Exception as e:
@@ -80,20 +307,18 @@ class CaseManager:
         }
         
         try:
-            # Clean PostgreSQL
-            postgres_result = await self._clean_postgresql()
+            # Clean all three databases concurrently, the blocking PostgreSQL client in a worker thread
+            postgres_result, qdrant_result, neo4j_result = await asyncio.gather(
+                asyncio.to_thread(self._clean_postgresql),
+                self._clean_qdrant(),
+                self._clean_neo4j()
+            )
             result["postgresql"] = postgres_result
-            
-            # Clean Qdrant
-            qdrant_result = await self._clean_qdrant()
             result["qdrant"] = qdrant_result
-            
-            # Clean Neo4j
-            neo4j_result = await self._clean_neo4j()
             result["neo4j"] = neo4j_result
             
             # Clear active cases
-            self.active_cases.clear()
+            self._clear_case_registry()
             
             logger.info("✅ Complete data cleanup finished")
             return result
@@ -104,191 +329,113 @@ class CaseManager:
     
     def _sanitize_case_name(self, case_number: str) -> str:
         """Sanitize case number for use as database identifier."""
-        import re
-        # Remove special characters and replace with underscores
-        safe_name = re.sub(r'[^a-zA-Z0-9_]', '_', case_number.lower())
-        # Ensure it starts with a letter
-        if safe_name[0].isdigit():
-            safe_name = f"case_{safe_name}"
-        return safe_name
+        return sanitize_case_name(case_number)
 
     def sanitize_case_name(self, case_number: str) -> str:
         """Public helper to sanitize case number consistently across services."""
         return self._sanitize_case_name(case_number)
     
-    async def _create_postgres_case_schema(self, safe_case_name: str) -> Dict[str, Any]:
+    def _create_postgres_case_schema(self, safe_case_name: str) -> Dict[str, Any]:
         """Create PostgreSQL schema for case-specific data."""
         
         try:
-            db = next(get_db())
-            
-            # Ensure required extensions (for gen_random_uuid)
-            try:
-                db.execute(text("CREATE EXTENSION IF NOT EXISTS pgcrypto"))
-            except Exception:
-                pass
-            
-            # Create schema for the case
-            schema_name = f"case_{safe_case_name}"
-            
-            # Check if schema already exists and has data
-            schema_check_sql = text("""
-                SELECT schema_name 
-                FROM information_schema.schemata 
-                WHERE schema_name = :schema_name
-            """)
-            
-            schema_exists = db.execute(schema_check_sql, {"schema_name": schema_name}).fetchone()
-            
-            if schema_exists:
-                # Check if schema has any data
-                data_check_sql = text(f"""
-                    SELECT COUNT(*) FROM {schema_name}.ufdr_reports
-                """)
-                try:
-                    data_count = db.execute(data_check_sql).scalar()
+            with get_db_context() as db:
+                # Ensure required extensions: pgcrypto for gen_random_uuid, pg_trgm for substring search on
+                # names and phone numbers. Each runs in a savepoint so a refused CREATE EXTENSION (e.g. missing
+                # privileges) does not abort the rest of the schema setup
+                for extension in ("pgcrypto", "pg_trgm"):
+                    try:
+                        with db.begin_nested():
+                            db.execute(text(f"CREATE EXTENSION IF NOT EXISTS {extension}"))
+                    except DBAPIError as e:
+                        logger.warning(f"Could not create extension {extension}: {e.orig}")
+                
+                # Create schema for the case
+                schema_name = case_names(safe_case_name).schema
+                
+                # Check which of the case tables already exist
+                existing_tables = {row[0] for row in db.execute(_CASE_TABLES_SQL, {"schema_name": schema_name}).fetchall()}
+                
+                if existing_tables.issuperset(CASE_TABLES):
+                    data_count = db.execute(text(f"SELECT COUNT(*) FROM {schema_name}.ufdr_reports")).scalar()
                     if data_count > 0:
                         print(f"⚠️ Schema {schema_name} already exists with data. Skipping schema creation.")
-                        db.close()
-                        return {
-                            "status": "skipped",
-                            "schema_name": schema_name,
-                            "reason": "Schema already exists with data"
-                        }
-                except Exception:
-                    # Schema exists but no tables yet, continue with creation
-                    pass
-            
-            # Drop schema if exists (only if no data)
-            db.execute(text(f"DROP SCHEMA IF EXISTS {schema_name} CASCADE"))
-            
-            # Create new schema
-            db.execute(text(f"CREATE SCHEMA {schema_name}"))
-            
-            # Create case-specific tables
-            tables_sql = f"""
-            -- UFDR Reports table
-            CREATE TABLE {schema_name}.ufdr_reports (
-                id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                filename VARCHAR(255) NOT NULL,
-                device_info JSONB,
-                extraction_date TIMESTAMP,
-                case_number VARCHAR(100) NOT NULL,
-                investigator VARCHAR(255) NOT NULL,
-                processed BOOLEAN DEFAULT FALSE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-            
-            -- Chat Records table
-            CREATE TABLE {schema_name}.chat_records (
-                id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                ufdr_report_id UUID REFERENCES {schema_name}.ufdr_reports(id) ON DELETE CASCADE,
-                app_name VARCHAR(100),
-                sender_number VARCHAR(50),
-                receiver_number VARCHAR(50),
-                message_content TEXT,
-                timestamp TIMESTAMP,
-                message_type VARCHAR(50) DEFAULT 'text',
-                is_deleted BOOLEAN DEFAULT FALSE,
-                metadata JSONB,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-            
-            -- Call Records table
-            CREATE TABLE {schema_name}.call_records (
-                id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                ufdr_report_id UUID REFERENCES {schema_name}.ufdr_reports(id) ON DELETE CASCADE,
-                caller_number VARCHAR(50),
-                receiver_number VARCHAR(50),
-                call_type VARCHAR(50),
-                duration INTEGER,
-                timestamp TIMESTAMP,
-                metadata JSONB,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-            
-            -- Contacts table
-            CREATE TABLE {schema_name}.contacts (
-                id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                ufdr_report_id UUID REFERENCES {schema_name}.ufdr_reports(id) ON DELETE CASCADE,
-                name VARCHAR(255),
-                phone_numbers JSONB,
-                email_addresses JSONB,
-                metadata JSONB,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-            
-            -- Media Files table
-            CREATE TABLE {schema_name}.media_files (
-                id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                ufdr_report_id UUID REFERENCES {schema_name}.ufdr_reports(id) ON DELETE CASCADE,
-                filename VARCHAR(255),
-                file_path TEXT,
-                file_type VARCHAR(100),
-                file_size BIGINT,
-                created_date TIMESTAMP,
-                modified_date TIMESTAMP,
-                hash_md5 VARCHAR(64),
-                hash_sha256 VARCHAR(128),
-                metadata JSONB,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-            
-            -- Create indexes for better performance
-            CREATE INDEX idx_{safe_case_name}_chat_timestamp ON {schema_name}.chat_records(timestamp);
-            CREATE INDEX idx_{safe_case_name}_chat_app ON {schema_name}.chat_records(app_name);
-            CREATE INDEX idx_{safe_case_name}_chat_content ON {schema_name}.chat_records USING gin(to_tsvector('english', message_content));
-            CREATE INDEX idx_{safe_case_name}_call_timestamp ON {schema_name}.call_records(timestamp);
-            CREATE INDEX idx_{safe_case_name}_contacts_name ON {schema_name}.contacts(name);
-            
-            -- Add unique constraints to prevent duplicates
-            ALTER TABLE {schema_name}.chat_records 
-            ADD CONSTRAINT unique_chat_record 
-            UNIQUE (sender_number, receiver_number, message_content, timestamp);
-            
-            ALTER TABLE {schema_name}.call_records 
-            ADD CONSTRAINT unique_call_record 
-            UNIQUE (caller_number, receiver_number, timestamp);
-            
-            ALTER TABLE {schema_name}.contacts 
-            ADD CONSTRAINT unique_contact 
-            UNIQUE (name, phone_numbers);
-            
-            ALTER TABLE {schema_name}.media_files 
-            ADD CONSTRAINT unique_media_file 
-            UNIQUE (filename, file_path);
-            """
-            
-            db.execute(text(tables_sql))
-            db.commit()
-            db.close()
+                        status, reason = "skipped", "Schema already exists with data"
+                    else:
+                        # Reset the existing tables instead of rebuilding the schema and all of its indexes
+                        db.execute(text(f"TRUNCATE {', '.join(f'{schema_name}.{table}' for table in CASE_TABLES)} RESTART IDENTITY CASCADE"))
+                        status, reason = "reset", "Schema already exists, tables truncated"
+                    # Bring older case schemas up to date with the full-text search indexes
+                    db.execute(text(self._case_schema_ddl(db, schema_name, safe_case_name)))
+                    db.commit()
+                    return {
+                        "status": status,
+                        "schema_name": schema_name,
+                        "reason": reason
+                    }
+                
+                # A missing or partially created schema is rebuilt from scratch, with the
+                # tables, indexes and grants sent as a single DDL script
+                schema_ddl = self._case_schema_ddl(db, schema_name, safe_case_name, create_tables=True)
+                db.execute(text(
+                    f"DROP SCHEMA IF EXISTS {schema_name} CASCADE;\n"
+                    f"CREATE SCHEMA {schema_name};\n"
+                    f"{schema_ddl}"
+                ))
+                db.commit()
             
             return {
                 "status": "success",
                 "schema_name": schema_name,
-                "tables_created": ["ufdr_reports", "chat_records", "call_records", "contacts", "media_files"]
+                "tables_created": list(CASE_TABLES)
             }
             
         except Exception as e:
             logger.error(f"PostgreSQL case schema creation failed: {str(e)}")
             return {"status": "error", "error": str(e)}
     
-    async def _create_qdrant_case_collection(self, safe_case_name: str) -> Dict[str, Any]:
+    def _case_schema_ddl(self, db, schema_name: str, safe_case_name: str, create_tables: bool = False) -> str:
+        """Build the case DDL script (tables, search indexes, read-only grants) so it runs in one round trip."""
+        
+        ddl_names = {"schema_name": schema_name, "safe_case_name": safe_case_name}
+        parts = [_CASE_TABLES_DDL.substitute(ddl_names)] if create_tables else []
+        parts.append(_SEARCH_INDEXES_DDL.substitute(ddl_names))
+        
+        trigram_available = db.execute(
+            text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        ).fetchone()
+        if trigram_available:
+            parts.append(_TRIGRAM_INDEXES_DDL.substitute(ddl_names))
+        else:
+            logger.warning(f"pg_trgm not installed, skipping trigram indexes for {schema_name}")
+        
+        # Let the read-only role that executes generated SQL see the case tables
+        readonly_user = settings.postgres_readonly_user
+        if readonly_user:
+            parts.append(
+                f'GRANT USAGE ON SCHEMA {schema_name} TO "{readonly_user}";\n'
+                f'GRANT SELECT ON ALL TABLES IN SCHEMA {schema_name} TO "{readonly_user}";\n'
+            )
+        return "".join(parts)
+    
+    def _create_qdrant_case_collection(self, safe_case_name: str) -> Dict[str, Any]:
         """Create Qdrant collection for case-specific vector data."""
         
         try:
             if not vector_service.qdrant_client:
                 return {"status": "skipped", "reason": "Qdrant client not available"}
             
-            collection_name = f"case_{safe_case_name}"
+            collection_name = case_names(safe_case_name).collection
             
-            # Delete collection if exists
-            try:
+            # Delete collection if exists; the known names are listed once and then tracked locally
+            if self._qdrant_collections is None:
+                self._qdrant_collections = {
+                    collection.name for collection in vector_service.qdrant_client.get_collections().collections
+                }
+            if collection_name in self._qdrant_collections:
                 vector_service.qdrant_client.delete_collection(collection_name)
-                logger.info(f"Deleted existing Qdrant collection: {collection_name}")
-            except:
-                pass  # Collection might not exist
+                self._qdrant_collections.discard(collection_name)
+                logger.debug("Deleted existing Qdrant collection: %s", collection_name)
             
             # Create new collection with proper dimensions based on the active embedder
             from qdrant_client.models import PayloadSchemaType
@@ -303,8 +450,20 @@ class CaseManager:
                 vectors_config=VectorParams(
                     size=vector_size,
                     distance=Distance.COSINE
+                ),
+                # Message text lives in the payload; keep it on disk and only the indexed fields in RAM
+                on_disk_payload=True,
+                optimizers_config=OptimizersConfigDiff(memmap_threshold=QDRANT_MEMMAP_THRESHOLD_KB),
+                # Searches run on int8 copies of the vectors held in RAM and rescore with the originals
+                quantization_config=ScalarQuantization(
+                    scalar=ScalarQuantizationConfig(
+                        type=ScalarType.INT8,
+                        quantile=QDRANT_QUANTIZATION_QUANTILE,
+                        always_ram=True
+                    )
                 )
             )
+            self._qdrant_collections.add(collection_name)
             
             # Create payload indexes for filtering and search
             vector_service.qdrant_client.create_payload_index(
@@ -318,7 +477,7 @@ class CaseManager:
                 field_schema=PayloadSchemaType.KEYWORD
             )
             
-            logger.info(f"Created Qdrant collection: {collection_name}")
+            logger.debug("Created Qdrant collection: %s", collection_name)
             
             return {
                 "status": "success",
@@ -338,72 +497,74 @@ class CaseManager:
             if not neo4j_repo.driver:
                 return {"status": "skipped", "reason": "Neo4j driver not available"}
             
-            # Create case-specific constraints and indexes
-            case_label = f"Case_{safe_case_name}"
-            
-            # Clear any existing data for this case
-            await neo4j_repo.execute_cypher(f"""
-                MATCH (n:{case_label})
-                DETACH DELETE n
-            """)
-            
-            # Create constraints for case-specific nodes
-            constraints = [
-                f"CREATE CONSTRAINT IF NOT EXISTS FOR (p:Person_{safe_case_name}) REQUIRE p.id IS UNIQUE",
-                f"CREATE CONSTRAINT IF NOT EXISTS FOR (c:Communication_{safe_case_name}) REQUIRE c.id IS UNIQUE",
-                f"CREATE INDEX IF NOT EXISTS FOR (p:Person_{safe_case_name}) ON (p.phone_number)",
-                f"CREATE INDEX IF NOT EXISTS FOR (p:Person_{safe_case_name}) ON (p.name)",
-                f"CREATE INDEX IF NOT EXISTS FOR (c:Communication_{safe_case_name}) ON (c.timestamp)"
-            ]
-            
-            for constraint in constraints:
+            names = case_names(safe_case_name)
+            case_label = names.case_label
+            
+            # One shared schema keyed on case_id serves every case, so only the first case creates it
+            if not self._neo4j_schema_ready:
+                schema_ready = True
                 try:
-                    await neo4j_repo.execute_cypher(constraint)
-                except Exception as e:
-                    logger.warning(f"Neo4j constraint creation warning: {str(e)}")
+                    await neo4j_repo.execute_cypher_batch(list(_NEO4J_SHARED_SCHEMA))
+                except Exception:
+                    # Retry one by one so a single conflicting constraint does not block the rest
+                    for statement in _NEO4J_SHARED_SCHEMA:
+                        try:
+                            await neo4j_repo.execute_cypher(statement)
+                        except Exception as e:
+                            schema_ready = False
+                            logger.warning(f"Neo4j constraint creation warning: {str(e)}")
+                # Anything that failed is retried on the next case creation
+                self._neo4j_schema_ready = schema_ready
+            
+            # Clear any existing data for this case; one parameterized plan is reused for every case
+            await neo4j_repo.execute_cypher(_NEO4J_CLEAR_CASE_CYPHER, {"case_id": safe_case_name})
             
-            logger.info(f"Created Neo4j namespace for case: {safe_case_name}")
+            logger.debug("Created Neo4j namespace for case: %s", safe_case_name)
             
             return {
                 "status": "success",
                 "case_label": case_label,
-                "person_label": f"Person_{safe_case_name}",
-                "communication_label": f"Communication_{safe_case_name}"
+                "person_label": names.person_label,
+                "communication_label": names.comm_label
             }
             
         except Exception as e:
             logger.error(f"Neo4j case namespace creation failed: {str(e)}")
             return {"status": "error", "error": str(e)}
     
-    async def _clean_postgresql(self) -> Dict[str, Any]:
+    def _clean_postgresql(self) -> Dict[str, Any]:
         """Clean all PostgreSQL data."""
         
         try:
-            db = next(get_db())
-            
-            # Get all case schemas
-            schemas_result = db.execute(text("""
-                SELECT schema_name 
-                FROM information_schema.schemata 
-                WHERE schema_name LIKE 'case_%'
-            """)).fetchall()
-            
-            schemas_dropped = []
-            for row in schemas_result:
-                schema_name = row[0]
-                db.execute(text(f"DROP SCHEMA IF EXISTS {schema_name} CASCADE"))
-                schemas_dropped.append(schema_name)
-            
-            # Also clean main tables if they exist
-            main_tables = ["ufdr_reports", "chat_records", "call_records", "contacts", "media_files"]
-            for table in main_tables:
-                try:
-                    db.execute(text(f"TRUNCATE TABLE {table} CASCADE"))
-                except:
-                    pass  # Table might not exist
-            
-            db.commit()
-            db.close()
+            with get_db_context() as db:
+                # Get all case schemas
+                schemas_result = db.execute(text("""
+                    SELECT schema_name 
+                    FROM information_schema.schemata 
+                    WHERE schema_name LIKE 'case_%'
+                """)).fetchall()
+                
+                schemas_dropped = [row[0] for row in schemas_result]
+                
+                # Also clean main tables if they exist
+                main_tables = ["ufdr_reports", "chat_records", "call_records", "contacts", "media_files"]
+                existing_tables = [row[0] for row in db.execute(text("""
+                    SELECT table_name
+                    FROM unnest(CAST(:tables AS text[])) AS table_name
+                    WHERE to_regclass(table_name) IS NOT NULL
+                """), {"tables": main_tables}).fetchall()]
+                
+                # All schemas go in a single DROP SCHEMA, sent with the truncate in one round trip. The
+                # statement carries no parameters, so it is passed straight to the driver without text() parsing
+                statements = []
+                if schemas_dropped:
+                    statements.append(f"DROP SCHEMA IF EXISTS {', '.join(schemas_dropped)} CASCADE")
+                if existing_tables:
+                    statements.append(f"TRUNCATE TABLE {', '.join(existing_tables)} CASCADE")
+                if statements:
+                    db.connection().exec_driver_sql(";\n".join(statements))
+                
+                db.commit()
             
             return {
                 "status": "success",
@@ -423,15 +584,22 @@ class CaseManager:
                 return {"status": "skipped", "reason": "Qdrant client not available"}
             
             # Get all collections
-            collections = vector_service.qdrant_client.get_collections()
-            collections_deleted = []
-            
-            for collection in collections.collections:
-                collection_name = collection.name
-                vector_service.qdrant_client.delete_collection(collection_name)
-                collections_deleted.append(collection_name)
+            collections = await asyncio.to_thread(vector_service.qdrant_client.get_collections)
+            collections_deleted = [collection.name for collection in collections.collections]
+            delete_slots = asyncio.Semaphore(QDRANT_DELETE_CONCURRENCY)
+            
+            async def delete_collection(collection_name: str):
+                async with delete_slots:
+                    # The Qdrant client is synchronous; keep the HTTP call off the event loop
+                    await asyncio.to_thread(vector_service.qdrant_client.delete_collection, collection_name)
                 logger.info(f"Deleted Qdrant collection: {collection_name}")
             
+            # Deletions are independent, so a bounded number run at once
+            try:
+                await asyncio.gather(*(delete_collection(name) for name in collections_deleted))
+            finally:
+                self._qdrant_collections = None
+            
             return {
                 "status": "success",
                 "collections_deleted": collections_deleted
@@ -453,14 +621,23 @@ class CaseManager:
             
             # Drop all constraints and indexes (optional, but clean)
             try:
-                constraints_result = await neo4j_repo.execute_cypher("SHOW CONSTRAINTS")
-                if constraints_result:
-                    for constraint in constraints_result:
-                        constraint_name = constraint.get('name')
-                        if constraint_name:
-                            await neo4j_repo.execute_cypher(f"DROP CONSTRAINT {constraint_name} IF EXISTS")
-            except:
-                pass  # Constraints might not exist or command not supported
+                # With APOC the server drops everything in one call
+                await neo4j_repo.execute_cypher(_NEO4J_DROP_SCHEMA_APOC)
+                self._neo4j_schema_ready = False
+            except ClientError:
+                # APOC is not installed
+                try:
+                    # Otherwise fetch the constraint names and drop them all in one transaction
+                    constraints_result = await neo4j_repo.execute_cypher("SHOW CONSTRAINTS YIELD name")
+                    drop_statements = [
+                        f"DROP CONSTRAINT `{constraint['name']}` IF EXISTS"
+                        for constraint in constraints_result or [] if constraint.get('name')
+                    ]
+                    if drop_statements:
+                        await neo4j_repo.execute_cypher_batch(drop_statements)
+                    self._neo4j_schema_ready = False
+                except Neo4jError:
+                    pass  # Constraints might not exist or command not supported
             
             logger.info("Cleaned all Neo4j data")
             
@@ -476,62 +653,125 @@ class CaseManager:
     
     def get_case_info(self, case_number: str) -> Optional[Dict[str, Any]]:
         """Get information about a specific case."""
-        return self.active_cases.get(case_number)
+        # Case entries never change once registered, so a briefly cached copy is safe to serve
+        cached = self._case_info_cache.get(case_number)
+        if cached is None:
+            try:
+                cached = db_manager.redis_client.get(f"{CASE_KEY_PREFIX}{case_number}")
+            except Exception as e:
+                logger.warning(f"Case registry unavailable, using local cases: {e}")
+                return self._local_cases.get(case_number)
+            if cached:
+                self._case_info_cache[case_number] = cached
+        return json.loads(cached) if cached else self._local_cases.get(case_number)
+    
+    def get_schema_name(self, case_number: str) -> Optional[str]:
+        """Get the PostgreSQL schema name for a case, or None if the case is unknown."""
+        names = self.get_case_names(case_number)
+        return names.schema if names else None
+    
+    def get_case_names(self, case_number: str) -> Optional[CaseNames]:
+        """Get the derived schema, collection and label names for a case, or None if the case is unknown."""
+        case_info = self.get_case_info(case_number)
+        return case_names(case_info['safe_case_name']) if case_info else None
     
     def list_active_cases(self) -> List[str]:
-        """List all active case numbers."""
-        return list(self.active_cases.keys())
+        """List all active case numbers, oldest first."""
+        cases = dict(self._local_cases)
+        try:
+            redis_client = db_manager.redis_client
+            keys = list(redis_client.scan_iter(match=f"{CASE_KEY_PREFIX}*", count=500))
+            if keys:
+                for key, cached in zip(keys, redis_client.mget(keys)):
+                    if cached:
+                        cases[key[len(CASE_KEY_PREFIX):]] = json.loads(cached)
+        except Exception as e:
+            logger.warning(f"Case registry unavailable, listing local cases only: {e}")
+        return sorted(cases, key=lambda number: cases[number].get("created_at") or "")
+    
+    def _store_case_info(self, case_number: str, case_info: Dict[str, Any], only_if_new: bool = False) -> bool:
+        """Register a case in Redis (no expiry); returns False if only_if_new and it already exists."""
+        self._case_info_cache.pop(case_number, None)
+        try:
+            redis_client = db_manager.redis_client
+            case_key = f"{CASE_KEY_PREFIX}{case_number}"
+            stored = redis_client.set(case_key, json.dumps(case_info, default=str), nx=only_if_new)
+            if not stored:
+                # Entries written while the registry used a sliding TTL would still expire
+                redis_client.persist(case_key)
+            return bool(stored)
+        except Exception as e:
+            logger.warning(f"Case registry unavailable, keeping case {case_number} locally: {e}")
+            if only_if_new and case_number in self._local_cases:
+                return False
+            self._local_cases[case_number] = case_info
+            return True
+    
+    def _clear_case_registry(self):
+        """Remove every case from the Redis registry and the local fallback."""
+        self._local_cases.clear()
+        self._case_info_cache.clear()
+        try:
+            redis_client = db_manager.redis_client
+            keys = list(redis_client.scan_iter(match=f"{CASE_KEY_PREFIX}*", count=500))
+            if keys:
+                redis_client.delete(*keys)
+        except Exception as e:
+            logger.warning(f"Could not clear case registry: {e}")
     
     def _restore_cases_from_database(self):
         """Restore case information from existing database schemas."""
         try:
-            db = next(get_db())
-            
-            # Get all case schemas
-            schemas_result = db.execute(text("""
-                SELECT schema_name 
-                FROM information_schema.schemata 
-                WHERE schema_name LIKE 'case_%'
-                ORDER BY schema_name
-            """)).fetchall()
-            
-            for row in schemas_result:
-                schema_name = row[0]
-                # Extract case number from schema name (remove 'case_' prefix)
-                case_number = schema_name[5:]  # Remove 'case_' prefix
+            with get_db_context() as db:
+                # Get all case schemas
+                schemas_result = db.execute(text("""
+                    SELECT schema_name 
+                    FROM information_schema.schemata 
+                    WHERE schema_name LIKE 'case_%'
+                    ORDER BY schema_name
+                """)).fetchall()
                 
-                # Get case info from UFDR reports in this schema
-                try:
-                    report_result = db.execute(text(f"""
-                        SELECT case_number, investigator, created_at, filename
-                        FROM {schema_name}.ufdr_reports 
-                        ORDER BY created_at DESC
-                        LIMIT 1
-                    """)).fetchone()
+                restored = 0
+                for row in schemas_result:
+                    schema_name = row[0]
+                    # Extract case number from schema name (remove 'case_' prefix)
+                    case_number = schema_name[5:]  # Remove 'case_' prefix
                     
-                    if report_result:
-                        # Reconstruct case info
-                        case_info = {
-                            "case_number": report_result.case_number,
-                            "safe_case_name": case_number,
-                            "investigator": report_result.investigator,
-                            "created_at": report_result.created_at.isoformat() if report_result.created_at else None,
-                            "filename": report_result.filename,
-                            "databases": {
-                                "postgresql": {"status": "restored", "schema_name": schema_name},
-                                "qdrant": {"status": "unknown"},
-                                "neo4j": {"status": "unknown"}
-                            }
-                        }
-                        
-                        self.active_cases[report_result.case_number] = case_info
-                        logger.info(f"✅ Restored case {report_result.case_number} from database")
+                    # Get case info from UFDR reports in this schema
+                    try:
+                        report_result = db.execute(text(f"""
+                            SELECT case_number, investigator, created_at, filename
+                            FROM {schema_name}.ufdr_reports 
+                            ORDER BY created_at DESC
+                            LIMIT 1
+                        """)).fetchone()
                         
-                except Exception as e:
-                    logger.warning(f"Could not restore case info for schema {schema_name}: {e}")
-            
-            db.close()
-            logger.info(f"🔄 Restored {len(self.active_cases)} cases from database")
+                        if report_result:
+                            # Reconstruct case info
+                            case_info = {
+                                "case_number": report_result.case_number,
+                                "safe_case_name": case_number,
+                                "investigator": report_result.investigator,
+                                "created_at": report_result.created_at.isoformat() if report_result.created_at else None,
+                                "filename": report_result.filename,
+                                "databases": {
+                                    "postgresql": {"status": "restored", "schema_name": schema_name},
+                                    "qdrant": {"status": "unknown"},
+                                    "neo4j": {"status": "unknown"}
+                                }
+                            }
+                            
+                            # Keep entries already registered by running workers
+                            self._store_case_info(report_result.case_number, case_info, only_if_new=True)
+                            restored += 1
+                            logger.info(f"✅ Restored case {report_result.case_number} from database")
+                            
+                    except Exception as e:
+                        # A failed statement aborts the transaction; reset it for the next schema
+                        db.rollback()
+                        logger.warning(f"Could not restore case info for schema {schema_name}: {e}")
+            
+            logger.info(f"🔄 Restored {restored} cases from database")
             
         except Exception as e:
             logger.error(f"Error restoring cases from database: {e}")
@@ -1,23 +1,144 @@
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, Iterable, List, Any, Tuple
+import os
 import uuid
 import json
 from datetime import datetime
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from qdrant_client.models import PointStruct
+from psycopg2.extras import execute_values
+from neo4j.exceptions import DriverError, Neo4jError
+from qdrant_client.models import Batch, OptimizersConfigDiff
 import asyncio
+import logging
+import numpy as np
+from collections import defaultdict
+from operator import itemgetter
 
-from app.models.database import (
-    UFDRReport, ChatRecord, CallRecord, Contact, MediaFile, get_db
-)
+from app.models.database import get_db_context
 from app.services.ufdr_parser import UFDRParser
 from app.services.ai_service import ai_service
-from app.core.database_manager import db_manager
 from app.repositories.neo4j_repository import neo4j_repo
 from app.services.vector_service import vector_service
-from app.services.case_manager import case_manager
+from app.services.case_manager import case_manager, case_names
 from app.services.schema_service import schema_service
 
+logger = logging.getLogger(__name__)
+
+# Scopes unqualified table names to the case schema for the rest of the transaction
+_SET_SEARCH_PATH = text("SELECT set_config('search_path', :schema_name || ', public', true)")
+
+# Inserts name tables unqualified so every case shares one statement text (and SQLAlchemy's
+# compiled cache entry); the case schema comes from search_path
+_INSERT_UFDR_REPORT_SQL = text("""
+    INSERT INTO ufdr_reports
+    (id, filename, device_info, extraction_date, case_number, investigator, processed)
+    VALUES (:id, :filename, :device_info, :extraction_date, :case_number, :investigator, :processed)
+""")
+# Row inserts use psycopg2's execute_values, which expands VALUES %s into pages of multi-row VALUES lists
+_INSERT_CHAT_SQL = """
+    INSERT INTO chat_records
+    (ufdr_report_id, app_name, sender_number, receiver_number, message_content,
+     timestamp, message_type, is_deleted, metadata)
+    VALUES %s
+    ON CONFLICT (sender_number, receiver_number, message_content, timestamp) DO NOTHING
+"""
+_INSERT_CALL_SQL = """
+    INSERT INTO call_records
+    (ufdr_report_id, caller_number, receiver_number, call_type, duration, timestamp, metadata)
+    VALUES %s
+    ON CONFLICT (caller_number, receiver_number, timestamp) DO NOTHING
+"""
+_INSERT_CONTACT_SQL = """
+    INSERT INTO contacts
+    (ufdr_report_id, name, phone_numbers, email_addresses, metadata)
+    VALUES %s
+    ON CONFLICT (name, phone_numbers) DO NOTHING
+"""
+_INSERT_MEDIA_SQL = """
+    INSERT INTO media_files
+    (ufdr_report_id, filename, file_path, file_type, file_size, created_date,
+     modified_date, hash_md5, hash_sha256, metadata)
+    VALUES %s
+    ON CONFLICT (filename, file_path) DO NOTHING
+"""
+# Rows per multi-row INSERT statement
+POSTGRES_INSERT_PAGE_SIZE = 1000
+
+# Relationships for a case are created in UNWIND batches, looking endpoints up through the shared
+# (case_id, phone_number) index
+_CREATE_COMMUNICATIONS_CYPHER = """
+    UNWIND $rows AS row
+    MATCH (a:Person {case_id: $case_id, phone_number: row.person1})
+    MATCH (b:Person {case_id: $case_id, phone_number: row.person2})
+    CREATE (a)-[r:COMMUNICATES_WITH]->(b)
+    SET r = row.properties
+"""
+
+# Vectors are upserted to Qdrant as column-oriented batches of this many points, a few in flight at once
+QDRANT_UPSERT_BATCH_SIZE = 1024
+QDRANT_UPSERT_CONCURRENCY = 4
+# Texts embedded per chunk in the ingest pipeline, and embedded chunks waiting to be upserted.
+# Chunks are large because every bulk embedding call starts its own worker processes
+EMBED_PIPELINE_CHUNK_SIZE = 8192
+EMBED_PIPELINE_QUEUE_SIZE = 2
+# Indexing threshold restored after a bulk load (Qdrant's default)
+QDRANT_INDEXING_THRESHOLD_KB = 20000
+
+
+def _record_getter(*fields: str) -> Callable[[Dict[str, Any]], Tuple[Any, ...]]:
+    """itemgetter over fields, falling back to .get() (None) for records missing any of them"""
+    getter = itemgetter(*fields)
+    
+    def get(record: Dict[str, Any]) -> Tuple[Any, ...]:
+        try:
+            return getter(record)
+        except KeyError:
+            return tuple(record.get(field) for field in fields)
+    return get
+
+
+# Field tuples unpacked once per record when building embedding texts and payloads
+_chat_fields = _record_getter(
+    "app_name", "sender_number", "receiver_number", "message_content", "timestamp", "message_type", "is_deleted"
+)
+_call_fields = _record_getter("caller_number", "receiver_number", "call_type", "duration", "timestamp")
+_contact_fields = _record_getter("name", "phone_numbers", "email_addresses")
+_media_fields = _record_getter(
+    "filename", "file_type", "file_size", "file_path", "created_date", "modified_date", "hash_md5", "hash_sha256"
+)
+
+
+def _random_point_ids(count: int) -> List[str]:
+    """Random (version 4) point ids, drawn from one os.urandom buffer instead of one call per id"""
+    raw = os.urandom(16 * count)
+    return [str(uuid.UUID(bytes=raw[offset:offset + 16], version=4)) for offset in range(0, 16 * count, 16)]
+
+
+def _new_pair_stats() -> Dict[str, Any]:
+    """Empty communication stats for a pair of numbers"""
+    return {
+        'message_count': 0,
+        'call_count': 0,
+        'total_interactions': 0,
+        'first_contact': None,
+        'last_contact': None,
+        'apps_used': set(),
+        'message_types': set(),
+        'call_types': set(),
+        'total_call_duration': 0
+    }
+
+
+def _track_contact_window(pair: Dict[str, Any], timestamp: Any):
+    """Widen a pair's first/last contact to include timestamp"""
+    if not timestamp:
+        return
+    if pair['first_contact'] is None or timestamp < pair['first_contact']:
+        pair['first_contact'] = timestamp
+    if pair['last_contact'] is None or timestamp > pair['last_contact']:
+        pair['last_contact'] = timestamp
+
+
 class DataProcessor:
     def __init__(self):
         self.parser = UFDRParser()
@@ -54,22 +175,27 @@ class DataProcessor:
             # Parse UFDR file
             parsed_data = self.parser.parse_ufdr_file(file_path)
             
-            # Store in case-specific PostgreSQL schema
-            print(f"🔄 Storing data in PostgreSQL...")
-            ufdr_report_id = await self._store_in_case_postgres(
-                parsed_data, file_path, case_number, investigator, safe_case_name
+            # PostgreSQL is the system of record (a retry is skipped once it holds the report), so it is
+            # written first; a failure there leaves no orphaned vectors or graph data behind
+            ufdr_report_id = uuid.uuid4()
+            print(f"🔄 Storing report {ufdr_report_id} in PostgreSQL...")
+            await self._store_in_case_postgres(
+                parsed_data, file_path, case_number, investigator, safe_case_name, ufdr_report_id
             )
-            print(f"✅ PostgreSQL storage completed with report ID: {ufdr_report_id}")
             
-            # Store in case-specific Qdrant collection
-            print(f"🔄 Starting Qdrant vector storage...")
-            await self._store_in_case_qdrant(parsed_data, ufdr_report_id, safe_case_name)
-            print(f"✅ Qdrant vector storage completed")
-            
-            # Store in case-specific Neo4j namespace
-            print(f"🔄 Starting Neo4j graph storage...")
-            await self._store_in_case_neo4j(parsed_data, safe_case_name)
-            print(f"✅ Neo4j graph storage completed")
+            # Qdrant and Neo4j do not depend on each other and run at once
+            print(f"🔄 Storing report {ufdr_report_id} in Qdrant and Neo4j...")
+            store_results = await asyncio.gather(
+                self._store_in_case_qdrant(parsed_data, ufdr_report_id, safe_case_name),
+                self._store_in_case_neo4j(parsed_data, safe_case_name),
+                return_exceptions=True
+            )
+            # Both log and tolerate their own backend failures; an unexpected error fails the ingest
+            # once both have finished
+            for store_result in store_results:
+                if isinstance(store_result, Exception):
+                    raise store_result
+            print(f"✅ PostgreSQL, Qdrant and Neo4j storage completed")
             
             # Extract schema for improved AI query accuracy
             print(f"🔄 Extracting schema for improved AI accuracy...")
@@ -99,32 +225,30 @@ class DataProcessor:
     async def _case_has_data(self, case_number: str, safe_case_name: str) -> bool:
         """Check if case already has data to prevent duplicate processing"""
         try:
-            db = next(get_db())
-            schema_name = f"case_{safe_case_name}"
-            
-            # First check if schema exists
-            schema_check_sql = text("""
-                SELECT schema_name 
-                FROM information_schema.schemata 
-                WHERE schema_name = :schema_name
-            """)
-            
-            schema_exists = db.execute(schema_check_sql, {"schema_name": schema_name}).fetchone()
-            
-            if not schema_exists:
-                db.close()
-                return False
-            
-            # Check if any UFDR reports exist for this case
-            check_sql = text(f"""
-                SELECT COUNT(*) FROM {schema_name}.ufdr_reports 
-                WHERE case_number = :case_number
-            """)
-            
-            result = db.execute(check_sql, {"case_number": case_number}).scalar()
-            has_data = result > 0 if result else False
+            with get_db_context() as db:
+                schema_name = f"case_{safe_case_name}"
+                
+                # First check if schema exists
+                schema_check_sql = text("""
+                    SELECT schema_name 
+                    FROM information_schema.schemata 
+                    WHERE schema_name = :schema_name
+                """)
+                
+                schema_exists = db.execute(schema_check_sql, {"schema_name": schema_name}).fetchone()
+                
+                if not schema_exists:
+                    return False
+                
+                # Check if any UFDR reports exist for this case
+                check_sql = text(f"""
+                    SELECT COUNT(*) FROM {schema_name}.ufdr_reports 
+                    WHERE case_number = :case_number
+                """)
+                
+                result = db.execute(check_sql, {"case_number": case_number}).scalar()
+                has_data = result > 0 if result else False
             
-            db.close()
             return has_data
             
         except Exception as e:
@@ -144,20 +268,18 @@ class DataProcessor:
             safe_case_name = case_info["safe_case_name"]
             schema_name = f"case_{safe_case_name}"
             
-            db = next(get_db())
-            
-            # Clear all data from case schema
-            clear_sql = text(f"""
-                TRUNCATE TABLE {schema_name}.chat_records CASCADE;
-                TRUNCATE TABLE {schema_name}.call_records CASCADE;
-                TRUNCATE TABLE {schema_name}.contacts CASCADE;
-                TRUNCATE TABLE {schema_name}.media_files CASCADE;
-                TRUNCATE TABLE {schema_name}.ufdr_reports CASCADE;
-            """)
-            
-            db.execute(clear_sql)
-            db.commit()
-            db.close()
+            with get_db_context() as db:
+                # Clear all data from case schema
+                clear_sql = text(f"""
+                    TRUNCATE TABLE {schema_name}.chat_records CASCADE;
+                    TRUNCATE TABLE {schema_name}.call_records CASCADE;
+                    TRUNCATE TABLE {schema_name}.contacts CASCADE;
+                    TRUNCATE TABLE {schema_name}.media_files CASCADE;
+                    TRUNCATE TABLE {schema_name}.ufdr_reports CASCADE;
+                """)
+                
+                db.execute(clear_sql)
+                db.commit()
             
             print(f"✅ Cleared all data for case {case_number}")
             return True
@@ -178,68 +300,67 @@ class DataProcessor:
             safe_case_name = case_info["safe_case_name"]
             schema_name = f"case_{safe_case_name}"
             
-            db = next(get_db())
-            duplicates_removed = {
-                "chat_records": 0,
-                "call_records": 0,
-                "contacts": 0,
-                "media_files": 0
-            }
-            
-            # Remove duplicate chat records based on content, sender, receiver, and timestamp
-            chat_dedup_sql = text(f"""
-                DELETE FROM {schema_name}.chat_records 
-                WHERE id NOT IN (
-                    SELECT DISTINCT ON (sender_number, receiver_number, message_content, timestamp) id
-                    FROM {schema_name}.chat_records 
-                    ORDER BY sender_number, receiver_number, message_content, timestamp, created_at
-                )
-            """)
-            
-            result = db.execute(chat_dedup_sql)
-            duplicates_removed["chat_records"] = result.rowcount
-            
-            # Remove duplicate call records based on caller, receiver, and timestamp
-            call_dedup_sql = text(f"""
-                DELETE FROM {schema_name}.call_records 
-                WHERE id NOT IN (
-                    SELECT DISTINCT ON (caller_number, receiver_number, timestamp) id
-                    FROM {schema_name}.call_records 
-                    ORDER BY caller_number, receiver_number, timestamp, created_at
-                )
-            """)
-            
-            result = db.execute(call_dedup_sql)
-            duplicates_removed["call_records"] = result.rowcount
-            
-            # Remove duplicate contacts based on name and phone numbers
-            contact_dedup_sql = text(f"""
-                DELETE FROM {schema_name}.contacts 
-                WHERE id NOT IN (
-                    SELECT DISTINCT ON (name, phone_numbers) id
-                    FROM {schema_name}.contacts 
-                    ORDER BY name, phone_numbers, created_at
-                )
-            """)
-            
-            result = db.execute(contact_dedup_sql)
-            duplicates_removed["contacts"] = result.rowcount
-            
-            # Remove duplicate media files based on filename and file_path
-            media_dedup_sql = text(f"""
-                DELETE FROM {schema_name}.media_files 
-                WHERE id NOT IN (
-                    SELECT DISTINCT ON (filename, file_path) id
-                    FROM {schema_name}.media_files 
-                    ORDER BY filename, file_path, created_at
-                )
-            """)
-            
-            result = db.execute(media_dedup_sql)
-            duplicates_removed["media_files"] = result.rowcount
-            
-            db.commit()
-            db.close()
+            with get_db_context() as db:
+                duplicates_removed = {
+                    "chat_records": 0,
+                    "call_records": 0,
+                    "contacts": 0,
+                    "media_files": 0
+                }
+                
+                # Remove duplicate chat records based on content, sender, receiver, and timestamp
+                chat_dedup_sql = text(f"""
+                    DELETE FROM {schema_name}.chat_records 
+                    WHERE id NOT IN (
+                        SELECT DISTINCT ON (sender_number, receiver_number, message_content, timestamp) id
+                        FROM {schema_name}.chat_records 
+                        ORDER BY sender_number, receiver_number, message_content, timestamp, created_at
+                    )
+                """)
+                
+                result = db.execute(chat_dedup_sql)
+                duplicates_removed["chat_records"] = result.rowcount
+                
+                # Remove duplicate call records based on caller, receiver, and timestamp
+                call_dedup_sql = text(f"""
+                    DELETE FROM {schema_name}.call_records 
+                    WHERE id NOT IN (
+                        SELECT DISTINCT ON (caller_number, receiver_number, timestamp) id
+                        FROM {schema_name}.call_records 
+                        ORDER BY caller_number, receiver_number, timestamp, created_at
+                    )
+                """)
+                
+                result = db.execute(call_dedup_sql)
+                duplicates_removed["call_records"] = result.rowcount
+                
+                # Remove duplicate contacts based on name and phone numbers
+                contact_dedup_sql = text(f"""
+                    DELETE FROM {schema_name}.contacts 
+                    WHERE id NOT IN (
+                        SELECT DISTINCT ON (name, phone_numbers) id
+                        FROM {schema_name}.contacts 
+                        ORDER BY name, phone_numbers, created_at
+                    )
+                """)
+                
+                result = db.execute(contact_dedup_sql)
+                duplicates_removed["contacts"] = result.rowcount
+                
+                # Remove duplicate media files based on filename and file_path
+                media_dedup_sql = text(f"""
+                    DELETE FROM {schema_name}.media_files 
+                    WHERE id NOT IN (
+                        SELECT DISTINCT ON (filename, file_path) id
+                        FROM {schema_name}.media_files 
+                        ORDER BY filename, file_path, created_at
+                    )
+                """)
+                
+                result = db.execute(media_dedup_sql)
+                duplicates_removed["media_files"] = result.rowcount
+                
+                db.commit()
             
             total_removed = sum(duplicates_removed.values())
             print(f"✅ Removed {total_removed} duplicate records from case {case_number}")
@@ -257,130 +378,118 @@ class DataProcessor:
     
     async def _store_in_case_postgres(self, parsed_data: Dict[str, Any], 
                                       file_path: str, case_number: str, 
-                                      investigator: str, safe_case_name: str) -> uuid.UUID:
-        """Store parsed data in case-specific PostgreSQL schema"""
+                                      investigator: str, safe_case_name: str,
+                                      report_id: uuid.UUID) -> uuid.UUID:
+        """Store parsed data in case-specific PostgreSQL schema under the given report id"""
         
-        db = next(get_db())
+        # The SQLAlchemy session blocks; run the writes in a worker thread so the event loop keeps serving
+        await asyncio.to_thread(
+            self._write_case_postgres, parsed_data, file_path, case_number, investigator, safe_case_name, report_id
+        )
         schema_name = f"case_{safe_case_name}"
+        ai_service.invalidate_query_cache(schema_name)
+        print(f"✅ Stored data in PostgreSQL schema: {schema_name}")
+        return report_id
+    
+    def _write_case_postgres(self, parsed_data: Dict[str, Any], file_path: str, case_number: str,
+                             investigator: str, safe_case_name: str, report_id: uuid.UUID):
+        """Blocking inserts behind _store_in_case_postgres"""
         
-        try:
-            # Generate UUID for the report
-            report_id = uuid.uuid4()
-            print(f"📝 Inserting UFDR report with ID: {report_id}")
-            
-            # Insert UFDR report record
-            ufdr_report_sql = text(f"""
-                INSERT INTO {schema_name}.ufdr_reports 
-                (id, filename, device_info, extraction_date, case_number, investigator, processed)
-                VALUES (:id, :filename, :device_info, :extraction_date, :case_number, :investigator, :processed)
-            """)
-            
-            db.execute(ufdr_report_sql, {
-                "id": report_id,
-                "filename": file_path.split('/')[-1],
-                "device_info": json.dumps(parsed_data.get("device_info", {})),
-                "extraction_date": parsed_data.get("metadata", {}).get("extraction_date"),
-                "case_number": case_number,
-                "investigator": investigator,
-                "processed": True
-            })
-            print(f"✅ UFDR report inserted successfully")
-            
-            # Store chat records
-            for chat_data in parsed_data.get("chat_records", []):
-                chat_sql = text(f"""
-                    INSERT INTO {schema_name}.chat_records 
-                    (ufdr_report_id, app_name, sender_number, receiver_number, message_content, 
-                     timestamp, message_type, is_deleted, metadata)
-                    VALUES (:ufdr_report_id, :app_name, :sender_number, :receiver_number, :message_content,
-                            :timestamp, :message_type, :is_deleted, :metadata)
-                    ON CONFLICT (sender_number, receiver_number, message_content, timestamp) DO NOTHING
-                """)
+        schema_name = f"case_{safe_case_name}"
+        
+        # Pooled session from the shared engine, returned to the pool when the block exits
+        with get_db_context() as db:
+            try:
+                print(f"📝 Inserting UFDR report with ID: {report_id}")
                 
-                db.execute(chat_sql, {
-                    "ufdr_report_id": report_id,
-                    "app_name": chat_data.get("app_name"),
-                    "sender_number": chat_data.get("sender_number"),
-                    "receiver_number": chat_data.get("receiver_number"),
-                    "message_content": chat_data.get("message_content"),
-                    "timestamp": chat_data.get("timestamp"),
-                    "message_type": chat_data.get("message_type", "text"),
-                    "is_deleted": chat_data.get("is_deleted", False),
-                    "metadata": json.dumps(chat_data.get("metadata", {}))
-                })
-            
-            # Store call records
-            for call_data in parsed_data.get("call_records", []):
-                call_sql = text(f"""
-                    INSERT INTO {schema_name}.call_records 
-                    (ufdr_report_id, caller_number, receiver_number, call_type, duration, timestamp, metadata)
-                    VALUES (:ufdr_report_id, :caller_number, :receiver_number, :call_type, :duration, :timestamp, :metadata)
-                    ON CONFLICT (caller_number, receiver_number, timestamp) DO NOTHING
-                """)
+                db.execute(_SET_SEARCH_PATH, {"schema_name": schema_name})
                 
-                db.execute(call_sql, {
-                    "ufdr_report_id": report_id,
-                    "caller_number": call_data.get("caller_number"),
-                    "receiver_number": call_data.get("receiver_number"),
-                    "call_type": call_data.get("call_type"),
-                    "duration": call_data.get("duration"),
-                    "timestamp": call_data.get("timestamp"),
-                    "metadata": json.dumps(call_data.get("metadata", {}))
+                # Insert UFDR report record
+                db.execute(_INSERT_UFDR_REPORT_SQL, {
+                    "id": report_id,
+                    "filename": file_path.split('/')[-1],
+                    "device_info": json.dumps(parsed_data.get("device_info", {})),
+                    "extraction_date": parsed_data.get("metadata", {}).get("extraction_date"),
+                    "case_number": case_number,
+                    "investigator": investigator,
+                    "processed": True
                 })
-            
-            # Store contacts
-            for contact_data in parsed_data.get("contacts", []):
-                contact_sql = text(f"""
-                    INSERT INTO {schema_name}.contacts 
-                    (ufdr_report_id, name, phone_numbers, email_addresses, metadata)
-                    VALUES (:ufdr_report_id, :name, :phone_numbers, :email_addresses, :metadata)
-                    ON CONFLICT (name, phone_numbers) DO NOTHING
-                """)
+                print(f"✅ UFDR report inserted successfully")
                 
-                db.execute(contact_sql, {
-                    "ufdr_report_id": report_id,
-                    "name": contact_data.get("name"),
-                    "phone_numbers": json.dumps(contact_data.get("phone_numbers", [])),
-                    "email_addresses": json.dumps(contact_data.get("email_addresses", [])),
-                    "metadata": json.dumps(contact_data.get("metadata", {}))
-                })
-            
-            # Store media files
-            for media_data in parsed_data.get("media_files", []):
-                media_sql = text(f"""
-                    INSERT INTO {schema_name}.media_files 
-                    (ufdr_report_id, filename, file_path, file_type, file_size, created_date, 
-                     modified_date, hash_md5, hash_sha256, metadata)
-                    VALUES (:ufdr_report_id, :filename, :file_path, :file_type, :file_size, :created_date,
-                            :modified_date, :hash_md5, :hash_sha256, :metadata)
-                    ON CONFLICT (filename, file_path) DO NOTHING
-                """)
+                # Each table is written as a few multi-row INSERTs instead of one statement per row; rows are
+                # generated lazily, so only one page of tuples exists at a time
+                report_key = str(report_id)
+                self._bulk_insert(db, _INSERT_CHAT_SQL, (
+                    (
+                        report_key,
+                        chat_data.get("app_name"),
+                        chat_data.get("sender_number"),
+                        chat_data.get("receiver_number"),
+                        chat_data.get("message_content"),
+                        chat_data.get("timestamp"),
+                        chat_data.get("message_type", "text"),
+                        chat_data.get("is_deleted", False),
+                        json.dumps(chat_data.get("metadata", {}))
+                    )
+                    for chat_data in parsed_data.get("chat_records", [])
+                ))
+                self._bulk_insert(db, _INSERT_CALL_SQL, (
+                    (
+                        report_key,
+                        call_data.get("caller_number"),
+                        call_data.get("receiver_number"),
+                        call_data.get("call_type"),
+                        call_data.get("duration"),
+                        call_data.get("timestamp"),
+                        json.dumps(call_data.get("metadata", {}))
+                    )
+                    for call_data in parsed_data.get("call_records", [])
+                ))
+                self._bulk_insert(db, _INSERT_CONTACT_SQL, (
+                    (
+                        report_key,
+                        contact_data.get("name"),
+                        json.dumps(contact_data.get("phone_numbers", [])),
+                        json.dumps(contact_data.get("email_addresses", [])),
+                        json.dumps(contact_data.get("metadata", {}))
+                    )
+                    for contact_data in parsed_data.get("contacts", [])
+                ))
+                self._bulk_insert(db, _INSERT_MEDIA_SQL, (
+                    (
+                        report_key,
+                        media_data.get("filename"),
+                        media_data.get("file_path"),
+                        media_data.get("file_type"),
+                        media_data.get("file_size"),
+                        media_data.get("created_date"),
+                        media_data.get("modified_date"),
+                        media_data.get("hash_md5"),
+                        media_data.get("hash_sha256"),
+                        json.dumps(media_data.get("metadata", {}))
+                    )
+                    for media_data in parsed_data.get("media_files", [])
+                ))
                 
-                db.execute(media_sql, {
-                    "ufdr_report_id": report_id,
-                    "filename": media_data.get("filename"),
-                    "file_path": media_data.get("file_path"),
-                    "file_type": media_data.get("file_type"),
-                    "file_size": media_data.get("file_size"),
-                    "created_date": media_data.get("created_date"),
-                    "modified_date": media_data.get("modified_date"),
-                    "hash_md5": media_data.get("hash_md5"),
-                    "hash_sha256": media_data.get("hash_sha256"),
-                    "metadata": json.dumps(media_data.get("metadata", {}))
-                })
-            
-            db.commit()
-            print(f"✅ Stored data in PostgreSQL schema: {schema_name}")
-            return report_id
+                db.commit()
+                
+                # Refresh planner statistics so estimated counts reflect the new rows
+                db.execute(text(f"ANALYZE {schema_name}.chat_records, {schema_name}.call_records, "
+                                f"{schema_name}.contacts, {schema_name}.media_files"))
+                db.commit()
             
-        except Exception as e:
-            print(f"❌ Error in PostgreSQL storage: {e}")
-            import traceback
-            traceback.print_exc()
-            db.rollback()
-            raise e
-        finally:
-            db.close()
+            except Exception as e:
+                print(f"❌ Error in PostgreSQL storage: {e}")
+                import traceback
+                traceback.print_exc()
+                db.rollback()
+                raise e
+    
+    @staticmethod
+    def _bulk_insert(db: Session, statement: str, rows: Iterable[tuple]):
+        """Insert rows in multi-row VALUES pages on the session's connection (same transaction and search_path)"""
+        with db.connection().connection.cursor() as cursor:
+            execute_values(cursor, statement, rows, page_size=POSTGRES_INSERT_PAGE_SIZE)
     
     async def _store_in_case_qdrant(self, parsed_data: Dict[str, Any], 
                                    ufdr_report_id: uuid.UUID, safe_case_name: str):
@@ -390,29 +499,61 @@ class DataProcessor:
         print(f"🔄 Starting vector storage in collection: {collection_name}")
         
         try:
-            # Process chat records
             chat_records = parsed_data.get("chat_records", [])
-            print(f"📱 Found {len(chat_records)} chat records to vectorize")
-            if chat_records:
-                await self._vectorize_and_store_case_chats(chat_records, ufdr_report_id, collection_name)
-            
-            # Process call records
             call_records = parsed_data.get("call_records", [])
-            print(f"📞 Found {len(call_records)} call records to vectorize")
-            if call_records:
-                await self._vectorize_and_store_case_calls(call_records, ufdr_report_id, collection_name)
-            
-            # Process contacts
             contacts = parsed_data.get("contacts", [])
-            print(f"👥 Found {len(contacts)} contacts to vectorize")
-            if contacts:
-                await self._vectorize_and_store_case_contacts(contacts, ufdr_report_id, collection_name)
-            
-            # Process media files
             media_files = parsed_data.get("media_files", [])
-            print(f"📁 Found {len(media_files)} media files to vectorize")
-            if media_files:
-                await self._vectorize_and_store_case_media(media_files, ufdr_report_id, collection_name)
+            print(f"📱 Found {len(chat_records)} chat records, 📞 {len(call_records)} call records, "
+                  f"👥 {len(contacts)} contacts and 📁 {len(media_files)} media files to vectorize")
+            
+            # Texts of every record type are embedded together in large chunks. Embedding runs as a
+            # producer feeding a bounded queue so each chunk is upserted while the next one is embedded
+            record_vectors = [
+                build(records, ufdr_report_id)
+                for build, records in (
+                    (self._build_case_chat_vectors, chat_records),
+                    (self._build_case_call_vectors, call_records),
+                    (self._build_case_contact_vectors, contacts),
+                    (self._build_case_media_vectors, media_files)
+                )
+                if records
+            ]
+            all_texts = [text for texts, _ in record_vectors for text in texts]
+            all_payloads = [payload for _, payloads in record_vectors for payload in payloads]
+            if not all_texts:
+                return
+            
+            print(f"🔄 Generating embeddings for {len(all_texts)} records...")
+            embedded_chunks: asyncio.Queue = asyncio.Queue(maxsize=EMBED_PIPELINE_QUEUE_SIZE)
+            
+            async def embed_chunks():
+                try:
+                    for start in range(0, len(all_texts), EMBED_PIPELINE_CHUNK_SIZE):
+                        chunk = all_texts[start:start + EMBED_PIPELINE_CHUNK_SIZE]
+                        # A contiguous float32 block per chunk, converted to lists once per upsert batch
+                        vectors = np.ascontiguousarray(
+                            await ai_service.generate_embeddings_bulk(chunk), dtype=np.float32
+                        )
+                        if len(vectors) != len(chunk):
+                            raise RuntimeError(f"expected {len(chunk)} embeddings, got {len(vectors)}")
+                        await embedded_chunks.put((start, vectors))
+                finally:
+                    # Always release the consumer, including when embedding fails part way
+                    await embedded_chunks.put(None)
+            
+            async def upsert_chunks():
+                while (item := await embedded_chunks.get()) is not None:
+                    start, vectors = item
+                    await self._upsert_vectors(
+                        collection_name, vectors, all_payloads[start:start + len(vectors)], "record"
+                    )
+            
+            # Build the HNSW index once after the bulk load instead of while segments are filling up
+            await self._set_indexing_threshold(collection_name, 0)
+            try:
+                await asyncio.gather(embed_chunks(), upsert_chunks())
+            finally:
+                await self._set_indexing_threshold(collection_name, QDRANT_INDEXING_THRESHOLD_KB)
             
             print(f"✅ Completed vector storage for collection: {collection_name}")
             
@@ -421,237 +562,224 @@ class DataProcessor:
             import traceback
             traceback.print_exc()
     
-    async def _vectorize_and_store_case_chats(self, chat_records: List[Dict], 
-                                             ufdr_report_id: uuid.UUID, collection_name: str):
-        """Vectorize and store chat records in case-specific Qdrant collection"""
-        
-        # Prepare texts for embedding
-        texts = []
-        points = []
-        
-        for i, chat in enumerate(chat_records):
-            # Create searchable text combining all relevant fields
-            text_content = f"""
-            App: {chat.get('app_name', 'Unknown')}
-            Sender: {chat.get('sender_number', 'Unknown')}
-            Receiver: {chat.get('receiver_number', 'Unknown')}
-            Message: {chat.get('message_content', '')}
-            Type: {chat.get('message_type', 'text')}
-            Timestamp: {chat.get('timestamp', '')}
-            """.strip()
-            
-            texts.append(text_content)
-        
-        # Generate embeddings
-        print(f"🔄 Generating embeddings for {len(texts)} chat records...")
-        embeddings = await ai_service.generate_embeddings(texts)
-        print(f"✅ Generated {len(embeddings)} embeddings")
+    def _build_case_chat_vectors(self, chat_records: List[Dict],
+                                 ufdr_report_id: uuid.UUID) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Build the embedding texts and Qdrant payloads for chat records"""
         
-        # Create points for Qdrant
-        for i, (chat, embedding) in enumerate(zip(chat_records, embeddings)):
-            point = PointStruct(
-                id=str(uuid.uuid4()),
-                vector=embedding,
-                payload={
-                    "ufdr_report_id": str(ufdr_report_id),
-                    "data_type": "chat_record",
-                    "app_name": chat.get("app_name"),
-                    "sender_number": chat.get("sender_number"),
-                    "receiver_number": chat.get("receiver_number"),
-                    "message_content": chat.get("message_content"),
-                    "timestamp": str(chat.get("timestamp")) if chat.get("timestamp") else None,
-                    "message_type": chat.get("message_type"),
-                    "is_deleted": chat.get("is_deleted", False)
-                }
+        report_key = str(ufdr_report_id)
+        texts, payloads = [], []
+        for app_name, sender, receiver, content, timestamp, message_type, is_deleted in map(_chat_fields, chat_records):
+            # Searchable text combining all relevant fields, one line per field
+            texts.append(
+                f"App: {app_name or 'Unknown'}\n"
+                f"Sender: {sender or 'Unknown'}\n"
+                f"Receiver: {receiver or 'Unknown'}\n"
+                f"Message: {content or ''}\n"
+                f"Type: {message_type or 'text'}\n"
+                f"Timestamp: {timestamp or ''}"
             )
-            points.append(point)
+            payloads.append({
+                "ufdr_report_id": report_key,
+                "data_type": "chat_record",
+                "app_name": app_name,
+                "sender_number": sender,
+                "receiver_number": receiver,
+                "message_content": content,
+                "timestamp": str(timestamp) if timestamp else None,
+                "message_type": message_type,
+                "is_deleted": is_deleted or False
+            })
         
-        # Store in case-specific Qdrant collection
-        if points:
-            try:
-                print(f"🔄 Storing {len(points)} chat vectors in collection: {collection_name}")
-                vector_service.qdrant_client.upsert(
-                    collection_name=collection_name,
-                    points=points
-                )
-                print(f"✅ Successfully stored {len(points)} chat vectors in {collection_name}")
-                
-                # Verify storage
-                collection_info = vector_service.qdrant_client.get_collection(collection_name)
-                print(f"📊 Collection {collection_name} now has {collection_info.points_count} total points")
-                
-            except Exception as e:
-                print(f"❌ Error storing chat vectors in {collection_name}: {e}")
-                import traceback
-                traceback.print_exc()
+        return texts, payloads
     
-    async def _vectorize_and_store_case_calls(self, call_records: List[Dict], 
-                                             ufdr_report_id: uuid.UUID, collection_name: str):
-        """Vectorize and store call records in case-specific Qdrant collection"""
-        
-        texts = []
-        points = []
+    def _build_case_call_vectors(self, call_records: List[Dict],
+                                 ufdr_report_id: uuid.UUID) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Build the embedding texts and Qdrant payloads for call records"""
         
-        for call in call_records:
-            text_content = f"""
-            Caller: {call.get('caller_number', 'Unknown')}
-            Receiver: {call.get('receiver_number', 'Unknown')}
-            Type: {call.get('call_type', 'Unknown')}
-            Duration: {call.get('duration', 0)} seconds
-            Timestamp: {call.get('timestamp', '')}
-            """.strip()
-            
-            texts.append(text_content)
-        
-        print(f"🔄 Generating embeddings for {len(texts)} call records...")
-        embeddings = await ai_service.generate_embeddings(texts)
-        
-        for call, embedding in zip(call_records, embeddings):
-            point = PointStruct(
-                id=str(uuid.uuid4()),
-                vector=embedding,
-                payload={
-                    "ufdr_report_id": str(ufdr_report_id),
-                    "data_type": "call_record",
-                    "caller_number": call.get("caller_number"),
-                    "receiver_number": call.get("receiver_number"),
-                    "call_type": call.get("call_type"),
-                    "duration": call.get("duration"),
-                    "timestamp": str(call.get("timestamp")) if call.get("timestamp") else None
-                }
+        report_key = str(ufdr_report_id)
+        texts, payloads = [], []
+        for caller, receiver, call_type, duration, timestamp in map(_call_fields, call_records):
+            texts.append(
+                f"Caller: {caller or 'Unknown'}\n"
+                f"Receiver: {receiver or 'Unknown'}\n"
+                f"Type: {call_type or 'Unknown'}\n"
+                f"Duration: {duration or 0} seconds\n"
+                f"Timestamp: {timestamp or ''}"
             )
-            points.append(point)
+            payloads.append({
+                "ufdr_report_id": report_key,
+                "data_type": "call_record",
+                "caller_number": caller,
+                "receiver_number": receiver,
+                "call_type": call_type,
+                "duration": duration,
+                "timestamp": str(timestamp) if timestamp else None
+            })
         
-        if points:
-            try:
-                print(f"🔄 Storing {len(points)} call vectors in collection: {collection_name}")
-                vector_service.qdrant_client.upsert(
-                    collection_name=collection_name,
-                    points=points
-                )
-                print(f"✅ Successfully stored {len(points)} call vectors in {collection_name}")
-            except Exception as e:
-                print(f"❌ Error storing call vectors: {e}")
+        return texts, payloads
     
-    async def _vectorize_and_store_case_contacts(self, contacts: List[Dict], 
-                                                ufdr_report_id: uuid.UUID, collection_name: str):
-        """Vectorize and store contacts in case-specific Qdrant collection"""
-        
-        texts = []
-        points = []
+    def _build_case_contact_vectors(self, contacts: List[Dict],
+                                    ufdr_report_id: uuid.UUID) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Build the embedding texts and Qdrant payloads for contacts"""
         
-        for contact in contacts:
-            text_content = f"""
-            Name: {contact.get('name', 'Unknown')}
-            Phone Numbers: {', '.join(contact.get('phone_numbers', []))}
-            Email Addresses: {', '.join(contact.get('email_addresses', []))}
-            """.strip()
-            
-            texts.append(text_content)
+        report_key = str(ufdr_report_id)
+        texts, payloads = [], []
+        for name, phone_numbers, email_addresses in map(_contact_fields, contacts):
+            # Contacts without a name, number or email would only embed the field labels
+            if not (name or phone_numbers or email_addresses):
+                continue
+            phone_numbers = phone_numbers or []
+            email_addresses = email_addresses or []
+            texts.append(
+                f"Name: {name or 'Unknown'}\n"
+                f"Phone Numbers: {', '.join(phone_numbers)}\n"
+                f"Email Addresses: {', '.join(email_addresses)}"
+            )
+            payloads.append({
+                "ufdr_report_id": report_key,
+                "data_type": "contact",
+                "name": name,
+                "phone_numbers": phone_numbers,
+                "email_addresses": email_addresses
+            })
         
-        print(f"🔄 Generating embeddings for {len(texts)} contacts...")
-        embeddings = await ai_service.generate_embeddings(texts)
+        return texts, payloads
+    
+    def _build_case_media_vectors(self, media_files: List[Dict],
+                                  ufdr_report_id: uuid.UUID) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Build the embedding texts and Qdrant payloads for media files"""
         
-        for contact, embedding in zip(contacts, embeddings):
-            point = PointStruct(
-                id=str(uuid.uuid4()),
-                vector=embedding,
-                payload={
-                    "ufdr_report_id": str(ufdr_report_id),
-                    "data_type": "contact",
-                    "name": contact.get("name"),
-                    "phone_numbers": contact.get("phone_numbers", []),
-                    "email_addresses": contact.get("email_addresses", [])
-                }
+        report_key = str(ufdr_report_id)
+        texts, payloads = [], []
+        for (filename, file_type, file_size, file_path, created_date, modified_date,
+             hash_md5, hash_sha256) in map(_media_fields, media_files):
+            # Media entries without a name, path or type would only embed the field labels
+            if not (filename or file_path or file_type):
+                continue
+            texts.append(
+                f"Filename: {filename or 'Unknown'}\n"
+                f"File Type: {file_type or 'Unknown'}\n"
+                f"File Size: {file_size or 0} bytes\n"
+                f"Created: {created_date or ''}\n"
+                f"Modified: {modified_date or ''}\n"
+                f"Path: {file_path or ''}"
             )
-            points.append(point)
+            payloads.append({
+                "ufdr_report_id": report_key,
+                "data_type": "media_file",
+                "filename": filename,
+                "file_type": file_type,
+                "file_size": file_size,
+                "file_path": file_path,
+                "created_date": str(created_date) if created_date else None,
+                "modified_date": str(modified_date) if modified_date else None,
+                "hash_md5": hash_md5,
+                "hash_sha256": hash_sha256
+            })
         
-        if points:
-            try:
-                print(f"🔄 Storing {len(points)} contact vectors in collection: {collection_name}")
-                vector_service.qdrant_client.upsert(
-                    collection_name=collection_name,
-                    points=points
-                )
-                print(f"✅ Successfully stored {len(points)} contact vectors in {collection_name}")
-            except Exception as e:
-                print(f"❌ Error storing contact vectors: {e}")
+        return texts, payloads
     
-    async def _vectorize_and_store_case_media(self, media_files: List[Dict], 
-                                             ufdr_report_id: uuid.UUID, collection_name: str):
-        """Vectorize and store media files in case-specific Qdrant collection"""
-        
-        texts = []
-        points = []
+    async def _set_indexing_threshold(self, collection_name: str, threshold_kb: int):
+        """Set the segment size (KB) above which Qdrant builds the vector index; 0 disables indexing"""
+        try:
+            await asyncio.to_thread(
+                vector_service.qdrant_client.update_collection,
+                collection_name=collection_name,
+                optimizers_config=OptimizersConfigDiff(indexing_threshold=threshold_kb)
+            )
+        except Exception as e:
+            print(f"⚠️ Could not set indexing threshold on {collection_name}: {e}")
+    
+    async def _upsert_vectors(self, collection_name: str, embeddings: np.ndarray,
+                              payloads: List[Dict[str, Any]], label: str):
+        """Upsert embeddings with their payloads as column-oriented Qdrant batches"""
         
-        for media in media_files:
-            text_content = f"""
-            Filename: {media.get('filename', 'Unknown')}
-            File Type: {media.get('file_type', 'Unknown')}
-            File Size: {media.get('file_size', 0)} bytes
-            Created: {media.get('created_date', '')}
-            Modified: {media.get('modified_date', '')}
-            Path: {media.get('file_path', '')}
-            """.strip()
-            
-            texts.append(text_content)
+        count = min(len(embeddings), len(payloads))
+        if not count:
+            return
         
-        print(f"🔄 Generating embeddings for {len(texts)} media files...")
-        embeddings = await ai_service.generate_embeddings(texts)
+        print(f"🔄 Storing {count} {label} vectors in collection: {collection_name}")
+        upsert_slots = asyncio.Semaphore(QDRANT_UPSERT_CONCURRENCY)
         
-        for media, embedding in zip(media_files, embeddings):
-            point = PointStruct(
-                id=str(uuid.uuid4()),
-                vector=embedding,
-                payload={
-                    "ufdr_report_id": str(ufdr_report_id),
-                    "data_type": "media_file",
-                    "filename": media.get("filename"),
-                    "file_type": media.get("file_type"),
-                    "file_size": media.get("file_size"),
-                    "file_path": media.get("file_path"),
-                    "created_date": str(media.get("created_date")) if media.get("created_date") else None,
-                    "modified_date": str(media.get("modified_date")) if media.get("modified_date") else None,
-                    "hash_md5": media.get("hash_md5"),
-                    "hash_sha256": media.get("hash_sha256")
-                }
+        async def upsert_batch(start: int):
+            end = min(start + QDRANT_UPSERT_BATCH_SIZE, count)
+            batch = Batch(
+                ids=_random_point_ids(end - start),
+                # One tolist() over the contiguous float32 block instead of a conversion per row
+                vectors=embeddings[start:end].tolist(),
+                payloads=payloads[start:end]
             )
-            points.append(point)
-        
-        if points:
-            try:
-                print(f"🔄 Storing {len(points)} media vectors in collection: {collection_name}")
-                vector_service.qdrant_client.upsert(
-                    collection_name=collection_name,
-                    points=points
+            async with upsert_slots:
+                # The Qdrant client is synchronous; keep the HTTP call off the event loop
+                await asyncio.to_thread(
+                    vector_service.qdrant_client.upsert, collection_name=collection_name, points=batch
                 )
-                print(f"✅ Successfully stored {len(points)} media vectors in {collection_name}")
-            except Exception as e:
-                print(f"❌ Error storing media vectors: {e}")
+        
+        results = await asyncio.gather(
+            *(upsert_batch(start) for start in range(0, count, QDRANT_UPSERT_BATCH_SIZE)),
+            return_exceptions=True
+        )
+        failures = [result for result in results if isinstance(result, Exception)]
+        if failures:
+            print(f"❌ Error storing {label} vectors in {collection_name}: {len(failures)} of {len(results)} batches failed ({failures[0]})")
+        else:
+            print(f"✅ Successfully stored {count} {label} vectors in {collection_name}")
     
     async def _store_in_case_neo4j(self, parsed_data: Dict[str, Any], safe_case_name: str):
         """Store relationship data in case-specific Neo4j namespace"""
         
+        if not neo4j_repo.driver:
+            logger.warning("Neo4j not connected, skipping graph storage for case %s", safe_case_name)
+            return
+        
         try:
-            person_label = f"Person_{safe_case_name}"
-            communication_label = f"Communication_{safe_case_name}"
+            person_label = case_names(safe_case_name).person_label
+            # Every node and relationship of this report shares one creation timestamp
+            created_at = datetime.utcnow().isoformat()
             
-            # Extract unique persons from communications
+            # Unique persons and per-pair communication stats are collected in one pass over the records
             persons = set()
+            communication_pairs = defaultdict(_new_pair_stats)
             
-            # From chat records
+            # From chat records - track individual messages
             for chat in parsed_data.get("chat_records", []):
-                persons.add(chat.get("sender_number", ""))
-                persons.add(chat.get("receiver_number", ""))
+                sender = chat.get("sender_number", "")
+                receiver = chat.get("receiver_number", "")
+                persons.add(sender)
+                persons.add(receiver)
+                
+                if sender and receiver:
+                    pair = communication_pairs[(sender, receiver) if sender < receiver else (receiver, sender)]
+                    pair['message_count'] += 1
+                    pair['total_interactions'] += 1
+                    pair['apps_used'].add(chat.get('app_name', 'Unknown'))
+                    pair['message_types'].add(chat.get('message_type', 'text'))
+                    _track_contact_window(pair, chat.get('timestamp'))
             
             # From call records
             for call in parsed_data.get("call_records", []):
-                persons.add(call.get("caller_number", ""))
-                persons.add(call.get("receiver_number", ""))
+                caller = call.get("caller_number", "")
+                receiver = call.get("receiver_number", "")
+                persons.add(caller)
+                persons.add(receiver)
+                
+                if caller and receiver:
+                    pair = communication_pairs[(caller, receiver) if caller < receiver else (receiver, caller)]
+                    pair['call_count'] += 1
+                    pair['total_interactions'] += 1
+                    pair['call_types'].add(call.get('call_type', 'unknown'))
+                    pair['total_call_duration'] += call.get('duration') or 0
+                    _track_contact_window(pair, call.get('timestamp'))
             
             persons.discard("")  # Remove empty strings
             
-            # Create case-specific person nodes
+            # Index contacts by phone number once; the first contact listing a number names that person
+            phone_to_contact = {}
+            for contact in parsed_data.get("contacts", []):
+                for phone_number in contact.get('phone_numbers', []):
+                    phone_to_contact.setdefault(phone_number, contact)
+            
+            # Build case-specific person nodes
             person_nodes = {}
             for person in persons:
                 person_data = {
@@ -659,99 +787,35 @@ class DataProcessor:
                     'phone_number': person,
                     'name': person,  # Will be updated if found in contacts
                     'case_id': safe_case_name,
-                    'created_at': datetime.utcnow().isoformat()
+                    'created_at': created_at
                 }
                 
                 # Check if person exists in contacts
-                for contact in parsed_data.get("contacts", []):
-                    if person in contact.get('phone_numbers', []):
-                        person_data['name'] = contact.get('name', person)
-                        person_data['email_addresses'] = contact.get('email_addresses', [])
-                        break
-                
-                # Create person node with case-specific label
-                await neo4j_repo.execute_cypher(f"""
-                    CREATE (p:{person_label} $properties)
-                    RETURN p.id as node_id
-                """, {"properties": person_data})
+                contact = phone_to_contact.get(person)
+                if contact:
+                    person_data['name'] = contact.get('name', person)
+                    person_data['email_addresses'] = contact.get('email_addresses', [])
                 
                 person_nodes[person] = person_data
             
-            # Create communication relationships with detailed tracking
-            communication_pairs = {}
-            
-            # From chat records - track individual messages
-            for chat in parsed_data.get("chat_records", []):
-                sender = chat.get("sender_number", "")
-                receiver = chat.get("receiver_number", "")
-                
-                if sender and receiver:
-                    pair_key = tuple(sorted([sender, receiver]))
-                    if pair_key not in communication_pairs:
-                        communication_pairs[pair_key] = {
-                            'message_count': 0,
-                            'call_count': 0,
-                            'total_interactions': 0,
-                            'first_contact': chat.get('timestamp'),
-                            'last_contact': chat.get('timestamp'),
-                            'apps_used': set(),
-                            'message_types': set()
-                        }
-                    
-                    communication_pairs[pair_key]['message_count'] += 1
-                    communication_pairs[pair_key]['total_interactions'] += 1
-                    communication_pairs[pair_key]['apps_used'].add(chat.get('app_name', 'Unknown'))
-                    communication_pairs[pair_key]['message_types'].add(chat.get('message_type', 'text'))
-                    
-                    # Update timestamps
-                    if chat.get('timestamp'):
-                        if not communication_pairs[pair_key]['first_contact'] or chat.get('timestamp') < communication_pairs[pair_key]['first_contact']:
-                            communication_pairs[pair_key]['first_contact'] = chat.get('timestamp')
-                        if not communication_pairs[pair_key]['last_contact'] or chat.get('timestamp') > communication_pairs[pair_key]['last_contact']:
-                            communication_pairs[pair_key]['last_contact'] = chat.get('timestamp')
+            # Merge every person in UNWIND batches, with the case-specific label plus the shared,
+            # case_id-indexed Person label
+            await neo4j_repo.execute_cypher_unwind(f"""
+                UNWIND $rows AS row
+                MERGE (p:Person {{case_id: row.case_id, id: row.id}})
+                SET p += row, p:{person_label}
+            """, list(person_nodes.values()))
             
-            # From call records
-            for call in parsed_data.get("call_records", []):
-                caller = call.get("caller_number", "")
-                receiver = call.get("receiver_number", "")
-                
-                if caller and receiver:
-                    pair_key = tuple(sorted([caller, receiver]))
-                    if pair_key not in communication_pairs:
-                        communication_pairs[pair_key] = {
-                            'message_count': 0,
-                            'call_count': 0,
-                            'total_interactions': 0,
-                            'first_contact': call.get('timestamp'),
-                            'last_contact': call.get('timestamp'),
-                            'apps_used': set(),
-                            'message_types': set(),
-                            'call_types': set(),
-                            'total_call_duration': 0
-                        }
-                    
-                    communication_pairs[pair_key]['call_count'] += 1
-                    communication_pairs[pair_key]['total_interactions'] += 1
-                    communication_pairs[pair_key].setdefault('call_types', set()).add(call.get('call_type', 'unknown'))
-                    communication_pairs[pair_key].setdefault('total_call_duration', 0)
-                    communication_pairs[pair_key]['total_call_duration'] += call.get('duration', 0)
-                    
-                    # Update timestamps
-                    if call.get('timestamp'):
-                        if not communication_pairs[pair_key]['first_contact'] or call.get('timestamp') < communication_pairs[pair_key]['first_contact']:
-                            communication_pairs[pair_key]['first_contact'] = call.get('timestamp')
-                        if not communication_pairs[pair_key]['last_contact'] or call.get('timestamp') > communication_pairs[pair_key]['last_contact']:
-                            communication_pairs[pair_key]['last_contact'] = call.get('timestamp')
-            
-            # Create enhanced relationships in Neo4j
+            # Build enhanced relationships
+            relationships = []
             for pair_key, data in communication_pairs.items():
                 person1, person2 = pair_key
                 
                 # Calculate communication strength based on multiple factors
                 message_weight = min(data['message_count'] * 0.1, 5.0)  # Max 5 points from messages
                 call_weight = min(data['call_count'] * 0.3, 5.0)  # Max 5 points from calls
-                duration_weight = min(data.get('total_call_duration', 0) / 3600, 2.0)  # Max 2 points from duration (hours)
-                app_diversity = len(data.get('apps_used', set())) * 0.5  # Bonus for using multiple apps
+                duration_weight = min(data['total_call_duration'] / 3600, 2.0)  # Max 2 points from duration (hours)
+                app_diversity = len(data['apps_used']) * 0.5  # Bonus for using multiple apps
                 
                 strength = min(10.0, message_weight + call_weight + duration_weight + app_diversity) / 10.0
                 
@@ -761,33 +825,27 @@ class DataProcessor:
                     'frequency': data['total_interactions'],
                     'message_count': data['message_count'],
                     'call_count': data['call_count'],
-                    'total_call_duration': data.get('total_call_duration', 0),
+                    'total_call_duration': data['total_call_duration'],
                     'communication_strength': round(strength, 3),
-                    'apps_used': list(data.get('apps_used', set())),
-                    'message_types': list(data.get('message_types', set())),
-                    'call_types': list(data.get('call_types', set())),
+                    'apps_used': list(data['apps_used']),
+                    'message_types': list(data['message_types']),
+                    'call_types': list(data['call_types']),
                     'first_contact': str(data['first_contact']) if data['first_contact'] else None,
                     'last_contact': str(data['last_contact']) if data['last_contact'] else None,
-                    'created_at': datetime.utcnow().isoformat()
+                    'created_at': created_at
                 }
                 
-                # Create relationship with case-specific labels
-                await neo4j_repo.execute_cypher(f"""
-                    MATCH (a:{person_label} {{phone_number: $person1}})
-                    MATCH (b:{person_label} {{phone_number: $person2}})
-                    CREATE (a)-[r:COMMUNICATES_WITH $properties]->(b)
-                    RETURN r.id as rel_id
-                """, {
-                    "person1": person1,
-                    "person2": person2,
-                    "properties": rel_data
-                })
+                relationships.append({"person1": person1, "person2": person2, "properties": rel_data})
+            
+            await neo4j_repo.execute_cypher_unwind(
+                _CREATE_COMMUNICATIONS_CYPHER, relationships, {"case_id": safe_case_name}
+            )
             
             print(f"✅ Stored {len(person_nodes)} persons and {len(communication_pairs)} relationships in Neo4j namespace: {safe_case_name}")
             
-        except Exception as e:
-            print(f"❌ Error storing in Neo4j: {str(e)}")
-            # Continue processing even if Neo4j fails
+        except (Neo4jError, DriverError):
+            # Continue processing even if Neo4j fails; other errors are bugs and propagate
+            logger.exception("Neo4j store failed for case %s", safe_case_name)
 
 # Global data processor instance
 data_processor = DataProcessor()
\ No newline at end of file
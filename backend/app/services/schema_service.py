@@ -3,17 +3,89 @@ Schema-aware service for dynamic schema extraction and management.
 This service implements the TODO improvements for better LLM query accuracy.
 """
 
+import asyncio
 import json
 import logging
+from functools import lru_cache
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 from sqlalchemy import text, inspect
 from sqlalchemy.orm import Session
-from app.models.database import get_db
+from app.models.database import get_db_context
 from app.services.case_manager import case_manager
 
 logger = logging.getLogger(__name__)
 
+# Evidence tables whose sample rows are shown to the LLM
+SAMPLE_TABLES = ("chat_records", "call_records", "contacts", "media_files")
+
+# Fixed catalog statements are built once so SQLAlchemy's compiled cache is reused across cases
+_TABLES_SQL = text("""
+    SELECT table_name 
+    FROM information_schema.tables 
+    WHERE table_schema = :schema_name
+    ORDER BY table_name
+""")
+
+# Columns for every table of the schema in one round-trip instead of one query per table
+_COLUMNS_SQL = text("""
+    SELECT 
+        table_name,
+        column_name,
+        data_type,
+        is_nullable,
+        column_default,
+        character_maximum_length,
+        numeric_precision,
+        numeric_scale
+    FROM information_schema.columns 
+    WHERE table_schema = :schema_name 
+    ORDER BY table_name, ordinal_position
+""")
+
+_FOREIGN_KEYS_SQL = text("""
+    SELECT 
+        tc.table_name,
+        kcu.column_name,
+        ccu.table_name AS foreign_table_name,
+        ccu.column_name AS foreign_column_name
+    FROM information_schema.table_constraints AS tc 
+    JOIN information_schema.key_column_usage AS kcu
+        ON tc.constraint_name = kcu.constraint_name
+        AND tc.table_schema = kcu.table_schema
+    JOIN information_schema.constraint_column_usage AS ccu
+        ON ccu.constraint_name = tc.constraint_name
+        AND ccu.table_schema = tc.table_schema
+    WHERE tc.constraint_type = 'FOREIGN KEY' 
+    AND tc.table_schema = :schema_name
+""")
+
+
+@lru_cache(maxsize=64)
+def estimated_count_sql(schema_name: str, tables: Tuple[str, ...]) -> str:
+    """Build one query returning (table name, count) rows from planner statistics.
+
+    Callers only need magnitudes, so pg_class.reltuples replaces a full COUNT(*) scan; tables that
+    were never analyzed (or hold no pages) fall back to an exact COUNT(*), which Postgres only
+    evaluates when that CASE branch is taken.
+    """
+    return " UNION ALL ".join(
+        f"SELECT '{table}' AS data_type, "
+        f"CASE WHEN c.reltuples >= 0 AND c.relpages > 0 THEN c.reltuples::bigint "
+        f"ELSE (SELECT COUNT(*) FROM {schema_name}.{table}) END AS count "
+        f"FROM pg_class c WHERE c.oid = '{schema_name}.{table}'::regclass"
+        for table in tables
+    )
+
+
+def sample_rows_sql(schema_name: str, table_names: List[str], limit: int = 3) -> str:
+    """Build one UNION ALL query returning (table_name, record) JSONB sample rows for every table"""
+    return " UNION ALL ".join(
+        f"(SELECT '{table_name}' AS table_name, to_jsonb(t) - 'search' AS record "
+        f"FROM (SELECT * FROM {schema_name}.{table_name} LIMIT {limit}) t)"
+        for table_name in table_names
+    )
+
 
 class SchemaService:
     """Service for dynamic schema extraction and management."""
@@ -43,7 +115,23 @@ class SchemaService:
             safe_case_name = case_info["safe_case_name"]
             schema_name = f"case_{safe_case_name}"
             
-            db = next(get_db())
+            # Catalogue reads block on psycopg2, so run them on a worker thread instead of the event loop
+            schema_details = await asyncio.to_thread(self._read_schema_details, case_number, schema_name)
+            tables = schema_details["tables"]
+            
+            # Cache the schema
+            self._schema_cache[case_number] = schema_details
+            
+            logger.info(f"Schema extracted for case {case_number}: {len(tables)} tables")
+            return schema_details
+            
+        except Exception as e:
+            logger.error(f"Error extracting schema for case {case_number}: {e}")
+            return {}
+    
+    def _read_schema_details(self, case_number: str, schema_name: str) -> Dict[str, Any]:
+        """Read tables, relationships, samples and statistics of a case schema on one pooled session."""
+        with get_db_context() as db:
             schema_details = {
                 "case_number": case_number,
                 "schema_name": schema_name,
@@ -55,111 +143,57 @@ class SchemaService:
             }
             
             # Get table information
-            tables = await self._get_table_schemas(db, schema_name)
+            tables = self._get_table_schemas(db, schema_name)
             schema_details["tables"] = tables
             
             # Get relationships
-            relationships = await self._get_table_relationships(db, schema_name)
+            relationships = self._get_table_relationships(db, schema_name)
             schema_details["relationships"] = relationships
             
             # Get sample data for key fields
-            sample_data = await self._get_sample_data(db, schema_name, tables)
+            sample_data = self._get_sample_data(db, schema_name, tables)
             schema_details["sample_data"] = sample_data
             
             # Get statistics
-            statistics = await self._get_table_statistics(db, schema_name, tables)
+            statistics = self._get_table_statistics(db, schema_name, tables)
             schema_details["statistics"] = statistics
-            
-            db.close()
-            
-            # Cache the schema
-            self._schema_cache[case_number] = schema_details
-            
-            logger.info(f"Schema extracted for case {case_number}: {len(tables)} tables")
-            return schema_details
-            
-        except Exception as e:
-            logger.error(f"Error extracting schema for case {case_number}: {e}")
-            return {}
+        
+        return schema_details
     
-    async def _get_table_schemas(self, db: Session, schema_name: str) -> Dict[str, Any]:
+    def _get_table_schemas(self, db: Session, schema_name: str) -> Dict[str, Any]:
         """Get detailed table schemas."""
         tables = {}
         
         # Get list of tables in the schema
-        table_query = text("""
-            SELECT table_name 
-            FROM information_schema.tables 
-            WHERE table_schema = :schema_name
-            ORDER BY table_name
-        """)
-        
-        table_results = db.execute(table_query, {"schema_name": schema_name}).fetchall()
-        table_names = [row[0] for row in table_results]
+        table_results = db.execute(_TABLES_SQL, {"schema_name": schema_name}).fetchall()
+        for row in table_results:
+            tables[row[0]] = {"columns": {}, "column_count": 0}
         
-        for table_name in table_names:
-            # Get column information
-            column_query = text("""
-                SELECT 
-                    column_name,
-                    data_type,
-                    is_nullable,
-                    column_default,
-                    character_maximum_length,
-                    numeric_precision,
-                    numeric_scale
-                FROM information_schema.columns 
-                WHERE table_schema = :schema_name 
-                AND table_name = :table_name
-                ORDER BY ordinal_position
-            """)
-            
-            column_results = db.execute(column_query, {
-                "schema_name": schema_name,
-                "table_name": table_name
-            }).fetchall()
-            
-            columns = {}
-            for col in column_results:
-                column_info = {
-                    "type": self._abbreviate_type(col.data_type),
-                    "nullable": col.is_nullable == 'YES',
-                    "default": col.column_default,
-                    "max_length": col.character_maximum_length,
-                    "precision": col.numeric_precision,
-                    "scale": col.numeric_scale
-                }
-                columns[col.column_name] = column_info
-            
-            tables[table_name] = {
-                "columns": columns,
-                "column_count": len(columns)
+        # Get column information for all tables at once
+        column_results = db.execute(_COLUMNS_SQL, {"schema_name": schema_name}).fetchall()
+        for col in column_results:
+            table_info = tables.get(col.table_name)
+            if table_info is None:
+                continue
+            table_info["columns"][col.column_name] = {
+                "type": self._abbreviate_type(col.data_type),
+                "nullable": col.is_nullable == 'YES',
+                "default": col.column_default,
+                "max_length": col.character_maximum_length,
+                "precision": col.numeric_precision,
+                "scale": col.numeric_scale
             }
         
+        for table_info in tables.values():
+            table_info["column_count"] = len(table_info["columns"])
+        
         return tables
     
-    async def _get_table_relationships(self, db: Session, schema_name: str) -> List[Dict[str, Any]]:
+    def _get_table_relationships(self, db: Session, schema_name: str) -> List[Dict[str, Any]]:
         """Get foreign key relationships between tables."""
         relationships = []
         
-        fk_query = text("""
-            SELECT 
-                tc.table_name,
-                kcu.column_name,
-                ccu.table_name AS foreign_table_name,
-                ccu.column_name AS foreign_column_name
-            FROM information_schema.table_constraints AS tc 
-            JOIN information_schema.key_column_usage AS kcu
-                ON tc.constraint_name = kcu.constraint_name
-                AND tc.table_schema = kcu.table_schema
-            JOIN information_schema.constraint_column_usage AS ccu
-                ON ccu.constraint_name = tc.constraint_name
-                AND ccu.table_schema = tc.table_schema
-            WHERE tc.constraint_type = 'FOREIGN KEY' 
-            AND tc.table_schema = :schema_name
-        """)
-        
-        fk_results = db.execute(fk_query, {"schema_name": schema_name}).fetchall()
+        fk_results = db.execute(_FOREIGN_KEYS_SQL, {"schema_name": schema_name}).fetchall()
         
         for fk in fk_results:
             relationships.append({
@@ -171,50 +205,37 @@ class SchemaService:
         
         return relationships
     
-    async def _get_sample_data(self, db: Session, schema_name: str, tables: Dict[str, Any]) -> Dict[str, Any]:
+    def _get_sample_data(self, db: Session, schema_name: str, tables: Dict[str, Any]) -> Dict[str, Any]:
         """Get sample data for key fields to help LLM understand data patterns."""
         sample_data = {}
+        sample_tables = [table_name for table_name in tables if table_name in SAMPLE_TABLES]
+        if not sample_tables:
+            return sample_data
         
-        for table_name, table_info in tables.items():
-            if table_name in ['chat_records', 'call_records', 'contacts', 'media_files']:
-                try:
-                    # Get sample records (limit to 3 for token efficiency)
-                    sample_query = text(f"SELECT * FROM {schema_name}.{table_name} LIMIT 3")
-                    sample_results = db.execute(sample_query).fetchall()
-                    
-                    if sample_results:
-                        # Convert to dict format
-                        sample_records = []
-                        for row in sample_results:
-                            if hasattr(row, '_mapping'):
-                                record = dict(row._mapping)
-                                # Convert non-serializable types
-                                for key, value in record.items():
-                                    if hasattr(value, 'isoformat'):  # datetime
-                                        record[key] = value.isoformat()
-                                    elif hasattr(value, 'hex'):  # UUID
-                                        record[key] = str(value)
-                                sample_records.append(record)
-                        
-                        sample_data[table_name] = sample_records
-                        
-                except Exception as e:
-                    logger.warning(f"Could not get sample data for {table_name}: {e}")
+        try:
+            # Get sample records (limit to 3 for token efficiency) for every table in one query;
+            # to_jsonb already renders timestamps and UUIDs as strings
+            sample_results = db.execute(text(sample_rows_sql(schema_name, sample_tables))).fetchall()
+            for table_name, record in sample_results:
+                if isinstance(record, dict):
+                    sample_data.setdefault(table_name, []).append(record)
+        except Exception as e:
+            logger.warning(f"Could not get sample data for {schema_name}: {e}")
         
         return sample_data
     
-    async def _get_table_statistics(self, db: Session, schema_name: str, tables: Dict[str, Any]) -> Dict[str, Any]:
+    def _get_table_statistics(self, db: Session, schema_name: str, tables: Dict[str, Any]) -> Dict[str, Any]:
         """Get table statistics for better query planning."""
-        statistics = {}
+        statistics = {table_name: {"row_count": 0} for table_name in tables}
+        if not statistics:
+            return statistics
         
-        for table_name in tables.keys():
-            try:
-                count_query = text(f"SELECT COUNT(*) FROM {schema_name}.{table_name}")
-                count_result = db.execute(count_query).scalar()
-                statistics[table_name] = {"row_count": count_result}
-            except Exception as e:
-                logger.warning(f"Could not get statistics for {table_name}: {e}")
-                statistics[table_name] = {"row_count": 0}
+        try:
+            # Estimated row counts for every table in a single catalog round-trip
+            for table_name, row_count in db.execute(text(estimated_count_sql(schema_name, tuple(tables)))):
+                statistics[table_name] = {"row_count": row_count}
+        except Exception as e:
+            logger.warning(f"Could not get statistics for {schema_name}: {e}")
         
         return statistics
     
@@ -3,18 +3,93 @@ UFDR Comprehensive Report Generator with PDF export functionality.
 """
 
 import asyncio
-from typing import Dict, Any, List, Optional
+import heapq
+from collections import defaultdict
+from typing import Dict, Any, AsyncIterator, List, Optional
 from datetime import datetime
 import json
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
-from app.models.database import get_db
+from app.models.database import get_db_context
 from app.services.ai_service import ai_service
 from app.services.vector_service import vector_service
 from app.repositories.neo4j_repository import neo4j_repo
 from config.settings import settings
 
+
+# Report evidence queries use unqualified table names and run with search_path set to the
+# case schema, so every case shares the same statements (and SQLAlchemy's compiled cache)
+_SET_SEARCH_PATH = text("SELECT set_config('search_path', :schema_name || ', public', true)")
+
+# Projections are limited to the columns the analysis, LLM prompt and PDF actually read;
+# the per-record JSONB metadata and file hashes/paths are never used by the report
+_CASE_DATA_STATEMENTS = {
+    "ufdr": text("""
+        SELECT id, filename, device_info, extraction_date, investigator, processed
+        FROM ufdr_reports 
+        WHERE case_number = :case_number
+    """),
+    "chat": text("""
+        SELECT app_name, sender_number, receiver_number, message_content, 
+               timestamp, message_type, is_deleted
+        FROM chat_records 
+        WHERE ufdr_report_id = ANY(CAST(:ufdr_ids AS uuid[]))
+        ORDER BY timestamp DESC
+    """),
+    "call": text("""
+        SELECT caller_number, receiver_number, call_type, duration, timestamp
+        FROM call_records 
+        WHERE ufdr_report_id = ANY(CAST(:ufdr_ids AS uuid[]))
+        ORDER BY timestamp DESC
+    """),
+    "contact": text("""
+        SELECT name, phone_numbers, email_addresses
+        FROM contacts 
+        WHERE ufdr_report_id = ANY(CAST(:ufdr_ids AS uuid[]))
+    """),
+    "media": text("""
+        SELECT filename, file_type, file_size, created_date
+        FROM media_files 
+        WHERE ufdr_report_id = ANY(CAST(:ufdr_ids AS uuid[]))
+    """),
+}
+
+# Per-contact maps and indicator lists grow with the evidence; the report prompt only needs the top entries
+PROMPT_TOP_K = 10
+
+# Static instructions of the report prompt - sent as a cacheable prefix, only the case data varies per call
+_REPORT_PREFIX = """
+Generate a comprehensive forensic investigation report based on the UFDR analysis data given at the end.
+
+REQUIREMENTS:
+1. Generate a professional forensic report suitable for law enforcement
+2. Include executive summary, key findings, evidence analysis, risk assessment, and recommendations
+3. Provide criminal risk percentage for each contact based on communication patterns
+4. Mention if any information is not available or insufficient
+5. Keep the report comprehensive but focused on actionable intelligence
+6. Include specific evidence references and timestamps where available
+7. Assess the overall threat level and provide investigation priorities
+
+FORMAT:
+- Executive Summary
+- Key Findings & Evidence
+- Network Analysis & Key Players
+- Criminal Risk Assessment (with percentages)
+- Timeline Analysis
+- Recommendations for Further Investigation
+- Data Limitations & Missing Information
+"""
+
+
+def _top_entries(mapping: Dict[str, Any], key=None, limit: int = PROMPT_TOP_K) -> Dict[str, Any]:
+    """Keep the `limit` largest entries of a mapping (by value, or by key(value))"""
+    if len(mapping) <= limit:
+        return mapping
+    sort_key = (lambda item: key(item[1])) if key else (lambda item: item[1])
+    return dict(heapq.nlargest(limit, mapping.items(), key=sort_key))
+
+
 class UFDRReportGenerator:
     def __init__(self):
         pass
@@ -102,15 +177,10 @@ class UFDRReportGenerator:
             schema_name = f"case_{safe_case_name}"
             print(f"🔍 Gathering data from schema: {schema_name}")
             
-            db = next(get_db())
+            statements = _CASE_DATA_STATEMENTS
             
             # Get UFDR reports for this case from case-specific schema
-            ufdr_query = text(f"""
-                SELECT id, filename, device_info, extraction_date, investigator, processed
-                FROM {schema_name}.ufdr_reports 
-                WHERE case_number = :case_number
-            """)
-            ufdr_results = db.execute(ufdr_query, {"case_number": case_number}).fetchall()
+            ufdr_results = await asyncio.to_thread(self._fetch_rows, statements["ufdr"], {"case_number": case_number}, schema_name)
             
             if not ufdr_results:
                 print(f"⚠️ No UFDR reports found for case {case_number} in schema {schema_name}")
@@ -125,89 +195,51 @@ class UFDRReportGenerator:
                     "investigator": ufdr.investigator,
                     "processed": ufdr.processed
                 })
-                
-                ufdr_id = ufdr.id
-                
-                # Get chat records from case-specific schema
-                chat_query = text(f"""
-                    SELECT app_name, sender_number, receiver_number, message_content, 
-                           timestamp, message_type, is_deleted, metadata
-                    FROM {schema_name}.chat_records 
-                    WHERE ufdr_report_id = :ufdr_id
-                    ORDER BY timestamp DESC
-                """)
-                chat_results = db.execute(chat_query, {"ufdr_id": ufdr_id}).fetchall()
-                
-                for chat in chat_results:
-                    case_data["chat_records"].append({
-                        "app_name": chat.app_name,
-                        "sender_number": chat.sender_number,
-                        "receiver_number": chat.receiver_number,
-                        "message_content": chat.message_content,
-                        "timestamp": str(chat.timestamp) if chat.timestamp else None,
-                        "message_type": chat.message_type,
-                        "is_deleted": chat.is_deleted,
-                        "metadata": chat.metadata
-                    })
-                
-                # Get call records from case-specific schema
-                call_query = text(f"""
-                    SELECT caller_number, receiver_number, call_type, duration, timestamp, metadata
-                    FROM {schema_name}.call_records 
-                    WHERE ufdr_report_id = :ufdr_id
-                    ORDER BY timestamp DESC
-                """)
-                call_results = db.execute(call_query, {"ufdr_id": ufdr_id}).fetchall()
-                
-                for call in call_results:
-                    case_data["call_records"].append({
-                        "caller_number": call.caller_number,
-                        "receiver_number": call.receiver_number,
-                        "call_type": call.call_type,
-                        "duration": call.duration,
-                        "timestamp": str(call.timestamp) if call.timestamp else None,
-                        "metadata": call.metadata
-                    })
-                
-                # Get contacts from case-specific schema
-                contact_query = text(f"""
-                    SELECT name, phone_numbers, email_addresses, metadata
-                    FROM {schema_name}.contacts 
-                    WHERE ufdr_report_id = :ufdr_id
-                """)
-                contact_results = db.execute(contact_query, {"ufdr_id": ufdr_id}).fetchall()
-                
-                for contact in contact_results:
-                    case_data["contacts"].append({
-                        "name": contact.name,
-                        "phone_numbers": contact.phone_numbers,
-                        "email_addresses": contact.email_addresses,
-                        "metadata": contact.metadata
-                    })
-                
-                # Get media files from case-specific schema
-                media_query = text(f"""
-                    SELECT filename, file_path, file_type, file_size, created_date, 
-                           modified_date, hash_md5, hash_sha256, metadata
-                    FROM {schema_name}.media_files 
-                    WHERE ufdr_report_id = :ufdr_id
-                """)
-                media_results = db.execute(media_query, {"ufdr_id": ufdr_id}).fetchall()
-                
-                for media in media_results:
-                    case_data["media_files"].append({
-                        "filename": media.filename,
-                        "file_path": media.file_path,
-                        "file_type": media.file_type,
-                        "file_size": media.file_size,
-                        "created_date": str(media.created_date) if media.created_date else None,
-                        "modified_date": str(media.modified_date) if media.modified_date else None,
-                        "hash_md5": media.hash_md5,
-                        "hash_sha256": media.hash_sha256,
-                        "metadata": media.metadata
-                    })
-            
-            db.close()
+            
+            ufdr_params = {"ufdr_ids": [str(ufdr.id) for ufdr in ufdr_results]}
+            
+            # The four tables are independent - fetch them concurrently, each on its own connection
+            chat_results, call_results, contact_results, media_results = await asyncio.gather(
+                asyncio.to_thread(self._fetch_rows, statements["chat"], ufdr_params, schema_name),
+                asyncio.to_thread(self._fetch_rows, statements["call"], ufdr_params, schema_name),
+                asyncio.to_thread(self._fetch_rows, statements["contact"], ufdr_params, schema_name),
+                asyncio.to_thread(self._fetch_rows, statements["media"], ufdr_params, schema_name)
+            )
+            
+            for chat in chat_results:
+                case_data["chat_records"].append({
+                    "app_name": chat.app_name,
+                    "sender_number": chat.sender_number,
+                    "receiver_number": chat.receiver_number,
+                    "message_content": chat.message_content,
+                    "timestamp": str(chat.timestamp) if chat.timestamp else None,
+                    "message_type": chat.message_type,
+                    "is_deleted": chat.is_deleted
+                })
+            
+            for call in call_results:
+                case_data["call_records"].append({
+                    "caller_number": call.caller_number,
+                    "receiver_number": call.receiver_number,
+                    "call_type": call.call_type,
+                    "duration": call.duration,
+                    "timestamp": str(call.timestamp) if call.timestamp else None
+                })
+            
+            for contact in contact_results:
+                case_data["contacts"].append({
+                    "name": contact.name,
+                    "phone_numbers": contact.phone_numbers,
+                    "email_addresses": contact.email_addresses
+                })
+            
+            for media in media_results:
+                case_data["media_files"].append({
+                    "filename": media.filename,
+                    "file_type": media.file_type,
+                    "file_size": media.file_size,
+                    "created_date": str(media.created_date) if media.created_date else None
+                })
             
             # Check if we have any data
             total_records = (len(case_data["chat_records"]) + 
@@ -224,6 +256,12 @@ class UFDRReportGenerator:
         
         return case_data
     
+    def _fetch_rows(self, query, params: Dict[str, Any], schema_name: str) -> List[Any]:
+        """Run a read query against a case schema on its own session so callers can fan out across threads."""
+        with get_db_context() as db:
+            db.execute(_SET_SEARCH_PATH, {"schema_name": schema_name})
+            return db.execute(query, params).fetchall()
+    
     async def _perform_comprehensive_analysis(self, case_data: Dict[str, Any]) -> Dict[str, Any]:
         """Perform comprehensive analysis on the case data."""
         
@@ -370,14 +408,27 @@ class UFDRReportGenerator:
             "secret", "delete", "destroy", "evidence"
         ]
         
+        # Single pass over the chats: suspicious content, deletions, apps and per-contact activity
         suspicious_count = 0
+        deleted_count = 0
+        apps_used = set()
+        contact_interactions = defaultdict(lambda: {"messages": 0, "suspicious": 0})
         for chat in case_data.get("chat_records", []):
-            content = chat.get("message_content", "").lower()
-            for keyword in suspicious_keywords:
-                if keyword in content:
-                    suspicious_count += 1
-                    risk_factors["suspicious_indicators"].append(f"Message contains '{keyword}': {content[:50]}...")
-                    break
+            content = (chat.get("message_content") or "").lower()
+            matched_keyword = next((keyword for keyword in suspicious_keywords if keyword in content), None)
+            if matched_keyword:
+                suspicious_count += 1
+                risk_factors["suspicious_indicators"].append(f"Message contains '{matched_keyword}': {content[:50]}...")
+            
+            if chat.get("is_deleted", False):
+                deleted_count += 1
+            apps_used.add(chat.get("app_name"))
+            
+            for contact in (chat.get("sender_number"), chat.get("receiver_number")):
+                if contact and contact != "Unknown":
+                    contact_interactions[contact]["messages"] += 1
+                    if matched_keyword:
+                        contact_interactions[contact]["suspicious"] += 1
         
         # Risk scoring
         if suspicious_count > 0:
@@ -385,7 +436,6 @@ class UFDRReportGenerator:
             risk_factors["risk_factors"].append(f"Suspicious content detected in {suspicious_count} messages")
         
         # Check for deleted messages
-        deleted_count = sum(1 for chat in case_data.get("chat_records", []) if chat.get("is_deleted", False))
         if deleted_count > 0:
             risk_score += min(deleted_count * 5, 20)
             risk_factors["risk_factors"].append(f"{deleted_count} deleted messages found")
@@ -397,30 +447,10 @@ class UFDRReportGenerator:
             risk_factors["risk_factors"].append(f"{zero_calls} zero-duration calls (potential failed attempts)")
         
         # Check for multiple apps usage (potential evasion)
-        apps_used = set(chat.get("app_name") for chat in case_data.get("chat_records", []))
         if len(apps_used) > 3:
             risk_score += 10
             risk_factors["risk_factors"].append(f"Multiple communication apps used: {', '.join(apps_used)}")
         
-        # Assess individual contact risk
-        contact_interactions = {}
-        for chat in case_data.get("chat_records", []):
-            sender = chat.get("sender_number")
-            receiver = chat.get("receiver_number")
-            content = chat.get("message_content", "").lower()
-            
-            for contact in [sender, receiver]:
-                if contact and contact != "Unknown":
-                    if contact not in contact_interactions:
-                        contact_interactions[contact] = {"messages": 0, "suspicious": 0}
-                    contact_interactions[contact]["messages"] += 1
-                    
-                    # Check for suspicious content from this contact
-                    for keyword in suspicious_keywords:
-                        if keyword in content:
-                            contact_interactions[contact]["suspicious"] += 1
-                            break
-        
         # Calculate contact risk scores
         for contact, data in contact_interactions.items():
             contact_risk = 0
@@ -521,7 +551,7 @@ class UFDRReportGenerator:
                                 "matches": len(results),
                                 "relevance": results[0].get("score", 0.0) if results else 0.0
                             })
-                    except:
+                    except Exception:
                         continue
             
         except Exception as e:
@@ -551,66 +581,104 @@ class UFDRReportGenerator:
         
         return device_analysis
     
+    async def stream_comprehensive_report(self, case_number: str) -> AsyncIterator[str]:
+        """Stream the report text for a case as Gemini produces it."""
+        
+        print(f"🔍 Streaming UFDR report for case: {case_number}")
+        
+        case_data = await self._gather_case_data(case_number)
+        if not case_data or not case_data.get('has_data'):
+            yield "No data found for the specified case"
+            return
+        
+        analysis_results = await self._perform_comprehensive_analysis(case_data)
+        async for chunk in self._stream_llm_report(case_data, analysis_results):
+            yield chunk
+    
+    async def _stream_llm_report(self, case_data: Dict[str, Any], analysis_results: Dict[str, Any]) -> AsyncIterator[str]:
+        """Yield the LLM report chunk by chunk, or the fallback report in one piece."""
+        
+        streamed_any = False
+        try:
+            if ai_service.gemini_model:
+                response = await asyncio.to_thread(
+                    ai_service._generate_with_prefix,
+                    _REPORT_PREFIX, self._build_report_data(case_data, analysis_results), stream=True
+                )
+                chunks = iter(response)
+                while True:
+                    # Each chunk is a blocking read from the Gemini stream; keep it off the event loop
+                    chunk = await asyncio.to_thread(next, chunks, None)
+                    if chunk is None:
+                        break
+                    chunk_text = getattr(chunk, "text", "")
+                    if chunk_text:
+                        streamed_any = True
+                        yield chunk_text
+        except Exception as e:
+            print(f"❌ Error streaming LLM report: {e}")
+            if streamed_any:
+                return
+        
+        if not streamed_any:
+            yield self._generate_fallback_report(case_data, analysis_results)
+    
     async def _generate_llm_report(self, case_data: Dict[str, Any], analysis_results: Dict[str, Any]) -> str:
         """Generate comprehensive LLM-powered forensic report."""
         
-        # Prepare data summary for LLM
+        try:
+            if ai_service.gemini_model:
+                response = await ai_service._agenerate_with_prefix(_REPORT_PREFIX, self._build_report_data(case_data, analysis_results))
+                if response and response.text:
+                    return response.text
+            
+            # Fallback report if LLM is not available
+            return self._generate_fallback_report(case_data, analysis_results)
+            
+        except Exception as e:
+            print(f"❌ Error generating LLM report: {e}")
+            return self._generate_fallback_report(case_data, analysis_results)
+    
+    def _build_report_data(self, case_data: Dict[str, Any], analysis_results: Dict[str, Any]) -> str:
+        """Build the per-case part of the report prompt."""
+        
+        communication_patterns = dict(analysis_results.get("communication_patterns", {}))
+        if "most_active_contacts" in communication_patterns:
+            communication_patterns["most_active_contacts"] = _top_entries(communication_patterns["most_active_contacts"])
+        
+        risk_assessment = dict(analysis_results.get("risk_assessment", {}))
+        if "contact_risk_scores" in risk_assessment:
+            risk_assessment["contact_risk_scores"] = _top_entries(
+                risk_assessment["contact_risk_scores"], key=lambda score: score.get("risk_percentage", 0)
+            )
+        if "suspicious_indicators" in risk_assessment:
+            risk_assessment["suspicious_indicators"] = risk_assessment["suspicious_indicators"][:PROMPT_TOP_K]
+        
+        # Prepare data summary for LLM - only the top entries of each unbounded section
         data_summary = {
             "case_number": case_data.get("case_number"),
             "total_chat_records": len(case_data.get("chat_records", [])),
             "total_call_records": len(case_data.get("call_records", [])),
             "total_contacts": len(case_data.get("contacts", [])),
             "total_media_files": len(case_data.get("media_files", [])),
-            "communication_patterns": analysis_results.get("communication_patterns", {}),
+            "communication_patterns": communication_patterns,
             "network_analysis": analysis_results.get("network_analysis", {}),
-            "risk_assessment": analysis_results.get("risk_assessment", {}),
+            "risk_assessment": risk_assessment,
             "timeline_analysis": analysis_results.get("timeline_analysis", {}),
             "device_analysis": analysis_results.get("device_analysis", {})
         }
         
-        # Create comprehensive prompt for LLM
-        report_prompt = f"""
-Generate a comprehensive forensic investigation report based on the following UFDR analysis data:
-
+        # Per-case part of the prompt, compact JSON (no indentation whitespace spent on tokens)
+        report_data = f"""
 CASE DATA SUMMARY:
-{json.dumps(data_summary, indent=2, default=str)}
+{json.dumps(data_summary, separators=(',', ':'), default=str)}
 
 SAMPLE COMMUNICATIONS:
 {self._get_sample_communications(case_data)}
 
-REQUIREMENTS:
-1. Generate a professional forensic report suitable for law enforcement
-2. Include executive summary, key findings, evidence analysis, risk assessment, and recommendations
-3. Provide criminal risk percentage for each contact based on communication patterns
-4. Mention if any information is not available or insufficient
-5. Keep the report comprehensive but focused on actionable intelligence
-6. Include specific evidence references and timestamps where available
-7. Assess the overall threat level and provide investigation priorities
-
-FORMAT:
-- Executive Summary
-- Key Findings & Evidence
-- Network Analysis & Key Players
-- Criminal Risk Assessment (with percentages)
-- Timeline Analysis
-- Recommendations for Further Investigation
-- Data Limitations & Missing Information
-
 Generate a complete, professional forensic investigation report now:
 """
-        
-        try:
-            if ai_service.gemini_model:
-                response = ai_service.gemini_model.generate_content(report_prompt)
-                if response and response.text:
-                    return response.text
-            
-            # Fallback report if LLM is not available
-            return self._generate_fallback_report(case_data, analysis_results)
-            
-        except Exception as e:
-            print(f"❌ Error generating LLM report: {e}")
-            return self._generate_fallback_report(case_data, analysis_results)
+        return report_data
     
     def _get_sample_communications(self, case_data: Dict[str, Any]) -> str:
         """Get sample communications for LLM context."""
@@ -632,8 +700,14 @@ Generate a complete, professional forensic investigation report now:
         
         risk_assessment = analysis_results.get("risk_assessment", {})
         network_analysis = analysis_results.get("network_analysis", {})
+        communication_patterns = analysis_results.get("communication_patterns", {})
+        total_chats = len(case_data.get('chat_records', []))
+        total_calls = len(case_data.get('call_records', []))
+        total_contacts = len(case_data.get('contacts', []))
+        total_media = len(case_data.get('media_files', []))
         
-        report = f"""
+        # Collect report sections and join once at the end
+        parts = [f"""
 # COMPREHENSIVE UFDR FORENSIC ANALYSIS REPORT
 
 **Case Number:** {case_data.get('case_number', 'Unknown')}
@@ -642,7 +716,7 @@ Generate a complete, professional forensic investigation report now:
 
 ## EXECUTIVE SUMMARY
 
-This report presents a comprehensive analysis of digital forensic data extracted from mobile devices. The analysis covers {len(case_data.get('chat_records', []))} chat records, {len(case_data.get('call_records', []))} call records, {len(case_data.get('contacts', []))} contacts, and {len(case_data.get('media_files', []))} media files.
+This report presents a comprehensive analysis of digital forensic data extracted from mobile devices. The analysis covers {total_chats} chat records, {total_calls} call records, {total_contacts} contacts, and {total_media} media files.
 
 **Overall Risk Level:** {risk_assessment.get('risk_level', 'Unknown')}
 **Risk Score:** {risk_assessment.get('overall_risk_score', 0)}/100
@@ -650,9 +724,9 @@ This report presents a comprehensive analysis of digital forensic data extracted
 ## KEY FINDINGS & EVIDENCE
 
 ### Communication Patterns
-- Total Communications: {analysis_results.get('communication_patterns', {}).get('total_communications', 0)}
-- Apps Used: {', '.join(analysis_results.get('communication_patterns', {}).get('apps_used', {}).keys())}
-- Deleted Messages: {analysis_results.get('communication_patterns', {}).get('deleted_messages', 0)}
+- Total Communications: {communication_patterns.get('total_communications', 0)}
+- Apps Used: {', '.join(communication_patterns.get('apps_used', {}).keys())}
+- Deleted Messages: {communication_patterns.get('deleted_messages', 0)}
 
 ### Network Analysis
 - Network Nodes: {network_analysis.get('total_nodes', 0)}
@@ -662,22 +736,22 @@ This report presents a comprehensive analysis of digital forensic data extracted
 ## CRIMINAL RISK ASSESSMENT
 
 ### Contact Risk Scores:
-"""
+"""]
         
         # Add contact risk scores
         contact_risks = risk_assessment.get('contact_risk_scores', {})
         for contact, risk_data in contact_risks.items():
-            report += f"\n- **{contact}**: {risk_data.get('risk_percentage', 0)}% risk ({risk_data.get('suspicious_messages', 0)}/{risk_data.get('total_messages', 0)} suspicious messages)"
+            parts.append(f"\n- **{contact}**: {risk_data.get('risk_percentage', 0)}% risk ({risk_data.get('suspicious_messages', 0)}/{risk_data.get('total_messages', 0)} suspicious messages)")
         
-        report += f"""
+        parts.append("""
 
 ### Risk Factors Identified:
-"""
+""")
         
         for factor in risk_assessment.get('risk_factors', []):
-            report += f"\n- {factor}"
+            parts.append(f"\n- {factor}")
         
-        report += f"""
+        parts.append("""
 
 ## RECOMMENDATIONS
 
@@ -693,9 +767,9 @@ This report presents a comprehensive analysis of digital forensic data extracted
 - Network analysis limited to available relationship data
 
 **End of Report**
-"""
+""")
         
-        return report
+        return "".join(parts)
 
 # Global instance
 ufdr_report_generator = UFDRReportGenerator()
\ No newline at end of file
@@ -8,13 +8,68 @@ from typing import Dict, List, Any, Optional, Tuple
 from uuid import uuid4
 import numpy as np
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
+from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue, SearchRequest
 from config.settings import settings
 from fastembed import TextEmbedding
 
 logger = logging.getLogger(__name__)
 
 
+# Enhanced suspicious conversation queries - fixed texts, so they are embedded once per process
+SUSPICIOUS_QUERIES = (
+    "suspicious conversations criminal activity illegal",
+    "threats violence dangerous behavior",
+    "drug dealing trafficking illegal substances",
+    "fraud scam money laundering financial crime",
+    "terrorism extremist activity radical",
+    "weapons guns explosives dangerous materials",
+    "human trafficking exploitation abuse",
+    "cybercrime hacking data breach security",
+    "blackmail extortion threats intimidation",
+    "organized crime gang activity conspiracy",
+    "money transfer payment suspicious financial",
+    "meeting location secret hidden private",
+    "code words encrypted messages secret communication",
+    "urgent emergency immediate action required",
+    "police law enforcement investigation avoid",
+    "evidence destroy delete remove traces",
+    "confidential secret classified information",
+    "planning preparation execution criminal act"
+)
+
+# Suspicious keywords and their weights (substring matches on lowercased message content)
+SUSPICIOUS_PATTERN_WEIGHTS = {
+    # High weight patterns
+    "kill": 0.3, "murder": 0.3, "death": 0.2, "die": 0.2,
+    "bomb": 0.4, "explosive": 0.4, "weapon": 0.3, "gun": 0.3,
+    "drug": 0.3, "cocaine": 0.4, "heroin": 0.4, "marijuana": 0.2,
+    "fraud": 0.3, "scam": 0.3, "steal": 0.2, "rob": 0.2,
+    "threat": 0.3, "blackmail": 0.4, "extort": 0.4,
+    "terror": 0.4, "attack": 0.3,
+    "traffic": 0.3, "exploit": 0.3, "abuse": 0.3,
+    "hack": 0.3, "breach": 0.3, "steal data": 0.3,
+    "money": 0.1, "payment": 0.1, "transfer": 0.1,
+    "secret": 0.2, "confidential": 0.2, "private": 0.1,
+    "urgent": 0.1, "immediate": 0.1, "asap": 0.1,
+    "police": 0.2, "cop": 0.2, "fbi": 0.3, "investigation": 0.2,
+    "evidence": 0.2, "destroy": 0.2, "delete": 0.1,
+    "meet": 0.1, "location": 0.1, "address": 0.1,
+    "code": 0.2, "encrypted": 0.2, "password": 0.1
+}
+_SUSPICIOUS_PATTERNS = tuple(SUSPICIOUS_PATTERN_WEIGHTS)
+_SUSPICIOUS_WEIGHTS = np.fromiter(SUSPICIOUS_PATTERN_WEIGHTS.values(), dtype=np.float32)
+_MAX_SUSPICIOUS_SCORE = float(_SUSPICIOUS_WEIGHTS.sum())
+
+# Keywords reported back as a hit's suspicious indicators
+SUSPICIOUS_INDICATOR_KEYWORDS = (
+    "kill", "murder", "death", "bomb", "weapon", "gun",
+    "drug", "cocaine", "heroin", "fraud", "scam", "steal",
+    "threat", "blackmail", "extort", "terror", "attack",
+    "traffic", "exploit", "abuse", "hack", "breach",
+    "secret", "confidential", "urgent", "police", "evidence"
+)
+
+
 class VectorService:
     """Service for vector embeddings and semantic search."""
     
@@ -24,6 +79,7 @@ class VectorService:
         self.embedder: Optional[TextEmbedding] = None
         self.collection_name = "forensic_data"
         self._embedding_dimension: Optional[int] = None
+        self._suspicious_query_matrix: Optional[np.ndarray] = None
         self._initialize_clients()
     
     def _initialize_clients(self):
@@ -130,7 +186,8 @@ class VectorService:
             )
             
             # Store in Qdrant
-            self.qdrant_client.upsert(
+            await asyncio.to_thread(
+                self.qdrant_client.upsert,
                 collection_name=self.collection_name,
                 points=[point]
             )
@@ -178,7 +235,8 @@ class VectorService:
             )
             
             # Store in Qdrant
-            self.qdrant_client.upsert(
+            await asyncio.to_thread(
+                self.qdrant_client.upsert,
                 collection_name=self.collection_name,
                 points=[point]
             )
@@ -227,7 +285,8 @@ class VectorService:
             )
             
             # Store in Qdrant
-            self.qdrant_client.upsert(
+            await asyncio.to_thread(
+                self.qdrant_client.upsert,
                 collection_name=self.collection_name,
                 points=[point]
             )
@@ -266,7 +325,8 @@ class VectorService:
                 )
             
             # Perform search
-            search_result = self.qdrant_client.search(
+            search_result = await asyncio.to_thread(
+                self.qdrant_client.search,
                 collection_name=self.collection_name,
                 query_vector=query_embedding,
                 query_filter=Filter(must=filter_conditions) if filter_conditions else None,
@@ -344,74 +404,52 @@ class VectorService:
             collection_name = f"case_{safe_case_name}"
             
             # Check if collection exists
-            collections = self.qdrant_client.get_collections()
-            collection_names = [col.name for col in collections.collections]
-            
-            if collection_name not in collection_names:
+            if not await asyncio.to_thread(self.qdrant_client.collection_exists, collection_name):
                 logger.warning(f"Collection {collection_name} does not exist")
                 return []
             
-            # Enhanced suspicious conversation queries
-            suspicious_queries = [
-                "suspicious conversations criminal activity illegal",
-                "threats violence dangerous behavior",
-                "drug dealing trafficking illegal substances",
-                "fraud scam money laundering financial crime",
-                "terrorism extremist activity radical",
-                "weapons guns explosives dangerous materials",
-                "human trafficking exploitation abuse",
-                "cybercrime hacking data breach security",
-                "blackmail extortion threats intimidation",
-                "organized crime gang activity conspiracy",
-                "money transfer payment suspicious financial",
-                "meeting location secret hidden private",
-                "code words encrypted messages secret communication",
-                "urgent emergency immediate action required",
-                "police law enforcement investigation avoid",
-                "evidence destroy delete remove traces",
-                "confidential secret classified information",
-                "planning preparation execution criminal act"
-            ]
+            suspicious_matrix = self._get_suspicious_query_matrix()
+            if suspicious_matrix is None:
+                return []
             
-            all_results = []
+            # Focus on chat records for suspicious conversations
+            chat_filter = Filter(must=[FieldCondition(key="data_type", match=MatchValue(value="chat_record"))])
+            per_query_limit = limit // len(SUSPICIOUS_QUERIES) + 1  # Distribute limit across queries
             
-            for query in suspicious_queries:
-                # Generate embedding for each suspicious query
-                query_embedding = await self.generate_embedding(query)
-                if not query_embedding:
-                    continue
-                
-                # Build filter conditions
-                filter_conditions = []
-                
-                # Focus on chat records for suspicious conversations
-                filter_conditions.append(
-                    FieldCondition(key="data_type", match=MatchValue(value="chat_record"))
-                )
-                
-                # Perform search with lower threshold to get some results
-                search_result = self.qdrant_client.search(
-                    collection_name=collection_name,  # Use case-specific collection
-                    query_vector=query_embedding,
-                    query_filter=Filter(must=filter_conditions) if filter_conditions else None,
-                    limit=limit // len(suspicious_queries) + 1,  # Distribute limit across queries
+            # Send every probe in one search_batch request - one HTTP round-trip instead of one per probe
+            search_requests = [
+                SearchRequest(
+                    vector=query_embedding.tolist(),
+                    filter=chat_filter,
+                    limit=per_query_limit,
                     score_threshold=0.1,  # Lower threshold to get some results
                     with_payload=True,
-                    with_vectors=False
+                    with_vector=False
                 )
-                
-                # Add results with enhanced scoring
-                for hit in search_result:
-                    # Boost score for suspicious indicators
-                    enhanced_score = self._calculate_suspicious_score(hit.payload, hit.score)
-                    
-                    result = {
-                        "score": enhanced_score,
-                        "original_score": hit.score,
-                        "payload": hit.payload,
-                        "suspicious_indicators": self._extract_suspicious_indicators(hit.payload)
-                    }
-                    all_results.append(result)
+                for query_embedding in suspicious_matrix
+            ]
+            search_results = await asyncio.to_thread(
+                self.qdrant_client.search_batch,
+                collection_name=collection_name,  # Use case-specific collection
+                requests=search_requests
+            )
+            
+            hits = [hit for search_result in search_results for hit in search_result]
+            
+            # Score every hit in one vectorized pass instead of one Python call per hit
+            base_scores = np.fromiter((hit.score for hit in hits), dtype=np.float32, count=len(hits))
+            contents = [((hit.payload or {}).get("message_content") or "").lower() for hit in hits]
+            enhanced_scores = self._calculate_suspicious_scores(contents, base_scores)
+            
+            all_results = [
+                {
+                    "score": float(enhanced_score),
+                    "original_score": hit.score,
+                    "payload": hit.payload,
+                    "suspicious_indicators": self._extract_suspicious_indicators(content)
+                }
+                for hit, content, enhanced_score in zip(hits, contents, enhanced_scores)
+            ]
             
             # Sort by enhanced score and remove duplicates
             all_results = self._deduplicate_and_rank_results(all_results)
@@ -426,67 +464,38 @@ class VectorService:
             logger.error(f"Failed to find suspicious conversations: {str(e)}")
             return []
     
-    def _calculate_suspicious_score(self, payload: Dict[str, Any], base_score: float) -> float:
-        """Calculate enhanced suspicious score based on content analysis."""
-        content = payload.get("message_content", "").lower()
-        if not content:
-            return base_score
-        
-        # Suspicious keywords and their weights
-        suspicious_patterns = {
-            # High weight patterns
-            "kill": 0.3, "murder": 0.3, "death": 0.2, "die": 0.2,
-            "bomb": 0.4, "explosive": 0.4, "weapon": 0.3, "gun": 0.3,
-            "drug": 0.3, "cocaine": 0.4, "heroin": 0.4, "marijuana": 0.2,
-            "fraud": 0.3, "scam": 0.3, "steal": 0.2, "rob": 0.2,
-            "threat": 0.3, "blackmail": 0.4, "extort": 0.4,
-            "terror": 0.4, "bomb": 0.4, "attack": 0.3,
-            "traffic": 0.3, "exploit": 0.3, "abuse": 0.3,
-            "hack": 0.3, "breach": 0.3, "steal data": 0.3,
-            "money": 0.1, "payment": 0.1, "transfer": 0.1,
-            "secret": 0.2, "confidential": 0.2, "private": 0.1,
-            "urgent": 0.1, "immediate": 0.1, "asap": 0.1,
-            "police": 0.2, "cop": 0.2, "fbi": 0.3, "investigation": 0.2,
-            "evidence": 0.2, "destroy": 0.2, "delete": 0.1,
-            "meet": 0.1, "location": 0.1, "address": 0.1,
-            "code": 0.2, "encrypted": 0.2, "password": 0.1
-        }
-        
-        # Calculate suspicious score
-        suspicious_score = 0.0
-        for pattern, weight in suspicious_patterns.items():
-            if pattern in content:
-                suspicious_score += weight
-        
-        # Normalize and combine with base score
-        max_possible_score = sum(suspicious_patterns.values())
-        normalized_suspicious = min(suspicious_score / max_possible_score, 1.0)
+    def _get_suspicious_query_matrix(self) -> Optional[np.ndarray]:
+        """Embed all suspicious queries in one batch and keep the float32 matrix for reuse."""
+        if self._suspicious_query_matrix is None and self.embedder:
+            try:
+                self._suspicious_query_matrix = np.asarray(
+                    list(self.embedder.embed(list(SUSPICIOUS_QUERIES))), dtype=np.float32
+                )
+            except Exception as e:
+                logger.error(f"Failed to embed suspicious queries: {str(e)}")
+        return self._suspicious_query_matrix
+    
+    def _calculate_suspicious_scores(self, contents: List[str], base_scores: np.ndarray) -> np.ndarray:
+        """Combine semantic scores with keyword-weighted suspicious scores for a batch of lowercased messages."""
+        if not contents:
+            return base_scores
         
-        # Combine base semantic score with suspicious score
-        enhanced_score = (base_score * 0.6) + (normalized_suspicious * 0.4)
+        # (hits x patterns) presence matrix; the weighted sum is one matrix-vector product
+        presence = np.array(
+            [[pattern in content for pattern in _SUSPICIOUS_PATTERNS] for content in contents], dtype=np.float32
+        )
+        normalized_suspicious = np.minimum(presence @ _SUSPICIOUS_WEIGHTS / _MAX_SUSPICIOUS_SCORE, 1.0)
         
-        return min(enhanced_score, 1.0)
+        # Combine base semantic score with suspicious score; messages without content keep their base score
+        enhanced_scores = np.minimum(base_scores * 0.6 + normalized_suspicious * 0.4, 1.0)
+        has_content = np.fromiter((bool(content) for content in contents), dtype=bool, count=len(contents))
+        return np.where(has_content, enhanced_scores, base_scores)
     
-    def _extract_suspicious_indicators(self, payload: Dict[str, Any]) -> List[str]:
-        """Extract suspicious indicators from message content."""
-        content = payload.get("message_content", "").lower()
+    def _extract_suspicious_indicators(self, content: str) -> List[str]:
+        """Extract suspicious indicators from lowercased message content."""
         if not content:
             return []
-        
-        indicators = []
-        suspicious_keywords = [
-            "kill", "murder", "death", "bomb", "weapon", "gun",
-            "drug", "cocaine", "heroin", "fraud", "scam", "steal",
-            "threat", "blackmail", "extort", "terror", "attack",
-            "traffic", "exploit", "abuse", "hack", "breach",
-            "secret", "confidential", "urgent", "police", "evidence"
-        ]
-        
-        for keyword in suspicious_keywords:
-            if keyword in content:
-                indicators.append(keyword)
-        
-        return indicators
+        return [keyword for keyword in SUSPICIOUS_INDICATOR_KEYWORDS if keyword in content]
     
     def _deduplicate_and_rank_results(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Remove duplicates and rank results by suspicious score."""
@@ -518,17 +527,17 @@ class VectorService:
         
         try:
             # Get all collections instead of looking for a specific one
-            collections = self.qdrant_client.get_collections()
+            collections = await asyncio.to_thread(self.qdrant_client.get_collections)
             total_collections = len(collections.collections)
-            total_points = 0
             
-            # Calculate total points across all collections
-            for collection in collections.collections:
-                try:
-                    collection_info = self.qdrant_client.get_collection(collection.name)
-                    total_points += collection_info.points_count
-                except Exception:
-                    continue
+            # Calculate total points across all collections, fetching their info concurrently
+            collection_infos = await asyncio.gather(*(
+                asyncio.to_thread(self.qdrant_client.get_collection, collection.name)
+                for collection in collections.collections
+            ), return_exceptions=True)
+            total_points = sum(
+                info.points_count or 0 for info in collection_infos if not isinstance(info, BaseException)
+            )
             
             return {
                 "status": "connected",
@@ -546,7 +555,8 @@ class VectorService:
             return False
         
         try:
-            self.qdrant_client.delete(
+            await asyncio.to_thread(
+                self.qdrant_client.delete,
                 collection_name=self.collection_name,
                 points_selector=Filter(
                     must=[FieldCondition(key="case_id", match=MatchValue(value=case_id))]
@@ -564,17 +574,24 @@ class VectorService:
         collection_name: str,
         data_types: Optional[List[str]] = None,
         limit: int = 20,
-        score_threshold: float = 0.5
+        score_threshold: float = 0.5,
+        query_vector: Optional[List[float]] = None
     ) -> List[Dict[str, Any]]:
-        """Perform semantic search in a specific case collection."""
+        """Perform semantic search in a specific case collection, reusing query_vector when already embedded."""
         if not self.qdrant_client:
             logger.warning("Qdrant client not available")
             return []
         
         try:
+            # One lookup both checks the collection exists and gives its vector size
+            try:
+                info = await asyncio.to_thread(self.qdrant_client.get_collection, collection_name)
+            except Exception:
+                logger.warning(f"Collection {collection_name} does not exist")
+                return []
+            
             # Quick compatibility check: log if collection vector size mismatches the embedder
             try:
-                info = self.qdrant_client.get_collection(collection_name)
                 size_in_collection = getattr(getattr(info.config, 'params', None), 'vectors', None)
                 size_val = getattr(size_in_collection, 'size', None)
                 dim = self.get_embedding_dimension() or settings.embedding_dimension
@@ -584,22 +601,18 @@ class VectorService:
                     )
             except Exception:
                 pass
-            # Check if collection exists
-            collections = self.qdrant_client.get_collections()
-            collection_names = [col.name for col in collections.collections]
-            
-            if collection_name not in collection_names:
-                logger.warning(f"Collection {collection_name} does not exist")
-                return []
-            
-            # Generate query embedding using AI service
-            from app.services.ai_service import ai_service
-            query_embeddings = await ai_service.generate_embeddings([query])
-            if not query_embeddings:
-                logger.warning("Failed to generate query embedding")
-                return []
             
-            query_embedding = query_embeddings[0]
+            # Generate query embedding using AI service unless the caller already has one
+            if query_vector is not None:
+                query_embedding = list(query_vector)
+            else:
+                from app.services.ai_service import ai_service
+                query_embeddings = await ai_service.generate_embeddings([query])
+                if not query_embeddings:
+                    logger.warning("Failed to generate query embedding")
+                    return []
+                
+                query_embedding = query_embeddings[0]
             logger.info(f"🔍 Generated query embedding with {len(query_embedding)} dimensions")
             
             # Build search filter for data types
@@ -613,8 +626,9 @@ class VectorService:
                     search_filter = Filter(should=conditions)
                     logger.info(f"🎯 Filtering by data types: {data_types}")
             
-            # Perform search
-            search_results = self.qdrant_client.search(
+            # Perform search off the event loop so concurrent SQL work keeps running
+            search_results = await asyncio.to_thread(
+                self.qdrant_client.search,
                 collection_name=collection_name,
                 query_vector=query_embedding,
                 query_filter=search_filter,
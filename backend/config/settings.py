@@ -13,6 +13,13 @@ class Settings(BaseSettings):
     postgres_db: str = os.getenv("POSTGRES_DB", "ufdr_analysis")
     postgres_user: str = os.getenv("POSTGRES_USER", "postgres")
     postgres_password: str = os.getenv("POSTGRES_PASSWORD", "root")
+    # Optional SELECT-only role used to run AI-generated SQL
+    postgres_readonly_user: Optional[str] = os.getenv("POSTGRES_READONLY_USER")
+    postgres_readonly_password: Optional[str] = os.getenv("POSTGRES_READONLY_PASSWORD")
+    # Connection pool per engine; requests queue for up to pool_timeout seconds once it is exhausted
+    postgres_pool_size: int = int(os.getenv("POSTGRES_POOL_SIZE", "20"))
+    postgres_max_overflow: int = int(os.getenv("POSTGRES_MAX_OVERFLOW", "10"))
+    postgres_pool_timeout: int = int(os.getenv("POSTGRES_POOL_TIMEOUT", "10"))
     
     # Qdrant Configuration
     qdrant_url: str = os.getenv("QDRANT_URL", "http://localhost:6333")
@@ -36,6 +43,8 @@ class Settings(BaseSettings):
     redis_host: str = os.getenv("REDIS_HOST", "localhost")
     redis_port: int = int(os.getenv("REDIS_PORT", "6379"))
     redis_password: Optional[str] = os.getenv("REDIS_PASSWORD")
+    # Reuse cached answers for paraphrased queries; costs a query embedding on every cache miss
+    semantic_cache_enabled: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "False").lower() == "true"
     
     # Application Configuration
     app_host: str = os.getenv("APP_HOST", "0.0.0.0")
@@ -47,6 +56,12 @@ class Settings(BaseSettings):
     def postgres_url(self) -> str:
         return f"postgresql://{self.postgres_user}:{self.postgres_password}@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
     
+    @property
+    def postgres_readonly_url(self) -> str:
+        if not self.postgres_readonly_user:
+            return self.postgres_url
+        return f"postgresql://{self.postgres_readonly_user}:{self.postgres_readonly_password}@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
+    
     class Config:
         env_file = ".env"
         extra = "allow"
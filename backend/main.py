@@ -18,6 +18,7 @@ from app.models.database import create_tables
 from app.core.database_manager import db_manager
 from app.repositories.neo4j_repository import neo4j_repo
 from app.services.vector_service import vector_service
+from app.services.ai_service import ai_service
 
 # Configure logging
 logging.basicConfig(
@@ -51,12 +52,19 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"Neo4j connection failed: {str(e)} - continuing without graph database")
     
+    try:
+        # Persistent embedding workers shared by ingest and query paths
+        await ai_service.start_embedding_workers()
+    except Exception as e:
+        logger.warning(f"Embedding workers failed to start: {str(e)} - embedding inline")
+    
     logger.info("Application startup completed")
     
     yield
     
     # Shutdown
     logger.info("Shutting down Enhanced UFDR Analysis System...")
+    await ai_service.stop_embedding_workers()
     try:
         db_manager.close_connections()
         neo4j_repo.close()
@@ -0,0 +1,36 @@
+"""
+Regression tests for the row ceiling added to generated and template SQL.
+"""
+
+import pytest
+
+pytest.importorskip("sqlglot")
+pytest.importorskip("numpy")
+
+from app.services.ai_service import (  # noqa: E402
+    SQL_MAX_ROWS, _with_row_limit, list_union_sql, search_union_sql
+)
+
+
+@pytest.mark.parametrize("sql_query, binds", [
+    (list_union_sql(("chat_records", "call_records", "contacts")), (":limit", ":offset")),
+    (search_union_sql(("chat_records", "contacts")), (":limit", ":offset", ":terms", ":pattern")),
+])
+def test_union_templates_keep_bind_parameters(sql_query, binds):
+    limited = _with_row_limit(sql_query)
+    assert limited.startswith(sql_query)
+    assert limited.endswith(f"LIMIT {SQL_MAX_ROWS}")
+    assert "%(" not in limited
+    for bind in binds:
+        assert bind in limited
+
+
+def test_unbounded_select_gets_limit():
+    limited = _with_row_limit("SELECT * FROM chat_records WHERE app_name ILIKE :app -- newest first\n;")
+    assert ":app" in limited
+    assert limited.endswith(f"\nLIMIT {SQL_MAX_ROWS}")
+
+
+def test_existing_limit_is_left_alone():
+    sql_query = "SELECT * FROM call_records ORDER BY duration DESC LIMIT 10"
+    assert _with_row_limit(sql_query) == sql_query